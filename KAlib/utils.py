@@ -1,11 +1,27 @@
 import streamlit as st
 from typing import List, Dict, Any, Optional
 
-def display_session_msg(container_obj, user_image: Optional[str] = None):
-    # Initialize messages list if not present
-    messages = st.session_state.setdefault("messages", [])
+# Session key of KAlib's own list of message dicts. The pages keep a
+# coding.messages.MessageStore under "messages", so KAlib must not share it.
+MESSAGES_KEY = "kalib_messages"
 
-    for msg in messages:
+def display_session_msg(container_obj, user_image: Optional[str] = None, window: int = 50, page: int = 50):
+    # Initialize messages list if not present
+    messages = st.session_state.setdefault(MESSAGES_KEY, [])
+
+    # Draw only the last `window` messages; each "load older" click shows `page` more (window <= 0 shows all)
+    hidden = 0
+    if window > 0:
+        shown = st.session_state.setdefault("kalib_shown_messages", window)
+        hidden = max(0, len(messages) - shown)
+    if hidden:
+        container_obj.button(
+            f"⬆️ Load {min(page, hidden)} older messages ({hidden} hidden)",
+            key="kalib_older_messages",
+            on_click=lambda: st.session_state.update(
+                {"kalib_shown_messages": st.session_state["kalib_shown_messages"] + page}))
+
+    for msg in messages[hidden:]:
         role = msg.get("role", "user")
         content = msg.get("content", "")
         avatar = None
@@ -23,14 +39,18 @@ def display_session_msg(container_obj, user_image: Optional[str] = None):
             container_obj.chat_message(role).markdown(content)
 
 def show_chat_history(container_obj, chat_history: List[Dict[str, Any]], user_image=None):
-    if 'messages' not in st.session_state:
-        st.session_state.messages = []
+    messages = st.session_state.setdefault(MESSAGES_KEY, [])
+    # Repeats within `chat_history` are neither stored nor drawn again
+    seen = set()
 
     for entry in chat_history:
         role = entry.get('role', 'user')
         content = entry.get('content', '')
 
-        st.session_state.messages.append({"role": role, "content": content})
+        if (role, content) in seen:
+            continue
+        seen.add((role, content))
+        messages.append({"role": role, "content": content})
 
         # Display message if not empty
         if content.strip():
@@ -41,4 +61,3 @@ def show_chat_history(container_obj, chat_history: List[Dict[str, Any]], user_im
                     container_obj.chat_message("assistant", avatar=user_image).write(content)
                 else:
                     container_obj.chat_message("user").write(content)
-
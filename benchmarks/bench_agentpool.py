@@ -0,0 +1,77 @@
+"""
+Rerun cost of the agent pages before and after pooling their agents.
+
+Before, every rerun of a page built all of its agents, tools and reply
+functions; now a rerun builds nothing and a chat turn checks a prebuilt set
+out of the page's AgentPool. For each page this reports, as medians:
+
+    rerun    a widget-interaction rerun of the page (AppTest, no prompt)
+    build    build_agents(), which the old main() ran on every rerun
+    acquire  checking an idle set out of the pool and returning it
+
+Needs no network (nothing is sent to the LLM). Run from the repository root:
+
+    python -m benchmarks.bench_agentpool --reruns 20
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from coding.agentpool import AgentPool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["one_agent", "two_agents", "group_agents"]
+LANG = "English"
+
+
+def load_page(name: str):
+    spec = importlib.util.spec_from_file_location(f"page_{name}", os.path.join(ROOT, "pages", f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def median_time(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+    os.environ.setdefault("OPEN_API_KEY", "sk-benchmark")  # agents need a key to be built, never to be used here
+
+    app = AppTest.from_file(os.path.join(ROOT, "streamlit_app_2agent.py"), default_timeout=60).run()
+    print(f"{'page':>13} {'rerun':>9} {'build':>9} {'before':>9} {'acquire':>9} {'speedup':>8}")
+    for name in PAGES:
+        app.switch_page(f"pages/{name}.py").run()
+        assert not app.exception, app.exception
+        rerun = median_time(app.run, args.reruns)
+
+        page = load_page(name)
+        build = median_time(lambda: page.build_agents(LANG, page.llm_model), max(3, args.reruns // 4))
+
+        pool = AgentPool(name, page.build_agents)
+
+        def turn():
+            with pool.acquire(LANG, page.llm_model, container=None):
+                pass
+
+        turn()
+        acquire = median_time(turn, args.reruns)
+        before = rerun + build
+        print(f"{name:>13} {rerun * 1000:>7.1f}ms {build * 1000:>7.1f}ms {before * 1000:>7.1f}ms "
+              f"{acquire * 1000:>7.2f}ms {before / rerun:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+AG_search_expert / AG_search_textbook style queries: per-value scans vs CatalogIndex.
+
+That both return the same records is checked by tests/test_catalog.py.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_catalog --sizes 5000 50000
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import expert_records, textbook_records
+from coding.catalog import EXPERT_FIELDS, TEXTBOOK_FIELDS, CatalogIndex
+
+EXPERT_QUERIES = [
+    dict(name=None, discipline=["Digital Sociology", "Computational Social Science"], interest=None),
+    dict(name="gan", discipline=None, interest=["privacy", "trade", "chip"]),
+    dict(name="Lon Ka", discipline=None, interest=None),
+]
+TEXTBOOK_QUERIES = [
+    dict(title=None, discipline=["Technology and Society"], related_expert=["ka"]),
+    dict(title="vol. 12", discipline=None, related_expert=None),
+]
+
+
+def legacy_search(records, fields, single, value_field, value):
+    """The original search_expert/search_textbook loop, over an arbitrary record list."""
+    (single_field, single_value), = single.items()
+    results = []
+    for rec in records:
+        if ((single_value and single_value.lower() in rec[single_field].lower()) or
+                (value and value.lower() in rec[value_field].lower())):
+            results.append(rec)
+    return results
+
+
+def legacy_many(records, fields, dedup_key, single, multi):
+    """The original AG_* wrapper: one legacy scan per list value, then dedup via dict."""
+    matched = []
+    for field, values in multi.items():
+        for value in (values or []):
+            matched.extend(legacy_search(records, fields, single, field, value))
+    if not any(multi.values()):
+        matched = legacy_search(records, fields, single, fields[1], None)
+    unique = {rec[dedup_key]: rec for rec in matched if dedup_key in rec}
+    return list(unique.values())
+
+
+def best_of(repeat: int, fn, *args, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        experts = expert_records(size)
+        textbooks = textbook_records(size, experts)
+        start = time.perf_counter()
+        expert_index = CatalogIndex(experts, EXPERT_FIELDS)
+        textbook_index = CatalogIndex(textbooks, TEXTBOOK_FIELDS)
+        print(f"\n{size} experts + {size} textbooks, indexed in {time.perf_counter() - start:.2f}s")
+        print(f"{'query':<60} {'scan ms':>9} {'index ms':>9} {'speedup':>8}")
+
+        cases = [
+            (experts, expert_index, EXPERT_FIELDS, "EMAIL", {"NAME": q["name"]},
+             {"DISCIPLINE": q["discipline"], "INTEREST": q["interest"]}) for q in EXPERT_QUERIES
+        ] + [
+            (textbooks, textbook_index, TEXTBOOK_FIELDS, "TITLE", {"TITLE": q["title"]},
+             {"DISCIPLINE": q["discipline"], "RELATED_EXPERT": q["related_expert"]}) for q in TEXTBOOK_QUERIES
+        ]
+        for records, index, fields, key, single, multi in cases:
+            scan = best_of(args.repeat, legacy_many, records, fields, key, single, multi)
+            fast = best_of(args.repeat, index.search_many, key, single, multi)
+            label = f"{key}: {single} {multi}"[:60]
+            print(f"{label:<60} {scan * 1e3:>9.2f} {fast * 1e3:>9.2f} {scan / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
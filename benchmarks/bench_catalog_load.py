@@ -0,0 +1,77 @@
+"""
+Startup time and peak RSS of a large expert catalog: in-module constants vs catalog files.
+
+Each variant runs in a fresh subprocess that loads the catalog, then runs one
+AG_search_expert style query (which builds the index). Run from the
+repository root:
+
+    python -m benchmarks.bench_catalog_load --size 100000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import expert_records
+from coding.catalog import write_catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, resource, sys, time
+sys.path[:0] = [{root!r}, {tmp!r}]
+start = time.perf_counter()
+{load}
+from coding.catalog import EXPERT_FIELDS, CatalogIndex
+catalog = CatalogIndex(records, EXPERT_FIELDS)
+loaded = time.perf_counter()
+catalog.search_many("EMAIL", {{"NAME": None}}, {{"INTEREST": ["privacy"]}})
+queried = time.perf_counter()
+print(json.dumps({{
+    "load_s": loaded - start,
+    "first_query_s": queried - loaded,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+VARIANTS = {
+    "constants (.py)": "from big_constant import EXPERTS_LIST\nrecords = EXPERTS_LIST['EXPERTS']",
+    "jsonl (mmap)": "from coding.catalog import load_catalog\nrecords = load_catalog({tmp!r} + '/experts.jsonl')",
+    "arrow (mmap)": "from coding.catalog import load_catalog\nrecords = load_catalog({tmp!r} + '/experts.arrow')",
+}
+
+
+def run_probe(tmp: str, load: str) -> dict:
+    code = PROBE.format(root=ROOT, tmp=tmp, load=load.format(tmp=tmp))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    records = expert_records(args.size)
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "big_constant.py"), "w", encoding="utf-8") as f:
+            f.write(f"EXPERTS_LIST = {{'EXPERTS': {records!r}}}\n")
+        write_catalog(records, os.path.join(tmp, "experts.jsonl"))
+        try:
+            write_catalog(records, os.path.join(tmp, "experts.arrow"))
+        except ImportError:
+            VARIANTS.pop("arrow (mmap)")
+        # Import once so the constants variant is timed from a warm .pyc, as in a deployed app.
+        run_probe(tmp, VARIANTS["constants (.py)"])
+
+        print(f"{args.size} experts")
+        print(f"{'variant':<18} {'load s':>8} {'first query s':>14} {'peak RSS MB':>12}")
+        for name, load in VARIANTS.items():
+            r = run_probe(tmp, load)
+            print(f"{name:<18} {r['load_s']:>8.3f} {r['first_query_s']:>14.3f} {r['rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
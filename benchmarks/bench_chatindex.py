@@ -0,0 +1,75 @@
+"""
+Ingest and query times of the chat log index as the log grows.
+
+Writes synthetic chat logs (mixed Chinese and English, a user question and
+an assistant answer per turn, spread over --days days) in steps of
+--step messages up to --messages, ingests each step incrementally and times
+a full-text search, the per-day counts and the average answer length
+after each. Everything is written to a temporary directory. Run from the
+repository root:
+
+    python -m benchmarks.bench_chatindex --messages 1000000 --step 250000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from coding.chatindex import ChatIndex
+from coding.chatlog import ChatLogWriter, make_record
+
+WORDS = ["台灣", "歷史", "經濟", "學習", "老師", "問題", "python", "agent", "model", "search", "data", "news"]
+
+
+def write_messages(writer: ChatLogWriter, start: int, count: int, days: int, rng: random.Random):
+    origin = datetime(2025, 1, 1)
+    for i in range(start, start + count):
+        ts = origin + timedelta(seconds=i * days * 86400 // max(1, count + start))
+        role = "user" if i % 2 == 0 else "assistant"
+        words = rng.choices(WORDS, k=8 if role == "user" else 60)
+        writer.write_record(make_record(f"s{i // 20}", "benchmark", role, " ".join(words), ts=ts))
+    writer.flush()
+
+
+def timed(func, repeat: int = 5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--step", type=int, default=50000, help="Messages written between ingests.")
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        writer = ChatLogWriter(os.path.join(directory, "logs"))
+        index = ChatIndex(os.path.join(directory, "index.sqlite"), writer.directory)
+        print(f"{'messages':>9} {'ingest s':>9} {'rate/s':>8} {'noop ms':>8} {'search ms':>10} "
+              f"{'daily ms':>9} {'avg len ms':>11} {'index MB':>9}")
+        written = 0
+        while written < args.messages:
+            count = min(args.step, args.messages - written)
+            write_messages(writer, written, count, args.days, rng)
+            written += count
+            start = time.perf_counter()
+            stats = index.ingest()
+            ingest = time.perf_counter() - start
+            _, noop = timed(index.ingest, 1)
+            hits, search = timed(lambda: index.search("台灣 經濟 python", limit=20))
+            _, daily = timed(index.daily_counts)
+            _, average = timed(index.average_answer_length)
+            size = os.path.getsize(index.path) / 2 ** 20
+            print(f"{index.count():>9} {ingest:>9.2f} {stats.added / ingest:>8.0f} {noop:>8.1f} {search:>10.1f} "
+                  f"{daily:>9.1f} {average:>11.1f} {size:>9.1f}")
+        writer.close()
+
+
+if __name__ == "__main__":
+    main()
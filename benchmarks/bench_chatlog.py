@@ -0,0 +1,101 @@
+"""
+Disk use and read throughput of a year of chat logs, before and after compaction.
+
+Writes a synthetic year of logs the way `save_messages_to_json` did (one
+indented JSON file per turn, --turns-per-day a day), compacts them with
+`compact_logs` into one gzip archive per day, and reads every message back
+with `iter_records` from both layouts. Disk use counts allocated blocks, so
+the per-file overhead of many small files shows. That compaction keeps
+every message is checked in tests/test_chatlog.py. Everything is written
+to a temporary directory. Run from the repository root:
+
+    python -m benchmarks.bench_chatlog --days 365 --turns-per-day 24
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from coding.chatlog import archive_paths, compact_logs, iter_records, log_paths
+
+VOCABULARY = ([f"word{i}" for i in range(2000)]
+              + list("台灣歷史經濟學習老師問題資料模型新聞時間課本專家回答整理重點例如因為所以"))
+
+
+def write_year(directory: str, days: int, turns_per_day: int, rng: random.Random) -> int:
+    start = datetime(2025, 1, 1)
+    messages = 0
+    for day in range(days):
+        for turn in range(turns_per_day):
+            when = start + timedelta(days=day, minutes=turn * (1440 // turns_per_day))
+            conversation = [
+                {"role": "user", "content": " ".join(rng.choices(VOCABULARY, k=15))},
+                {"role": "assistant", "content": " ".join(rng.choices(VOCABULARY, k=40)), "name": "Student_Agent"},
+                {"role": "user", "content": " ".join(rng.choices(VOCABULARY, k=180)), "name": "Teacher_Agent"},
+                {"role": "assistant", "content": " ".join(rng.choices(VOCABULARY, k=30)), "name": "Student_Agent"},
+            ]
+            path = os.path.join(directory, when.strftime("%Y-%m-%d %H-%M") + ".json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(conversation, f, ensure_ascii=False, indent=2)
+            messages += len(conversation)
+    return messages
+
+
+def disk_use(paths):
+    stats = [os.stat(p) for p in paths]
+    return len(stats), sum(s.st_size for s in stats), sum(s.st_blocks * 512 for s in stats)
+
+
+def read_all(directory: str):
+    start = time.perf_counter()
+    count = chars = 0
+    for record in iter_records(directory):
+        count += 1
+        chars += len(record.get("content") or "")
+    return count, chars, time.perf_counter() - start
+
+
+def peak_memory(directory: str) -> float:
+    tracemalloc.start()
+    for _ in iter_records(directory):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--turns-per-day", type=int, default=24)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        messages = write_year(directory, args.days, args.turns_per_day, random.Random(0))
+        files, size, allocated = disk_use(log_paths(directory))
+        count, chars, elapsed = read_all(directory)
+        print(f"{args.days} days, {messages} messages")
+        print(f"{'layout':>9} {'files':>7} {'bytes MB':>9} {'disk MB':>8} {'read s':>7} {'msg/s':>8} "
+              f"{'text MB/s':>10} {'peak MB':>8}")
+        print(f"{'per-turn':>9} {files:>7} {size / 2 ** 20:>9.1f} {allocated / 2 ** 20:>8.1f} {elapsed:>7.2f} "
+              f"{count / elapsed:>8.0f} {chars / 2 ** 20 / elapsed:>10.1f} {peak_memory(directory):>8.2f}")
+
+        start = time.perf_counter()
+        stats = compact_logs(directory, compact_after_days=0, retention_days=0)
+        compacted = time.perf_counter() - start
+
+        archived, archived_size, archived_allocated = disk_use(archive_paths(directory))
+        count, chars, elapsed = read_all(directory)
+        print(f"{'archive':>9} {archived:>7} {archived_size / 2 ** 20:>9.1f} {archived_allocated / 2 ** 20:>8.1f} "
+              f"{elapsed:>7.2f} {count / elapsed:>8.0f} {chars / 2 ** 20 / elapsed:>10.1f} "
+              f"{peak_memory(directory):>8.2f}")
+        print(f"compaction: {stats['files']} files in {compacted:.1f} s; "
+              f"{size / archived_size:.1f}x smaller in bytes, {allocated / archived_allocated:.1f}x on disk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Prompt tokens per turn of a long chat, with the whole history versus a ConversationContext.
+
+Runs TurnPipeline offline against the OpenAI stub in coding.stubserver,
+which answers every question at a fixed length. "full" sends the teacher
+every earlier turn; "bounded" sends a rolling summary plus the last
+CONTEXT_KEEP_TURNS turns, within the model's token budget. Token counts use
+tiktoken when its encodings can be loaded and an estimate otherwise. Run
+from the repository root:
+
+    python -m benchmarks.bench_context --turns 30 --answer-words 150
+"""
+import argparse
+import os
+import statistics
+import time
+
+from autogen import ConversableAgent, LLMConfig
+
+from coding.context import ConversationContext, llm_summarizer
+from coding.pipeline import TurnPipeline
+from coding.stubserver import openai_stub
+
+MODEL = "gpt-4o-mini"
+LANG = "English"
+
+
+def make_responder(answer_words: int):
+    def responder(request):
+        content = str(request["messages"][-1].get("content") or "")
+        if "running summary" in content:
+            return "Summary: " + " ".join(content.split()[-100:])
+        if "follow-up questions" in content:
+            return "What is next?\nWhy does it matter?\nHow would you test it?"
+        return " ".join(f"word{i}" for i in range(answer_words))
+    return responder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--answer-words", type=int, default=150, help="Length of every stub answer.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub latency per request, seconds.")
+    args = parser.parse_args()
+
+    with openai_stub(make_responder(args.answer_words), latency=args.latency) as stub:
+        config = LLMConfig(api_type="openai", model=MODEL, api_key="stub", base_url=stub.base_url)
+        student = ConversableAgent("Student_Agent", system_message="student", llm_config=config)
+        teacher = ConversableAgent("Teacher_Agent", system_message="teacher", llm_config=config,
+                                   human_input_mode="NEVER")
+        summary_agent = ConversableAgent("Summary_Agent", system_message="summary", llm_config=config)
+
+        results = {}
+        for mode in ["full", "bounded"]:
+            if mode == "full":
+                os.environ["CONTEXT_TOKEN_BUDGET"] = str(10 ** 9)
+                context, summarizer = ConversationContext(keep_turns=args.turns + 1), None
+            else:
+                os.environ.pop("CONTEXT_TOKEN_BUDGET", None)
+                context = ConversationContext()
+                summarizer = llm_summarizer(summary_agent, MODEL, LANG)
+            start_requests = len(stub.requests)
+            times = []
+            for turn in range(args.turns):
+                start = time.perf_counter()
+                TurnPipeline(student, teacher, MODEL, LANG, context=context, summarizer=summarizer).run(
+                    f"{mode} question {turn}")
+                times.append(time.perf_counter() - start)
+            results[mode] = (context, times, len(stub.requests) - start_requests)
+
+    print(f"turns={args.turns} answer_words={args.answer_words}")
+    print(f"{'turn':>5} {'full':>8} {'bounded':>8}")
+    full, bounded = results["full"][0].reports, results["bounded"][0].reports
+    for turn, (a, b) in enumerate(zip(full, bounded)):
+        print(f"{turn:>5} {a.prompt_tokens:>8} {b.prompt_tokens:>8}")
+    for mode, (context, times, requests) in results.items():
+        tokens = [r.prompt_tokens for r in context.reports]
+        print(f"{mode:>8}: teacher prompt tokens total {sum(tokens)}, last {tokens[-1]}, "
+              f"{requests} requests, median turn {statistics.median(times) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Wall-clock comparison of sequential and pooled page fetching in fetch_all_news.
+
+Runs entirely offline against coding.stubserver with artificial per-request
+latency. That both modes return the same frame is checked in
+tests/test_tools.py. Run from the repository root:
+
+    python -m benchmarks.bench_fetch --latency 0.05 --workers 8
+"""
+import argparse
+import time
+
+import requests
+
+from coding.stubserver import make_article, news_stub, paginate
+from coding.tools import fetch_all_news, json_to_dataframe
+
+PAGE_SIZE = 20
+
+
+def bare_requests_fetch(base_url: str, pages: int) -> int:
+    """The pre-pool behaviour: one fresh connection per page, one page at a time."""
+    rows = 0
+    for page in range(1, pages + 1):
+        response = requests.get(f"{base_url}/ajax_json/{page}/list/")
+        response.raise_for_status()
+        rows += len(json_to_dataframe(response.json()))
+    return rows
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub latency per request, seconds.")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrency limit for the pooled mode.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 10, 25, 50])
+    args = parser.parse_args()
+
+    articles = [make_article(i) for i in range(1, max(args.pages) * PAGE_SIZE + 1)]
+    with news_stub(paginate(articles, PAGE_SIZE), latency=args.latency) as stub:
+        print(f"latency={args.latency}s workers={args.workers}")
+        print(f"{'pages':>6} {'bare get':>10} {'sequential':>11} {'pooled':>10} {'speedup':>8}")
+        for pages in args.pages:
+            bare, _ = timed(bare_requests_fetch, stub.base_url, pages)
+            seq, _ = timed(fetch_all_news, 1, pages, base_url=stub.base_url, max_workers=1)
+            pooled, _ = timed(fetch_all_news, 1, pages, base_url=stub.base_url, max_workers=args.workers)
+            print(f"{pages:>6} {bare:>9.3f}s {seq:>10.3f}s {pooled:>9.3f}s {bare / pooled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Rerun time of the chat page with a long stored history, drawn in full versus windowed.
+
+Fills the history of the home page (streamlit_app_2agent.py) with --sizes
+messages and times reruns under streamlit.testing's AppTest, which runs
+the script and builds every element it draws (the browser's own work is
+not included):
+    - full: every message as its own markdown element, as the page used to;
+    - windowed: the last HISTORY_WINDOW messages as one element built from
+      cached fragments (coding.history.render_html_history), as the page does now.
+Run from the repository root:
+
+    python -m benchmarks.bench_history --sizes 1000 10000 --reruns 10
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from streamlit.testing.v1 import AppTest
+
+
+def full_history(key):
+    import streamlit as st
+    from streamlit_app_2agent import message_html
+
+    for msg in st.session_state[key]:
+        st.markdown(message_html(msg), unsafe_allow_html=True)
+
+
+def windowed_history(key):
+    import streamlit as st
+    from coding.history import render_html_history
+    from streamlit_app_2agent import message_html
+
+    render_html_history(st, st.session_state[key], key, message_html)
+
+
+def make_history(size: int):
+    roles = ["user", "student", "assistant"]
+    return [{"role": roles[i % 3], "content": f"Message {i}: " + "lorem ipsum dolor sit amet " * 20}
+            for i in range(size)]
+
+
+def rerun_times(script, history, reruns: int):
+    key = "messages_bench"
+    at = AppTest.from_function(script, args=(key,), default_timeout=120)
+    at.session_state[key] = history
+    times = []
+    for _ in range(reruns + 1):
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+        assert not at.exception, at.exception
+    # The first run imports the app; later ones are the reruns a user triggers.
+    return times[0], times[1:], len(at.markdown)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--reruns", type=int, default=10)
+    args = parser.parse_args()
+    sys.path.insert(0, ".")
+
+    print(f"{'messages':>9} {'mode':>9} {'elements':>9} {'first ms':>9} {'rerun p50 ms':>13} {'rerun max ms':>13}")
+    for size in args.sizes:
+        history = make_history(size)
+        for mode, script in [("full", full_history), ("windowed", windowed_history)]:
+            first, times, elements = rerun_times(script, history, args.reruns)
+            print(f"{size:>9} {mode:>9} {elements:>9} {first * 1000:>9.0f} "
+                  f"{statistics.median(times) * 1000:>13.1f} {max(times) * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Accuracy, latency and LLM calls avoided of the local intent classifier (coding.intent).
+
+Cross-validates the classifier over the labelled examples
+(coding/intent_examples.json): each fold is held out in turn and
+classified by a model trained on the others plus the JOB_DEFINITION
+descriptions. Reports
+    - label accuracy over all JOB_DEFINITION labels;
+    - per fast path (canned reply, direct teacher answer) its precision:
+      of the prompts sent there, how many belong there; a wrong one is a
+      question answered by a canned reply, or without the student rewrite;
+    - its recall: how many of the prompts that belong there get there;
+    - the LLM calls avoided on the held-out prompts, against the full
+      three-call pipeline for every prompt;
+    - training time and per-prompt classification latency.
+Run from the repository root:
+
+    python -m benchmarks.bench_intent --folds 5 --repeats 3
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=3, help="Cross-validation runs, each with its own shuffle")
+    parser.add_argument("--latency-rounds", type=int, default=200, help="Times every prompt is classified for latency")
+    args = parser.parse_args()
+    sys.path.insert(0, ".")
+
+    from coding.constant import JOB_DEFINITION
+    from coding.intent import (CALLS_AVOIDED, FAST_PATHS, INTENT_MIN_CONFIDENCE, MARKED_INTENTS, IntentClassifier,
+                               job_marker, load_examples)
+
+    examples = load_examples()
+    definitions = {(text, label) for label, d in JOB_DEFINITION.items() for text in (d if isinstance(d, list) else [d])}
+    prompts = [e for e in examples if e not in definitions]
+
+    correct = total = avoided = 0
+    sent, right, wanted = Counter(), Counter(), Counter()
+    train_seconds = []
+    for repeat in range(args.repeats):
+        shuffled = prompts[:]
+        random.Random(repeat).shuffle(shuffled)
+        for fold in range(args.folds):
+            held_out = shuffled[fold::args.folds]
+            train = [e for i, e in enumerate(shuffled) if i % args.folds != fold] + sorted(definitions)
+            start = time.perf_counter()
+            clf = IntentClassifier().fit(*zip(*train))
+            train_seconds.append(time.perf_counter() - start)
+            for text, label in held_out:
+                intent = clf.classify(text)
+                want = FAST_PATHS.get(label, "pipeline")
+                if label in MARKED_INTENTS and job_marker(text) != label:
+                    want = "pipeline"
+                correct += intent.label == label
+                total += 1
+                sent[intent.path] += 1
+                right[intent.path] += intent.path == want
+                wanted[want] += 1
+                avoided += CALLS_AVOIDED[intent.path] if intent.path == want else 0
+
+    clf = IntentClassifier().fit(*zip(*examples))
+    seconds = sorted(clf.classify(text).seconds for _ in range(args.latency_rounds) for text, _ in prompts)
+
+    print(f"{len(prompts)} labelled prompts, {len(JOB_DEFINITION)} labels, {len(clf.columns)} features; "
+          f"{args.repeats} x {args.folds}-fold cross-validation, confidence threshold {INTENT_MIN_CONFIDENCE}")
+    print(f"label accuracy {correct / total:.1%}")
+    print(f"{'path':>9} {'sent':>6} {'precision':>10} {'recall':>8}")
+    for path in ["canned", "teacher", "pipeline"]:
+        precision = right[path] / sent[path] if sent[path] else float("nan")
+        recall = right[path] / wanted[path] if wanted[path] else float("nan")
+        print(f"{path:>9} {sent[path]:>6} {precision:>10.1%} {recall:>8.1%}")
+    print(f"LLM calls avoided: {avoided} of {3 * total} ({avoided / (3 * total):.1%}); "
+          f"misrouted to a fast path: {sum(sent[p] - right[p] for p in ['canned', 'teacher'])}")
+    print(f"training {statistics.median(train_seconds) * 1000:.0f} ms (median); classification "
+          f"p50 {seconds[len(seconds) // 2] * 1e6:.0f} us, p99 {seconds[int(len(seconds) * 0.99)] * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+End-to-end turn latency of the sequential chat() pipeline versus TurnPipeline.
+
+Runs offline against the OpenAI stub in coding.stubserver with injected
+request latency, a fresh on-disk response cache (every turn misses), and a
+simulated cost for drawing a token and for finalizing a message. Run from
+the repository root:
+
+    python -m benchmarks.bench_pipeline --latency 0.3 --render-cost 0.02 --turns 5
+
+`--stream` also streams tokens; autogen then counts prompt tokens with
+tiktoken, which downloads its encoding files on first use. What a turn
+returns is checked in tests/test_pipeline.py.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from autogen import ConversableAgent, LLMConfig
+from autogen.io import IOStream
+
+from coding.llmcache import ResponseCache, cached_generate_reply
+from coding.pipeline import (FOLLOWUP_PROMPT, TurnPipeline, TurnView, extract_followups,
+                             safe_extract_content)
+from coding.streaming import TokenStream
+from coding.stubserver import openai_stub
+
+MODEL = "gpt-4o-mini"
+LANG = "English"
+
+
+def followup_responder(request):
+    content = str(request["messages"][-1].get("content") or "")
+    if "follow-up questions" in content:
+        return "What is next?\nWhy does it matter?\nHow would you test it?"
+    return f"Answer to: {content[:60]}"
+
+
+class SlowSlot:
+    def __init__(self, cost):
+        self.cost = cost
+
+    def markdown(self, text):
+        time.sleep(self.cost)
+
+    def empty(self):
+        pass
+
+
+class BenchView(TurnView):
+    """Stands in for Streamlit: every token draw and every final message takes a fixed time."""
+
+    def __init__(self, token_cost: float, render_cost: float):
+        self.token_cost = token_cost
+        self.render_cost = render_cost
+        self.messages = []
+
+    def stream(self, stage):
+        slot = SlowSlot(self.token_cost)
+        return TokenStream(type("Placeholder", (), {"empty": lambda _: slot})())
+
+    def message(self, role, content, stream):
+        time.sleep(self.render_cost)
+        self.messages.append((role, content))
+
+    def followups(self, questions):
+        time.sleep(self.render_cost)
+
+
+def sequential_turn(student, teacher, cache, view, prompt):
+    """The pre-pipeline chat(): each stage waits for the previous one to be drawn and stored."""
+    def reply(agent, content, stream):
+        stream.reset()
+        with IOStream.set_default(stream):
+            raw, _ = cached_generate_reply(cache, agent, [{"role": "user", "content": content}], MODEL, LANG)
+        return safe_extract_content(raw)
+
+    student_stream = view.stream("student")
+    student_msg = reply(student, prompt, student_stream)
+    view.message("student", student_msg, student_stream)
+    teacher_stream = view.stream("teacher")
+    teacher_msg = reply(teacher, student_msg, teacher_stream)
+    view.message("assistant", teacher_msg, teacher_stream)
+    questions = extract_followups(reply(student, FOLLOWUP_PROMPT.format(teacher_msg=teacher_msg), TokenStream()))
+    view.followups(questions)
+    return student_msg, teacher_msg, questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub latency per request, seconds.")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Stub delay between streamed words.")
+    parser.add_argument("--token-cost", type=float, default=0.0005, help="Simulated draw time per token.")
+    parser.add_argument("--render-cost", type=float, default=0.02, help="Simulated time to finalize a message.")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--stream", action="store_true", help="Stream tokens (needs tiktoken encodings).")
+    args = parser.parse_args()
+
+    with openai_stub(followup_responder, latency=args.latency, token_latency=args.token_latency) as stub:
+        config = LLMConfig(api_type="openai", model=MODEL, api_key="stub", base_url=stub.base_url,
+                           stream=args.stream)
+        student = ConversableAgent("Student_Agent", system_message="student", llm_config=config)
+        teacher = ConversableAgent("Teacher_Agent", system_message="teacher", llm_config=config,
+                                   human_input_mode="NEVER")
+        cache = ResponseCache(os.path.join(tempfile.mkdtemp(), "llm_cache.sqlite"))
+
+        results = {"sequential": [], "pipeline": []}
+        for turn in range(args.turns):
+            for mode in results:
+                prompt = f"{mode} question {turn}"
+                view = BenchView(args.token_cost, args.render_cost)
+                start = time.perf_counter()
+                if mode == "sequential":
+                    sequential_turn(student, teacher, cache, view, prompt)
+                else:
+                    TurnPipeline(student, teacher, MODEL, LANG, cache, view=view).run(prompt)
+                results[mode].append(time.perf_counter() - start)
+
+    print(f"latency={args.latency}s render={args.render_cost}s stream={args.stream} turns={args.turns}")
+    print(f"{'mode':>11} {'median':>9} {'min':>9} {'max':>9}")
+    for mode, times in results.items():
+        print(f"{mode:>11} {statistics.median(times):>8.3f}s {min(times):>8.3f}s {max(times):>8.3f}s")
+    saved = statistics.median(results["sequential"]) - statistics.median(results["pipeline"])
+    print(f"pipeline saves {saved * 1000:.0f} ms per turn (median)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+search_news against the inverted text index and the PreparedNews snapshot.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_search --sizes 10000 100000
+
+`scan` is plain search_news, `index` passes it the inverted text index,
+`prepared` is PreparedNews.search (text index plus pre-parsed dates and
+section codes); `lookup` is the text index query alone. That all three
+return the same rows is checked by tests/test_newssearch.py.
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import news_frame
+from coding.newsframe import PreparedNews
+from coding.tools import search_news
+
+QUERIES = [
+    dict(query="semiconductor"),
+    dict(query="chip market"),
+    dict(query="aiwan"),
+    dict(query="半導體"),
+    dict(query="typhoon", sections=["Taiwan News", "Front Page"]),
+    dict(query="election", date_from="2024-01-01", date_to="2024-06-30"),
+    dict(query="no such phrase anywhere"),
+    dict(date_from="2024-01-01", date_to="2024-01-31"),
+    dict(sections=["Sports"]),
+    dict(),
+]
+
+
+def best_of(repeat: int, fn, *args, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        df = news_frame(size)
+        start = time.perf_counter()
+        prepared = PreparedNews(df)
+        index = prepared.text_index
+        print(f"\n{size} articles, prepared in {time.perf_counter() - start:.2f}s")
+        print(f"{'filters':<40} {'scan ms':>9} {'index ms':>9} {'prepared ms':>12} {'speedup':>8} {'lookup ms':>10}")
+        for params in QUERIES:
+            scan = best_of(args.repeat, search_news, df, **params)
+            indexed = best_of(args.repeat, search_news, df, text_index=index, **params)
+            fast = best_of(args.repeat, prepared.search, **params)
+            lookup = best_of(args.repeat, index.search, params["query"]) if "query" in params else 0.0
+            label = ", ".join(f"{k}={v}" for k, v in params.items())[:40] or "(no filters)"
+            print(f"{label:<40} {scan * 1e3:>9.2f} {indexed * 1e3:>9.2f} {fast * 1e3:>12.2f}"
+                  f" {scan / fast:>7.1f}x {lookup * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
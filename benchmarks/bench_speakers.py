@@ -0,0 +1,130 @@
+"""
+Turn latency and LLM calls of the group chat's rule-based speaker selection against AutoPattern's.
+
+Builds the group page's agents (pages/group_agents.py build_agents) once
+per pattern and plays the same scripted conversation with each, offline
+against coding.stubserver's OpenAI stub (benchmarks.load.ScriptedModel):
+the teacher calls its tools, answers and asks Tech_Agent and General_Agent
+for their opinions, they give them and the student ends with 'ALL DONE'.
+With "auto" (AutoPattern) the group chat manager's LLM picks every next
+speaker, last the user, whose console input is answered with "exit"; with
+"rules" (coding.speakers.RulePattern) GROUP_SPEAKER_RULES do, and the chat
+ends after the student. Reports per pattern the turn latency, the LLM calls
+per turn and how many of them only picked a speaker. Run from the
+repository root:
+
+    python -m benchmarks.bench_speakers --turns 5 --latency 0.2 --token-latency 0.002
+"""
+import argparse
+import builtins
+import contextlib
+import importlib.util
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+class Transcript:
+    """Stands in for the page's chat container: keeps what the agents' reply hooks write."""
+
+    def __init__(self):
+        self.lines = []
+
+    def chat_message(self, *args, **kwargs) -> "Transcript":
+        return self
+
+    def write(self, text):
+        self.lines.append(text)
+
+    def badge(self, text, **kwargs):
+        self.lines.append(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patterns", nargs="+", choices=["auto", "rules"], default=["auto", "rules"])
+    parser.add_argument("--turns", type=int, default=5, help="Prompts sent to each pattern")
+    parser.add_argument("--latency", type=float, default=0.2, help="Model seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="Model seconds per generated word")
+    parser.add_argument("--reply-words", type=int, default=60)
+    parser.add_argument("--articles", type=int, default=500)
+    args = parser.parse_args()
+    sys.path.insert(0, ".")
+
+    # The app's data (caches, logs, news store) goes to a temporary directory; set before it is imported.
+    data = tempfile.TemporaryDirectory()
+    os.environ.update(
+        LLM_CACHE_PATH=os.path.join(data.name, "llm_cache.sqlite"),
+        NEWS_STORE_PATH=os.path.join(data.name, "news.sqlite"),
+        CHAT_LOG_DIR=os.path.join(data.name, "chat_logs"),
+        CHAT_INDEX_PATH=os.path.join(data.name, "chat_index.sqlite"),
+        TRACE_PATH="",
+    )
+    import autogen.oai.client
+    from autogen.agentchat import initiate_group_chat
+
+    from benchmarks.load import SELECT_RE, ScriptedModel, percentile
+    from benchmarks.synthetic import TOPIC_WORDS, news_records
+    from coding.agentpool import AgentPool
+    from coding.context import count_tokens
+    from coding.speakers import group_pattern
+    from coding.stubserver import news_stub, openai_stub, paginate
+    autogen.oai.client.count_token = count_tokens
+    builtins.input = lambda prompt="": "exit"
+
+    with openai_stub(ScriptedModel(args.reply_words), latency=args.latency, token_latency=args.token_latency) as model, \
+            news_stub(paginate(news_records(args.articles))) as news:
+        os.environ.update(OPENAI_API_KEY="stub", OPEN_API_KEY="stub", OPENAI_BASE_URL=model.base_url,
+                          NEWS_API_BASE=news.base_url)
+        spec = importlib.util.spec_from_file_location("group_agents_page", os.path.join("pages", "group_agents.py"))
+        page = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(page)
+        # The page's message store looks for a Streamlit session and warns on every message without one.
+        logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+        reports = []
+        for selection in args.patterns:
+            def build(lang, llm_model, selection=selection):
+                agents = page.build_agents(lang, llm_model)
+                agents["pattern"] = group_pattern(
+                    selection, initial_agent=agents["teacher"],
+                    agents=[agents["teacher"], agents["tech"], agents["general"], agents["student"]],
+                    user_agent=agents["user"], group_manager_args={"llm_config": page.llm_config_openai})
+                return agents
+
+            pool = AgentPool(f"bench_speakers_{selection}", build)
+            seconds, calls, selections, speakers = [], [], [], set()
+            for turn in range(args.turns):
+                # Distinct prompts per pattern keep the app's response cache out of the comparison.
+                topic = TOPIC_WORDS[turn % len(TOPIC_WORDS)]
+                prompt = f"{selection} question {turn}: what is the news about {topic}?"
+                before = len(model.requests)
+                start = time.perf_counter()
+                with pool.acquire("English", page.llm_model, container=Transcript()) as agents, \
+                        contextlib.redirect_stdout(io.StringIO()):
+                    result, _, _ = initiate_group_chat(pattern=agents["pattern"], messages=prompt, max_rounds=12)
+                seconds.append(time.perf_counter() - start)
+                requests = model.requests[before:]
+                calls.append(len(requests))
+                selections.append(sum(bool(SELECT_RE.search(str((r.get("messages") or [{}])[-1].get("content"))))
+                                      for r in requests))
+                speakers.add(" > ".join(m.get("name", "?") for m in result.chat_history))
+            reports.append((selection, seconds, calls, selections, speakers))
+
+    print(f"{args.turns} turns per pattern; model latency {args.latency} s + {args.token_latency} s/word")
+    print(f"{'pattern':<8} {'p50 s':>7} {'mean s':>7} {'max s':>7} {'calls/turn':>10} {'selection calls/turn':>20}")
+    for selection, seconds, calls, selections, _ in reports:
+        print(f"{selection:<8} {percentile(seconds, 50):>7.2f} {statistics.mean(seconds):>7.2f} {max(seconds):>7.2f} "
+              f"{statistics.mean(calls):>10.1f} {statistics.mean(selections):>20.1f}")
+    for selection, _, _, _, speakers in reports:
+        for order in sorted(speakers):
+            print(f"{selection} speakers: {order}")
+    data.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Turn latency of the chat pages under concurrent sessions, offline against local model and news stubs.
+
+Starts coding.stubserver's OpenAI-compatible stub (--latency seconds to
+the first token, then --token-latency per word, with canned tool calls)
+and its news stub serving --articles synthetic articles, points the app
+at them, and drives the `chat()` flow of each --pages page from
+--sessions concurrent simulated users, --turns prompts each. Every user is
+its own streamlit.testing AppTest, so it has its own session_state and
+reruns the page script like a browser would; the pages share the process
+and its caches, agent pools and background threads like real sessions do.
+
+The stub plays every agent the way the prompts ask: a teacher offered
+tools first calls them (get_time, AG_search_news, AG_search_expert,
+AG_search_textbook), then answers; an agent told to end with 'ALL DONE'
+or '##ALL DONE##' does; a teacher told to ask Tech_Agent and General_Agent
+for their opinions does; when asked, the group chat manager picks
+Teacher_Agent, then Tech_Agent, General_Agent, Student_Agent and the user,
+whose console input is answered with "exit". Prompt tokens are counted with
+coding.context.count_tokens, which falls back to an estimate when
+tiktoken cannot download its encodings.
+
+For each page it reports p50 / p95 / p99 / max turn latency, throughput
+(turns per second of wall time), model calls per turn and the tool calls
+made; --output also writes the samples as JSON. Run from the repository
+root:
+
+    python -m benchmarks.load --sessions 8 --turns 3 --latency 0.2 --token-latency 0.005
+"""
+import argparse
+import builtins
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.synthetic import DISCIPLINES, TOPIC_WORDS, news_records
+from coding.stubserver import news_stub, openai_stub, paginate, tool_call
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app_2agent.py")
+PAGES = {
+    "home": None,
+    "two_agents": "pages/two_agents.py",
+    "one_agent": "pages/one_agent.py",
+    "group_agents": "pages/group_agents.py",
+}
+SELECT_RE = re.compile(r"select the next role from \[([^\]]*)\]")
+TOPIC_RE = re.compile(r"news about (\w+)")
+# Who the scripted group chat manager lets speak after whom; anyone else is followed by the teacher.
+NEXT_SPEAKER = {"Teacher_Agent": "Tech_Agent", "Tech_Agent": "General_Agent", "General_Agent": "Student_Agent",
+                "Student_Agent": "user"}
+
+
+class ScriptedModel:
+    """
+    OpenAIStubServer responder that plays the app's agents by their prompts.
+
+    Replies quote the question and are `reply_words` words long. Requests are told apart by what
+    they carry: a speaker-selection prompt gets the next speaker's name, a
+    request offering tools that ends with a user message (a question, not
+    tool results or a summary prompt) gets calls to the offered tools,
+    anything else gets text, ending with the termination marker its system
+    message asks for.
+    """
+
+    def __init__(self, reply_words: int = 60):
+        self.reply_words = reply_words
+
+    def __call__(self, request: Dict[str, Any]):
+        messages = request.get("messages") or [{}]
+        last = str(messages[-1].get("content") or "")
+        selection = SELECT_RE.search(last)
+        if selection:
+            roles = re.findall(r"'([^']+)'", selection.group(1))
+            previous = messages[-2].get("name") if len(messages) > 1 else None
+            chosen = NEXT_SPEAKER.get(previous, "Teacher_Agent")
+            return chosen if chosen in roles or not roles else roles[0]
+
+        if request.get("tools") and messages[-1].get("role") == "user":
+            offered = {tool["function"]["name"] for tool in request["tools"]}
+            prompt = " ".join(str(m.get("content") or "") for m in messages if m.get("role") == "user")
+            topic = TOPIC_RE.search(prompt)
+            calls = [
+                tool_call("get_time"),
+                tool_call("AG_search_news", {"query": topic.group(1) if topic else None}),
+                tool_call("AG_search_expert", {"discipline": [DISCIPLINES[0]]}),
+                tool_call("AG_search_textbook", {"discipline": [DISCIPLINES[0]]}),
+            ]
+            return {"tool_calls": [call for call in calls if call["function"]["name"] in offered]}
+
+        system = str(messages[0].get("content") or "") if messages[0].get("role") == "system" else ""
+        # Quoting the question keeps replies, and so the prompts built from them, distinct:
+        # identical ones would be served by the app's response cache.
+        question = " ".join(last.split()[:12])
+        words = (TOPIC_WORDS * (self.reply_words // len(TOPIC_WORDS) + 1))[:self.reply_words]
+        text = f"On \"{question}\": " + " ".join(words) + "."
+        if "ask Tech_Agent" in system:
+            text += " What are the opinions of Tech_Agent and General_Agent?"
+        if "##ALL DONE##" in system:
+            text += " ##ALL DONE##"
+        elif "ALL DONE" in system:
+            text += " ALL DONE"
+        return text
+
+
+def percentile(values: List[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else float("nan")
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def share_apptest_globals():
+    """
+    Let AppTest runs overlap in one process, as the sessions of a Streamlit server do.
+
+    AppTest assumes one run at a time; each run sets process-wide state
+    that overlapping runs trip over:
+        - it compiles the scripts anew, and ast.parse is not thread-safe:
+          all runs share one ScriptCache instead;
+        - it patches `config.get_option` to turn on "global.appTest", and
+          patches undone out of order can turn it off under a running
+          script, which then loses its widget values: the option is set once;
+        - it resets whether the app has a pages/ directory, which a run
+          reading it at that moment takes as "no": runs reset a subclass;
+        - it installs a mock Runtime and removes it when done: a removed
+          Runtime is stood in for by the last one seen.
+    """
+    from contextlib import nullcontext
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: cache
+
+    config.set_option("global.appTest", True)
+    app_test.patch_config_options = lambda overrides: nullcontext()
+    app_test.PagesManager = type("PagesManager", (PagesManager,), {})
+
+    last = []
+    get_instance = Runtime.instance.__func__
+
+    def instance(cls):
+        if cls._instance is None and last:
+            return last[-1]
+        last[:] = [get_instance(cls)]
+        return last[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(last))
+
+
+def history_length(at, page: str) -> int:
+    """Messages in the chat history the page keeps in session_state."""
+    key = f"messages_{at.session_state['current_profile']}" if page == "home" else "messages"
+    return len(at.session_state[key]) if key in at.session_state else 0
+
+
+def run_session(page: str, session: int, turns: int, timeout: float,
+                start: threading.Barrier) -> List[Dict[str, Any]]:
+    """One simulated user: open the app, go to `page`, send `turns` prompts; one sample per turn."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout).run()
+    if PAGES[page]:
+        at.switch_page(PAGES[page]).run()
+    start.wait()
+    samples = []
+    for turn in range(turns):
+        topic = TOPIC_WORDS[(session * turns + turn) % len(TOPIC_WORDS)]
+        prompt = f"Session {session}, question {turn}: what is the news about {topic}?"
+        stored = history_length(at, page)
+        start = time.perf_counter()
+        error = None
+        try:
+            at.chat_input[0].set_value(prompt).run()
+            if at.exception:
+                error = at.exception[0].message
+            elif history_length(at, page) == stored:
+                error = "No reply was added to the chat history"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        samples.append({"page": page, "session": session, "turn": turn,
+                        "seconds": time.perf_counter() - start, "error": error})
+    return samples
+
+
+def run_page(page: str, sessions: int, turns: int, timeout: float, model, news) -> Dict[str, Any]:
+    """Run `sessions` concurrent sessions of `page` and summarise their turns."""
+    # The last session to open starts the clock; model calls made while opening are not counted.
+    counts = {}
+    start = threading.Barrier(sessions, action=lambda: counts.update(
+        requests=len(model.requests), tools=Counter(model.tool_calls), news=len(news.hits),
+        started=time.perf_counter()))
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, page, i, turns, timeout, start) for i in range(sessions)]
+        samples = [sample for future in futures for sample in future.result()]
+    wall = time.perf_counter() - counts["started"]
+    ok = [s["seconds"] for s in samples if not s["error"]]
+    return {
+        "page": page,
+        "turns": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_seconds": wall,
+        "p50": percentile(ok, 50),
+        "p95": percentile(ok, 95),
+        "p99": percentile(ok, 99),
+        "max": max(ok, default=float("nan")),
+        "throughput": len(ok) / wall,
+        "model_calls": len(model.requests) - counts["requests"],
+        "tool_calls": dict(model.tool_calls - counts["tools"]),
+        "news_requests": len(news.hits) - counts["news"],
+        "samples": samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES))
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent simulated users per page")
+    parser.add_argument("--turns", type=int, default=2, help="Prompts each user sends")
+    parser.add_argument("--latency", type=float, default=0.1, help="Model seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="Model seconds per generated word")
+    parser.add_argument("--reply-words", type=int, default=60)
+    parser.add_argument("--news-latency", type=float, default=0.05, help="News API seconds per request")
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds one turn may take")
+    parser.add_argument("--output", help="Write the report and every sample to this JSON file")
+    args = parser.parse_args()
+    sys.path.insert(0, ".")
+
+    # The app's data (caches, logs, news store) goes to a temporary directory; set before it is imported.
+    data = tempfile.TemporaryDirectory()
+    os.environ.update(
+        LLM_CACHE_PATH=os.path.join(data.name, "llm_cache.sqlite"),
+        NEWS_STORE_PATH=os.path.join(data.name, "news.sqlite"),
+        CHAT_LOG_DIR=os.path.join(data.name, "chat_logs"),
+        CHAT_INDEX_PATH=os.path.join(data.name, "chat_index.sqlite"),
+    )
+    import autogen.oai.client
+    from coding.context import count_tokens
+    autogen.oai.client.count_token = count_tokens
+    builtins.input = lambda prompt="": "exit"
+    share_apptest_globals()
+
+    with openai_stub(ScriptedModel(args.reply_words), latency=args.latency, token_latency=args.token_latency) as model, \
+            news_stub(paginate(news_records(args.articles)), latency=args.news_latency) as news:
+        os.environ.update(OPENAI_API_KEY="stub", OPEN_API_KEY="stub", OPENAI_BASE_URL=model.base_url,
+                          NEWS_API_BASE=news.base_url)
+        reports = [run_page(page, args.sessions, args.turns, args.timeout, model, news) for page in args.pages]
+
+    print(f"\n{args.sessions} sessions x {args.turns} turns per page; model latency {args.latency} s "
+          f"+ {args.token_latency} s/word, news latency {args.news_latency} s")
+    print(f"{'page':<13} {'turns':>5} {'errors':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'max s':>7} "
+          f"{'turns/s':>8} {'calls/turn':>10}  tool calls")
+    for r in reports:
+        tools = ", ".join(f"{name} {n}" for name, n in sorted(r["tool_calls"].items())) or "-"
+        print(f"{r['page']:<13} {r['turns']:>5} {r['errors']:>6} {r['p50']:>7.2f} {r['p95']:>7.2f} {r['p99']:>7.2f} "
+              f"{r['max']:>7.2f} {r['throughput']:>8.2f} {r['model_calls'] / max(r['turns'], 1):>10.1f}  {tools}")
+    for r in reports:
+        for sample in r["samples"]:
+            if sample["error"]:
+                print(f"{r['page']} session {sample['session']} turn {sample['turn']}: {sample['error']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"arguments": vars(args), "pages": reports}, f, indent=2)
+        print(f"Wrote {args.output}")
+    data.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Benchmark suite for the coding.tools search and fetch paths, with JSON results.
+
+Times search_news (scan and indexed), PreparedNews.search, search_expert,
+search_textbook, the AG_* tool wrappers (uncached and cache hits) and
+fetch_all_news / NewsStore.refresh, on synthetic news frames and catalogs
+of every --sizes size. Catalogs are written to catalog files and news to a
+NewsStore in a temporary directory and loaded the way the app loads them;
+fetches go to the local news stub with --latency seconds per request, so
+the suite runs offline.
+
+Results (per case: name, size, parameters, seconds per call as min /
+median / mean, calls timed) are written as JSON together with the commit,
+Python and library versions. --compare prints the ratio to an earlier
+results file and exits with status 1 if any case is slower than
+--threshold times its old median. Run from the repository root:
+
+    python -m benchmarks.suite --sizes 1000 10000 100000 --output bench_results/new.json
+    python -m benchmarks.suite --only search --compare bench_results/old.json
+"""
+import argparse
+import fnmatch
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from benchmarks.synthetic import expert_records, news_records, textbook_records
+import coding.catalog as catalog
+import coding.newsfeed as newsfeed
+from coding.agenttools import AG_search_expert, AG_search_news, AG_search_textbook
+from coding.catalog import write_catalog
+from coding.newsfeed import NewsFeed
+from coding.newsframe import PreparedNews
+from coding.newsstore import NewsStore
+from coding.stubserver import news_stub, paginate
+from coding.tools import build_news_index, fetch_all_news, search_expert, search_news, search_textbook
+
+NEWS_QUERIES = {
+    "word": dict(query="semiconductor"),
+    "phrase": dict(query="chip market"),
+    "hanzi": dict(query="半導體"),
+    "sections": dict(query="typhoon", sections=["Taiwan News", "Front Page"]),
+    "dates": dict(query="election", date_from="2024-01-01", date_to="2024-06-30"),
+    "miss": dict(query="no such phrase anywhere"),
+}
+EXPERT_QUERIES = {
+    "name": dict(name="gan"),
+    "discipline": dict(discipline="Digital Sociology"),
+    "interest": dict(interest="privacy"),
+}
+AG_EXPERT_QUERIES = {
+    "disciplines": dict(discipline=["Digital Sociology", "Computational Social Science"]),
+    "interests": dict(name="gan", interest=["privacy", "trade", "chip"]),
+}
+TEXTBOOK_QUERIES = {
+    "title": dict(title="vol. 12"),
+    "discipline": dict(discipline="Technology and Society"),
+}
+AG_TEXTBOOK_QUERIES = {
+    "discipline+expert": dict(discipline=["Technology and Society"], related_expert=["ka"]),
+}
+PAGE_SIZE = 20
+# A sample of a case is at least this long; fast calls are repeated within it.
+MIN_SAMPLE_SECONDS = 0.005
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Seconds per call of `fn`: `repeat` samples, each of enough calls to last MIN_SAMPLE_SECONDS."""
+    fn()  # warm up, and fail before timing if the case is broken
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SAMPLE_SECONDS or number >= 1 << 20:
+            break
+        number *= 2
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {"min": min(samples), "median": statistics.median(samples), "mean": statistics.fmean(samples),
+            "samples": len(samples), "number": number}
+
+
+class Suite:
+    def __init__(self, repeat: int, only: Optional[List[str]]):
+        self.repeat = repeat
+        self.only = only
+        self.results: List[Dict[str, Any]] = []
+
+    def wanted(self, name: str) -> bool:
+        return not self.only or any(fnmatch.fnmatch(name, f"*{pattern}*") for pattern in self.only)
+
+    def run(self, name: str, size: int, params: Dict[str, Any], fn: Callable[[], Any]):
+        if not self.wanted(name):
+            return
+        self._add({"name": name, "size": size, "params": params, **measure(fn, self.repeat)})
+
+    def record(self, name: str, size: int, params: Dict[str, Any], seconds: float):
+        """Add a one-off timing, e.g. of a load that only happens once per process."""
+        if self.wanted(name):
+            self._add({"name": name, "size": size, "params": params, "min": seconds, "median": seconds,
+                       "mean": seconds, "samples": 1, "number": 1})
+
+    def _add(self, result: Dict[str, Any]):
+        self.results.append(result)
+        name, size, params = result["name"], result["size"], result["params"]
+        label = ", ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{name:<28} {size:>8} {label[:44]:<44} {result['median'] * 1e3:>10.3f} ms")
+
+
+def bench_news(suite: Suite, size: int, directory: str):
+    records = news_records(size)
+    df = pd.DataFrame(records).sort_values(by='ar_id', ascending=False).reset_index(drop=True)
+    index = build_news_index(df)
+    prepared = PreparedNews(df)
+    store = NewsStore(os.path.join(directory, f"news-{size}.sqlite"))
+    store.upsert(records)
+    # AG_search_news reads the process-wide feed; this one never refreshes from the network during the run.
+    newsfeed._default_feed = NewsFeed(store=store, ttl=24 * 3600)
+    newsfeed._default_feed.current()
+
+    # The tool undecorated: no tracing span, no cache.
+    uncached = inspect.unwrap(AG_search_news)
+    for label, query in NEWS_QUERIES.items():
+        suite.run("search_news/scan", size, {"case": label}, lambda: search_news(df, **query))
+        suite.run("search_news/index", size, {"case": label}, lambda: search_news(df, text_index=index, **query))
+        suite.run("PreparedNews.search", size, {"case": label}, lambda: prepared.search(**query))
+        suite.run("AG_search_news/uncached", size, {"case": label}, lambda: uncached(**query))
+        suite.run("AG_search_news/cached", size, {"case": label}, lambda: AG_search_news(**query))
+    newsfeed._default_feed.stop()
+    newsfeed._default_feed = None
+
+
+def bench_catalogs(suite: Suite, size: int, directory: str):
+    experts = expert_records(size)
+    textbooks = textbook_records(size, experts)
+    catalog.EXPERTS_CATALOG_PATH = write_catalog(experts, os.path.join(directory, f"experts-{size}.jsonl"))
+    catalog.TEXTBOOKS_CATALOG_PATH = write_catalog(textbooks, os.path.join(directory, f"textbooks-{size}.jsonl"))
+    catalog.expert_catalog.cache_clear()
+    catalog.textbook_catalog.cache_clear()
+    start = time.perf_counter()
+    catalog.expert_catalog().index, catalog.textbook_catalog().index
+    suite.record("catalog/load+index", size, {}, time.perf_counter() - start)
+
+    for label, query in EXPERT_QUERIES.items():
+        suite.run("search_expert", size, {"case": label}, lambda: search_expert(**query))
+    uncached_expert, uncached_textbook = inspect.unwrap(AG_search_expert), inspect.unwrap(AG_search_textbook)
+    for label, query in AG_EXPERT_QUERIES.items():
+        suite.run("AG_search_expert/uncached", size, {"case": label}, lambda: uncached_expert(**query))
+        suite.run("AG_search_expert/cached", size, {"case": label}, lambda: AG_search_expert(**query))
+    for label, query in TEXTBOOK_QUERIES.items():
+        suite.run("search_textbook", size, {"case": label}, lambda: search_textbook(**query))
+    for label, query in AG_TEXTBOOK_QUERIES.items():
+        suite.run("AG_search_textbook/uncached", size, {"case": label}, lambda: uncached_textbook(**query))
+        suite.run("AG_search_textbook/cached", size, {"case": label}, lambda: AG_search_textbook(**query))
+    AG_search_expert.cache_clear()
+    AG_search_textbook.cache_clear()
+
+
+def bench_fetch(suite: Suite, pages_list: List[int], latency: float, directory: str):
+    articles = news_records(max(pages_list) * PAGE_SIZE)
+    articles.sort(key=lambda a: a["ar_id"], reverse=True)
+    with news_stub(paginate(articles, PAGE_SIZE), latency=latency) as stub:
+        for pages in pages_list:
+            params = {"pages": pages, "latency": latency}
+            suite.run("fetch_all_news", pages * PAGE_SIZE, params,
+                      lambda: fetch_all_news(1, pages, base_url=stub.base_url))
+            suite.run("fetch_all_news/sequential", pages * PAGE_SIZE, params,
+                      lambda: fetch_all_news(1, pages, base_url=stub.base_url, max_workers=1))
+
+            def cold_refresh():
+                path = os.path.join(directory, "refresh.sqlite")
+                if os.path.exists(path):
+                    os.remove(path)
+                NewsStore(path, base_url=stub.base_url).refresh(max_pages=pages)
+
+            suite.run("NewsStore.refresh/cold", pages * PAGE_SIZE, params, cold_refresh)
+            warm = NewsStore(os.path.join(directory, f"warm-{pages}.sqlite"), base_url=stub.base_url)
+            warm.refresh(max_pages=pages)
+            suite.run("NewsStore.refresh/warm", pages * PAGE_SIZE, params, lambda: warm.refresh(max_pages=pages))
+
+
+def environment() -> Dict[str, Any]:
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now().astimezone().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def case_key(result: Dict[str, Any]) -> str:
+    return json.dumps([result["name"], result["size"], result["params"]], sort_keys=True, ensure_ascii=False)
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> bool:
+    """Print new/old median ratios; returns whether any case regressed past `threshold`."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {case_key(r): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline_path} (commit {str(baseline['environment'].get('commit'))[:10]}):")
+    regressed = False
+    for result in results:
+        before = old.get(case_key(result))
+        if before is None:
+            continue
+        ratio = result["median"] / before["median"] if before["median"] else float("inf")
+        flag = "REGRESSION" if ratio > threshold else ("faster" if ratio < 1 / threshold else "")
+        regressed |= ratio > threshold
+        label = ", ".join(f"{k}={v}" for k, v in result["params"].items())
+        print(f"{result['name']:<28} {result['size']:>8} {label[:44]:<44} {ratio:>6.2f}x {flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Articles / catalog records per data set.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20], help="Pages per fetch case.")
+    parser.add_argument("--latency", type=float, default=0.02, help="News stub latency per request, seconds.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed samples per case.")
+    parser.add_argument("--only", nargs="+", help="Run only cases whose name contains one of these (glob) patterns.")
+    parser.add_argument("--output", help="Results file (default: bench_results/<commit>.json).")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown counted as a regression.")
+    args = parser.parse_args()
+
+    env = environment()
+    suite = Suite(args.repeat, args.only)
+    print(f"{'case':<28} {'size':>8} {'parameters':<44} {'median':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            bench_news(suite, size, directory)
+            bench_catalogs(suite, size, directory)
+        bench_fetch(suite, args.pages, args.latency, directory)
+
+    output = args.output or os.path.join("bench_results", f"{(env['commit'] or 'unknown')[:12]}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"environment": env, "arguments": vars(args), "results": suite.results}, f,
+                  ensure_ascii=False, indent=1)
+    print(f"\nWrote {len(suite.results)} results to {output}")
+
+    if args.compare and compare(suite.results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Deterministic synthetic data for the benchmarks.
+"""
+import random
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from coding.stubserver import make_article
+
+SECTIONS = ['Taiwan News', 'World News', 'Sports', 'Front Page', 'Features', 'Editorials', 'Business', 'Bilingual Pages']
+TOPIC_WORDS = (
+    "taiwan china trade chip semiconductor election policy market energy typhoon baseball "
+    "legislature minister tariff export university students climate health vaccine police "
+    "court rail airport tourism culture festival museum ocean navy drill summit budget bank "
+    "inflation housing rent labor wage startup software ai data privacy cyber security"
+).split()
+SYLLABLES = "ka ri to mo na shi lu ven tor sa pe qui dra lon mi ber gan fel os ti".split()
+
+
+def _vocabulary(rng: random.Random, size: int = 20_000) -> List[str]:
+    """Topic words plus pseudo-words; rank-ordered so `zipf_weights` makes early words common."""
+    words = list(TOPIC_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    rng.shuffle(words)
+    return words
+
+
+def _zipf_weights(size: int) -> List[float]:
+    return [1.0 / (rank + 1) for rank in range(size)]
+
+
+HANZI = "台灣中國經濟半導體選舉政策市場能源颱風棒球立法院部長關稅出口大學學生氣候健康疫苗警察法院鐵路機場觀光文化"
+
+
+def news_records(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """`n` articles with Zipf-distributed English/Chinese text, sections and dates spread over ~3 years."""
+    rng = random.Random(seed)
+    words = _vocabulary(rng)
+    weights = _zipf_weights(len(words))
+    records = []
+    for ar_id in range(1, n + 1):
+        head = " ".join(rng.choices(words, weights, k=6)) + " " + "".join(rng.choices(HANZI, k=4))
+        desc = " ".join(rng.choices(words, weights, k=20)) + " " + "".join(rng.choices(HANZI, k=12))
+        pubdate = pd.Timestamp("2023-01-01") + pd.Timedelta(days=rng.randrange(1000))
+        records.append(make_article(ar_id, rng.choice(SECTIONS), pubdate.strftime("%Y-%m-%d"), head, desc))
+    return records
+
+
+def news_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    """A frame shaped like fetch_all_news output: newest `ar_id` first."""
+    df = pd.DataFrame(news_records(n, seed))
+    return df.sort_values(by='ar_id', ascending=False).reset_index(drop=True)
+
+
+DISCIPLINES = [
+    "Digital Sociology", "Information Systems Strategy", "Technology and Society",
+    "Human-Computer Interaction (HCI)", "Computational Social Science", "Social Network Analysis",
+    "Information Systems", "Tech Policy / Ethics", "UX and Accessibility", "Agent-Based Modeling",
+]
+
+
+def expert_records(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """`n` experts shaped like EXPERTS_LIST entries, with unique names and emails."""
+    rng = random.Random(seed)
+    words = _vocabulary(rng, 5_000)
+    records = []
+    for i in range(n):
+        name = f"{rng.choice(words).title()} {rng.choice(words).title()} {i}"
+        records.append({
+            "NAME": name,
+            "EMAIL": f"expert{i}@example.org",
+            "URL": f"www.expert{i}.example.org",
+            "DISCIPLINE": rng.choice(DISCIPLINES),
+            "CHARACTERISTIC": " and ".join(rng.choices(words, k=2)),
+            "DESCRIPTION": " ".join(rng.choices(words, k=15)),
+            "INTEREST": ", ".join(rng.choices(words + TOPIC_WORDS, k=3)),
+        })
+    return records
+
+
+def textbook_records(n: int, experts: List[Dict[str, Any]], seed: int = 0) -> List[Dict[str, Any]]:
+    """`n` textbooks shaped like TEXTBOOK_LIST entries, each related to one of `experts`."""
+    rng = random.Random(seed)
+    words = _vocabulary(rng, 5_000)
+    return [{
+        "TITLE": f"{' '.join(rng.choices(words, k=4)).title()} Vol. {i}",
+        "AUTHOR": rng.choice(experts)["NAME"],
+        "DISCIPLINE": rng.choice(DISCIPLINES),
+        "DESCRIPTION": " ".join(rng.choices(words, k=15)),
+        "RELATED_EXPERT": rng.choice(experts)["NAME"],
+    } for i in range(n)]
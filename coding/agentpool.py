@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from autogen import ConversableAgent
+
+# Idle agent sets kept per (language, model) of a page; 0 builds fresh agents for every turn.
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "4"))
+
+Agents = Dict[str, Any]
+
+_session: ContextVar[Optional[SimpleNamespace]] = ContextVar("agent_pool_session", default=None)
+
+
+def current_session() -> SimpleNamespace:
+    """
+    Per-session state bound by `AgentPool.acquire`, for reply functions of pooled agents.
+
+    Pooled agents outlive the Streamlit run that built them, so their reply
+    functions must not capture that run's containers. They look them up here
+    instead, e.g. `current_session().container.chat_message("ai")`.
+
+    Raises:
+        RuntimeError: If called outside an `acquire` block.
+    """
+    session = _session.get()
+    if session is None:
+        raise RuntimeError("No session bound; call this inside AgentPool.acquire().")
+    return session
+
+
+class PoolStats(NamedTuple):
+    builds: int
+    reuses: int
+    idle: int
+    build_seconds: float
+
+
+class _Pooled(NamedTuple):
+    agents: Agents
+    hooks: Dict[str, Dict[str, List[Callable]]]
+
+
+class AgentPool:
+    """
+    Agents of one page, built once per (language, model) and reused across reruns and sessions.
+
+    `builder(lang, model)` returns a dict of everything a page needs for a
+    turn: agents, patterns, user proxies, with their tools and reply
+    functions already registered. A set is checked out by one session at a
+    time, so concurrent sessions never share chat state; `release` clears the
+    agents' chat history and drops hooks added during the turn (autogen's
+    group chat registers new ones on every run) before the set goes back.
+
+    Example:
+        pool = get_agent_pool("two_agents", build_agents)
+        with pool.acquire(lang, model, container=st_c_chat) as agents:
+            agents["student"].initiate_chat(agents["teacher"], message=prompt)
+    """
+
+    def __init__(self, page: str, builder: Callable[[str, str], Agents], max_idle: int = AGENT_POOL_SIZE):
+        self.page = page
+        self.builder = builder
+        self.max_idle = max_idle
+        self._idle: Dict[Tuple[str, str], List[_Pooled]] = {}
+        self._lock = threading.Lock()
+        # Builders enter the page's module-level LLMConfig (`with llm_config:`), which keeps
+        # one context token on the instance, so two threads must not build at once.
+        self._build_lock = threading.Lock()
+        self._builds = 0
+        self._reuses = 0
+        self._build_seconds = 0.0
+
+    def _build(self, lang: str, model: str) -> _Pooled:
+        start = time.perf_counter()
+        with self._build_lock:
+            agents = self.builder(lang, model)
+        hooks = {name: {method: list(fns) for method, fns in agent.hook_lists.items()}
+                 for name, agent in agents.items() if isinstance(agent, ConversableAgent)}
+        with self._lock:
+            self._builds += 1
+            self._build_seconds += time.perf_counter() - start
+        return _Pooled(agents, hooks)
+
+    @staticmethod
+    def _reset(pooled: _Pooled):
+        for name, agent in pooled.agents.items():
+            if isinstance(agent, ConversableAgent):
+                agent.clear_history()
+                agent.hook_lists = {method: list(fns) for method, fns in pooled.hooks[name].items()}
+
+    @contextmanager
+    def acquire(self, lang: str, model: str, **session: Any) -> Iterator[Agents]:
+        """
+        Check out an agent set for (`lang`, `model`), building one if none is idle.
+
+        The keyword arguments are bound as `current_session()` for the duration
+        of the block. The set is returned to the pool on exit, also on errors.
+        """
+        key = (lang, model)
+        with self._lock:
+            idle = self._idle.get(key)
+            pooled = idle.pop() if idle else None
+            if pooled is not None:
+                self._reuses += 1
+        if pooled is None:
+            pooled = self._build(lang, model)
+
+        token = _session.set(SimpleNamespace(**session))
+        try:
+            yield pooled.agents
+        finally:
+            _session.reset(token)
+            self._reset(pooled)
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    idle.append(pooled)
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            idle = sum(len(sets) for sets in self._idle.values())
+            return PoolStats(self._builds, self._reuses, idle, self._build_seconds)
+
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
+
+
+_pools: Dict[str, AgentPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_agent_pool(page: str, builder: Callable[[str, str], Agents]) -> AgentPool:
+    """
+    Return the process-wide AgentPool of `page`, creating it with `builder` on first use.
+
+    Streamlit re-executes page scripts on every rerun, so a later call passes
+    a new but equivalent `builder`; the pool keeps the first one.
+    """
+    with _pools_lock:
+        if page not in _pools:
+            _pools[page] = AgentPool(page, builder)
+        return _pools[page]
@@ -1,47 +1,51 @@
 from typing import List, Dict, Optional, Any, Annotated
-from coding.tools import search_expert, search_textbook, search_news, fetch_all_news
+from coding.catalog import expert_catalog, textbook_catalog
+from coding.newsfeed import get_news_feed
+from coding.toolcache import tool_cache
+from coding.tracing import traced
 from datetime import datetime
+import os
 import streamlit as st
 
+# Seconds a tool result may be reused: news changes within minutes, catalogs rarely.
+NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", "60"))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "3600"))
+
+@traced(kind="tool", arguments=True)
+@tool_cache(ttl=CATALOG_CACHE_TTL)
 def AG_search_expert(
     name: Annotated[Optional[str], "Expert name."] = None,
     discipline: Annotated[Optional[List[str]], "List of input strings containing disciplines to filter by."] = None,
     interest: Annotated[Optional[List[str]], "List of input strings containing interests to filter by."] = None
 ):
     """
-    Wrapper around search_expert that accepts lists for discipline and interest.
+    Wrapper around the expert catalog that accepts lists for discipline and interest.
     """
-    # If multiple disciplines or interests are provided, return experts matching ANY of them
-    matched = []
-    for d in (discipline or []):
-        matched.extend(search_expert(name=name, discipline=d, interest=None))
-    for i in (interest or []):
-        matched.extend(search_expert(name=name, discipline=None, interest=i))
-    # If no lists provided, fall back to single-value search
-    if not discipline and not interest:
-        matched = search_expert(name=name)
-    # Deduplicate results
-    unique = {expert["EMAIL"]: expert for expert in matched if "EMAIL" in expert}
-    return list(unique.values())
+    # Experts matching the name or ANY of the disciplines or interests, deduplicated by EMAIL
+    return expert_catalog().search_many(
+        "EMAIL",
+        single={"NAME": name},
+        multi={"DISCIPLINE": discipline, "INTEREST": interest},
+    )
 
+@traced(kind="tool", arguments=True)
+@tool_cache(ttl=CATALOG_CACHE_TTL)
 def AG_search_textbook(
     title: Annotated[Optional[str], "Textbook title."] = None,
     discipline: Annotated[Optional[List[str]], "List of input strings containing disciplines to filter by."] = None,
     related_expert: Annotated[Optional[List[str]], "List of input strings containing related expert names to filter by."] = None
 ):
     """
-    Wrapper around search_textbook that accepts lists for discipline and related_expert.
+    Wrapper around the textbook catalog that accepts lists for discipline and related_expert.
     """
-    matched = []
-    for d in (discipline or []):
-        matched.extend(search_textbook(title=title, discipline=d, related_expert=None))
-    for e in (related_expert or []):
-        matched.extend(search_textbook(title=title, discipline=None, related_expert=e))
-    if not discipline and not related_expert:
-        matched = search_textbook(title=title)
-    unique = {tb["TITLE"]: tb for tb in matched if "TITLE" in tb}
-    return list(unique.values())
+    return textbook_catalog().search_many(
+        "TITLE",
+        single={"TITLE": title},
+        multi={"DISCIPLINE": discipline, "RELATED_EXPERT": related_expert},
+    )
 
+@traced(kind="tool", arguments=True)
+@tool_cache(ttl=NEWS_CACHE_TTL, case_sensitive=("search_columns", "sections"))
 def AG_search_news(
     query: Annotated[
         Optional[str],
@@ -65,13 +69,12 @@ def AG_search_news(
     ] = None
 ) -> List[Dict[str, Any]]:
     """
-    Tool wrapper: takes a list-of-dicts, runs search_news, returns list-of-dicts.
+    Tool wrapper: searches the process-wide news snapshot, returns list-of-dicts.
     """
-    df = fetch_all_news(1,5,list_type='all')
+    news = get_news_feed().current().news
 
     # Apply search
-    result_df = search_news(
-        df=df,
+    result_df = news.search(
         query=query,
         search_columns=search_columns,
         sections=sections,
@@ -81,6 +84,7 @@ def AG_search_news(
     # Return as plain JSON-serializable list
     return result_df.to_dict(orient="records")
 
+@traced(kind="tool")
 def get_time() -> str:
         """
         Get the current time formatted as a string.
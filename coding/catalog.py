@@ -0,0 +1,241 @@
+import argparse
+import json
+import mmap
+import os
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from coding.constant import EXPERTS_LIST, TEXTBOOK_LIST
+from coding.textindex import InvertedIndex
+
+EXPERT_FIELDS = ("NAME", "DISCIPLINE", "INTEREST")
+TEXTBOOK_FIELDS = ("TITLE", "DISCIPLINE", "RELATED_EXPERT")
+# Optional catalog files (.jsonl or .arrow) used instead of the constants in coding/constant.py.
+EXPERTS_CATALOG_PATH = os.getenv("EXPERTS_CATALOG_PATH")
+TEXTBOOKS_CATALOG_PATH = os.getenv("TEXTBOOKS_CATALOG_PATH")
+
+
+class JsonlRecords(Sequence[Dict[str, Any]]):
+    """
+    Read-only list of dict records backed by a memory-mapped JSONL file.
+
+    Opening only maps the file and records where each line starts; a record
+    is parsed when it is accessed. The mapping is read-only, so every process
+    serving the same file shares its pages through the OS page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        self._starts = array("q")
+        pos, size = 0, len(self._mm)
+        while pos < size:
+            end = self._mm.find(b"\n", pos)
+            end = size if end == -1 else end
+            if end > pos:
+                self._starts.append(pos)
+            pos = end + 1
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _line(self, i: int) -> bytes:
+        start = self._starts[i]
+        end = self._mm.find(b"\n", start)
+        return self._mm[start:] if end == -1 else self._mm[start:end]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return json.loads(self._line(i))
+
+    def column(self, field: str) -> List[Any]:
+        return [record.get(field) for record in self]
+
+
+class ArrowRecords(Sequence[Dict[str, Any]]):
+    """
+    Read-only list of dict records backed by a memory-mapped Arrow IPC (Feather v2) file.
+
+    Columns are used in place from the mapping, so building a CatalogIndex
+    touches only its searchable columns and a record is materialized only
+    when it is returned. Needs the optional `pyarrow` package.
+    """
+
+    def __init__(self, path: str):
+        import pyarrow as pa
+
+        self.path = path
+        self._table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+    def __len__(self) -> int:
+        return self._table.num_rows
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return self._table.slice(i, 1).to_pylist()[0]
+
+    def column(self, field: str) -> List[Any]:
+        return self._table.column(field).to_pylist()
+
+
+def load_catalog(path: str) -> Sequence[Dict[str, Any]]:
+    """
+    Open a catalog file as a lazily-read sequence of dict records.
+
+    Args:
+        path (str): A `.jsonl` file (one record per line) or an `.arrow`/`.feather` file.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".jsonl":
+        return JsonlRecords(path)
+    if ext in (".arrow", ".feather"):
+        return ArrowRecords(path)
+    raise ValueError(f"Unsupported catalog format: {path}")
+
+
+def write_catalog(records: Sequence[Dict[str, Any]], path: str) -> str:
+    """Write records to a `.jsonl` or `.arrow` catalog file readable by load_catalog."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    elif ext in (".arrow", ".feather"):
+        import pyarrow as pa
+
+        table = pa.Table.from_pylist(list(records))
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Unsupported catalog format: {path}")
+    return path
+
+
+class CatalogIndex:
+    """
+    Case-insensitive substring search over a list of catalog records.
+
+    Records keep their original dicts and order; the searchable fields are
+    lowercased once and held in an InvertedIndex keyed by record position,
+    so a lookup costs a few posting-set operations instead of a scan.
+
+    `records` may be a plain list or a lazy sequence from load_catalog. The
+    index is built on the first query, reading only the searchable fields
+    through the sequence's `column` method when it has one.
+    """
+
+    def __init__(self, records: Sequence[Dict[str, Any]], fields: Sequence[str]):
+        self.records = records
+        self.fields = tuple(fields)
+        self._index: Optional[InvertedIndex] = None
+
+    @property
+    def index(self) -> InvertedIndex:
+        if self._index is None:
+            index = InvertedIndex(self.fields)
+            if hasattr(self.records, "column"):
+                columns = [self.records.column(f) for f in self.fields]
+                for pos, values in enumerate(zip(*columns)):
+                    index.add(pos, dict(zip(self.fields, values)))
+            else:
+                for pos, record in enumerate(self.records):
+                    index.add(pos, record)
+            self._index = index
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def matches(self, field: str, value: Optional[str]) -> Set[int]:
+        """Positions of records whose `field` contains `value`; nothing for an empty value."""
+        if not value:
+            return set()
+        return self.index.search(value, [field])
+
+    def search(self, **criteria: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Records matching ANY of the given field=value criteria, in catalog order.
+
+        Example:
+            >>> expert_catalog().search(NAME="gild", DISCIPLINE="sociology")
+        """
+        positions: Set[int] = set()
+        for field, value in criteria.items():
+            positions |= self.matches(field, value)
+        return [self.records[pos] for pos in sorted(positions)]
+
+    def search_many(self,
+                    dedup_key: str,
+                    single: Optional[Dict[str, Optional[str]]] = None,
+                    multi: Optional[Dict[str, Optional[List[str]]]] = None) -> List[Dict[str, Any]]:
+        """
+        Answer a list-valued query in one pass, deduplicated by `dedup_key`.
+
+        Equivalent to calling `search(**single, field=value)` for every value
+        of every `multi` field in turn (or `search(**single)` alone when all
+        lists are empty), concatenating the results and keeping one record
+        per `dedup_key`, in order of first appearance. The `single` matches
+        are computed once and shared by every value.
+
+        Args:
+            dedup_key (str): Field that identifies a record, e.g. 'EMAIL' or 'TITLE'.
+            single (dict, optional): Scalar criteria ORed into every value's query.
+            multi (dict, optional): Field -> list of values, each value its own query.
+        """
+        base: Set[int] = set()
+        for field, value in (single or {}).items():
+            base |= self.matches(field, value)
+
+        groups = [base | self.matches(field, value)
+                  for field, values in (multi or {}).items()
+                  for value in (values or [])]
+        if not any(values for values in (multi or {}).values()):
+            groups = [base]
+
+        seen: Set[int] = set()
+        unique: Dict[Any, Dict[str, Any]] = {}
+        for group in groups:
+            for pos in sorted(group - seen):
+                seen.add(pos)
+                record = self.records[pos]
+                if dedup_key in record:
+                    unique[record[dedup_key]] = record
+        return list(unique.values())
+
+
+@lru_cache(maxsize=None)
+def expert_catalog() -> CatalogIndex:
+    records = load_catalog(EXPERTS_CATALOG_PATH) if EXPERTS_CATALOG_PATH else EXPERTS_LIST["EXPERTS"]
+    return CatalogIndex(records, EXPERT_FIELDS)
+
+
+@lru_cache(maxsize=None)
+def textbook_catalog() -> CatalogIndex:
+    records = load_catalog(TEXTBOOKS_CATALOG_PATH) if TEXTBOOKS_CATALOG_PATH else TEXTBOOK_LIST["TEXTBOOKS"]
+    return CatalogIndex(records, TEXTBOOK_FIELDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the built-in catalogs to catalog files.")
+    parser.add_argument("output_dir", help="Directory for experts.<fmt> and textbooks.<fmt>.")
+    parser.add_argument("--format", choices=["jsonl", "arrow"], default="jsonl")
+    args = parser.parse_args()
+
+    for name, records in [("experts", EXPERTS_LIST["EXPERTS"]), ("textbooks", TEXTBOOK_LIST["TEXTBOOKS"])]:
+        path = write_catalog(records, os.path.join(args.output_dir, f"{name}.{args.format}"))
+        print(f"Wrote {len(records)} records to {path}")
+
+
+if __name__ == "__main__":
+    main()
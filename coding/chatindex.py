@@ -0,0 +1,300 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from coding.chatlog import CHAT_LOG_DIR, archive_paths, legacy_records, log_paths
+
+CHAT_INDEX_PATH = os.getenv("CHAT_INDEX_PATH", os.path.join("data", "chat_index.sqlite"))
+INGEST_BATCH = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    uid INTEGER NOT NULL UNIQUE,
+    ts TEXT NOT NULL,
+    day TEXT NOT NULL,
+    session TEXT,
+    profile TEXT,
+    role TEXT,
+    name TEXT,
+    page TEXT,
+    content TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    latency REAL
+);
+CREATE INDEX IF NOT EXISTS messages_day ON messages (day);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(text, content='', tokenize='unicode61');
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT NOT NULL,
+    role TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    chars INTEGER NOT NULL,
+    PRIMARY KEY (day, role)
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS messages_indexed AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, text) VALUES (NEW.id, fts_text(NEW.content));
+    INSERT INTO daily (day, role, messages, chars) VALUES (NEW.day, COALESCE(NEW.role, ''), 1, NEW.length)
+        ON CONFLICT (day, role) DO UPDATE SET messages = messages + 1, chars = chars + excluded.chars;
+END;
+"""
+
+# Han, kana and hangul have no spaces between words; each character becomes a token and
+# a query term a phrase of characters, so any substring of a sentence can be found.
+_CJK = re.compile(r"([぀-ヿ㐀-䶿一-鿿가-힯豈-﫿])")
+
+
+def fts_text(text: Optional[str]) -> str:
+    return _CJK.sub(r" \1 ", text or "")
+
+
+def fts_query(query: str) -> str:
+    """An FTS5 MATCH expression requiring every whitespace-separated term of `query`, as a phrase."""
+    phrases = []
+    for term in query.split():
+        tokens = re.findall(r"\w+", fts_text(term))
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"')
+    return " ".join(phrases)
+
+
+def record_uid(record: Dict[str, Any]) -> int:
+    """
+    64-bit id of a log record, from its time, session, speaker and content.
+
+    The same message read again (a segment re-read after a restart, a
+    migrated legacy file, a compacted copy) gets the same id and is stored once.
+    """
+    key = json.dumps([record.get("ts"), record.get("session"), record.get("role"), record.get("name"),
+                      record.get("content")], ensure_ascii=False, default=str)
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def _row(record: Dict[str, Any]) -> Optional[Tuple]:
+    content = record.get("content")
+    ts = record.get("ts")
+    if not content or not isinstance(ts, str):
+        return None
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False)
+    return (record_uid(record), ts, ts[:10], record.get("session"), record.get("profile"), record.get("role"),
+            record.get("name"), record.get("page"), content, len(content), record.get("latency"))
+
+
+class IngestStats(NamedTuple):
+    files: int
+    records: int
+    added: int
+
+
+class ChatIndex:
+    """
+    SQLite index of the chat logs: full-text search plus per-day, per-role aggregates.
+
+    `ingest` reads only what is new since the last run: the unread tail of
+    each JSONL segment (segments are append-only, so a byte offset per file
+    is kept) and legacy JSON files not seen before. Every record is stored
+    once, keyed by `record_uid`. Queries never touch the log files.
+
+    Counts and answer lengths come from the `daily` table, kept up to date
+    by an insert trigger, so they cost one row per day and role however
+    many messages there are; searches go through an FTS5 index.
+    """
+
+    def __init__(self, path: str = CHAT_INDEX_PATH, log_dir: str = CHAT_LOG_DIR):
+        self.path = path
+        self.log_dir = log_dir
+        self._ingest_lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.create_function("fts_text", 1, fts_text, deterministic=True)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _insert(self, conn: sqlite3.Connection, records: List[Dict[str, Any]]) -> int:
+        rows = [row for row in map(_row, records) if row is not None]
+        if not rows:
+            return 0
+        cursor = conn.executemany("INSERT OR IGNORE INTO messages (uid, ts, day, session, profile, role, name, "
+                                  "page, content, length, latency) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return cursor.rowcount
+
+    def _ingest_lines(self, conn: sqlite3.Connection, path: str, offset: int) -> Tuple[int, int, int]:
+        records, read, added = [], 0, 0
+        with open(path, "rb") as raw:
+            raw.seek(offset)
+            compressed = path.endswith(".gz")
+            # Compaction appends whole gzip members, so the unread part of an archive is itself a gzip stream.
+            f = gzip.GzipFile(fileobj=raw) if compressed else raw
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # a batch still being written; read it next time
+                if not compressed:
+                    offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(records) >= INGEST_BATCH:
+                    added += self._insert(conn, records)
+                    read += len(records)
+                    records = []
+            added += self._insert(conn, records)
+            if compressed:
+                offset = raw.tell()
+        return read + len(records), added, offset
+
+    def ingest(self, log_dir: Optional[str] = None) -> IngestStats:
+        """
+        Index chat log records written since the last call.
+
+        Returns:
+            IngestStats: Files read, records read and records that were new.
+        """
+        log_dir = log_dir or self.log_dir
+        paths = archive_paths(log_dir) + log_paths(log_dir)
+        files = records = added = 0
+        with self._ingest_lock, self._connect() as conn:
+            known = {path: (size, mtime, offset) for path, size, mtime, offset in
+                     conn.execute("SELECT path, size, mtime, offset FROM files")}
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                size, mtime, offset = known.get(path, (0, 0.0, 0))
+                if stat.st_size == size and stat.st_mtime == mtime:
+                    continue
+                try:
+                    if path.endswith(".json"):
+                        batch = legacy_records(path)
+                        read, new, offset = len(batch), self._insert(conn, batch), stat.st_size
+                    else:
+                        read, new, offset = self._ingest_lines(conn, path, offset if stat.st_size >= offset else 0)
+                except (OSError, ValueError, EOFError) as e:
+                    print(f"Skipping chat log {path}: {e}")
+                    continue
+                conn.execute("INSERT OR REPLACE INTO files (path, size, mtime, offset) VALUES (?, ?, ?, ?)",
+                             (path, stat.st_size, stat.st_mtime, offset))
+                files += 1
+                records += read
+                added += new
+            # Files compacted or removed by retention since; their messages stay indexed.
+            gone = [(path,) for path in known.keys() - set(paths)]
+            conn.executemany("DELETE FROM files WHERE path = ?", gone)
+        return IngestStats(files, records, added)
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(messages), 0) FROM daily").fetchone()[0]
+
+    def search(self,
+               query: str,
+               limit: int = 20,
+               role: Optional[str] = None,
+               profile: Optional[str] = None,
+               since: Optional[str] = None,
+               until: Optional[str] = None) -> pd.DataFrame:
+        """
+        Newest messages matching every term of `query`.
+
+        FTS5 walks its matches newest first, so a limited search stops
+        after `limit` hits instead of ranking every match in the index.
+
+        Args:
+            query (str): Words or phrases; Chinese and Japanese text matches anywhere inside a message.
+            limit (int): Maximum number of rows.
+            role (str, optional): Only messages of this role.
+            profile (str, optional): Only messages of this profile.
+            since (str, optional): First day to include, 'YYYY-MM-DD'.
+            until (str, optional): Last day to include, 'YYYY-MM-DD'.
+
+        Returns:
+            pd.DataFrame: ts, session, profile, role, name, page, content and latency of each match.
+        """
+        match = fts_query(query)
+        columns = ["ts", "session", "profile", "role", "name", "page", "content", "latency"]
+        if not match:
+            return pd.DataFrame(columns=columns)
+        sql = ("SELECT m.ts, m.session, m.profile, m.role, m.name, m.page, m.content, m.latency "
+               "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid WHERE messages_fts MATCH ?")
+        params: List[Any] = [match]
+        for clause, value in (("m.role = ?", role), ("m.profile = ?", profile),
+                              ("m.day >= ?", since), ("m.day <= ?", until)):
+            if value is not None:
+                sql += f" AND {clause}"
+                params.append(value)
+        sql += " ORDER BY messages_fts.rowid DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            return pd.DataFrame(conn.execute(sql, params).fetchall(), columns=columns)
+
+    def daily_counts(self, since: Optional[str] = None, until: Optional[str] = None) -> pd.DataFrame:
+        """Messages per day and role: columns day, role, messages, avg_length."""
+        sql = "SELECT day, role, messages, CAST(chars AS REAL) / messages FROM daily WHERE 1 = 1"
+        params = []
+        if since is not None:
+            sql += " AND day >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND day <= ?"
+            params.append(until)
+        with self._connect() as conn:
+            rows = conn.execute(sql + " ORDER BY day, role", params).fetchall()
+        return pd.DataFrame(rows, columns=["day", "role", "messages", "avg_length"])
+
+    def role_counts(self) -> pd.DataFrame:
+        """Messages and average length per role: columns role, messages, avg_length."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT role, SUM(messages), CAST(SUM(chars) AS REAL) / SUM(messages) "
+                                "FROM daily GROUP BY role ORDER BY SUM(messages) DESC").fetchall()
+        return pd.DataFrame(rows, columns=["role", "messages", "avg_length"])
+
+    def average_answer_length(self, role: str = "assistant", since: Optional[str] = None,
+                              until: Optional[str] = None) -> Optional[float]:
+        """Average characters per message of `role`, or None if there is none."""
+        frame = self.daily_counts(since, until)
+        frame = frame[frame["role"] == role]
+        if frame.empty:
+            return None
+        return float((frame["avg_length"] * frame["messages"]).sum() / frame["messages"].sum())
+
+    def sessions(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(DISTINCT session) FROM messages").fetchone()[0]
+
+
+_default_index: Optional[ChatIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_chat_index() -> ChatIndex:
+    """Return the process-wide ChatIndex at CHAT_INDEX_PATH over CHAT_LOG_DIR, creating it on first use."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = ChatIndex()
+        return _default_index
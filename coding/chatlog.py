@@ -0,0 +1,515 @@
+import argparse
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+CHAT_LOG_DIR = os.getenv("CHAT_LOG_DIR", "chat_logs")
+# A segment is closed and a new one started once it grows past this size.
+CHAT_LOG_SEGMENT_BYTES = int(os.getenv("CHAT_LOG_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+# Longest a logged message waits in memory before the background thread writes it.
+CHAT_LOG_FLUSH_SECONDS = float(os.getenv("CHAT_LOG_FLUSH_SECONDS", "1.0"))
+CHAT_LOG_MAX_BATCH = 500
+# Segments and legacy files untouched for this many days are packed into the archive by `compact_logs`.
+CHAT_LOG_COMPACT_AFTER_DAYS = float(os.getenv("CHAT_LOG_COMPACT_AFTER_DAYS", "1"))
+# Days of chat logs kept; older messages are dropped by `compact_logs`. 0 keeps everything.
+CHAT_LOG_RETENTION_DAYS = int(os.getenv("CHAT_LOG_RETENTION_DAYS", "0"))
+
+SEGMENT_GLOB = "chat-*.jsonl"
+ARCHIVE_DIR = "archive"
+ARCHIVE_GLOB = "chat-*.jsonl.gz"
+LEGACY_NAME = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}-\d{2})\.json$")
+SEGMENT_NAME = re.compile(r"^chat-\d{8}-\d{6}-(\d+)-(\d+)\.jsonl$")
+
+_FLUSH = object()
+_STOP = object()
+
+
+def make_record(session_id: str,
+                profile: Optional[str],
+                role: str,
+                content: Any,
+                latency: Optional[float] = None,
+                ts: Optional[datetime] = None,
+                **extra: Any) -> Dict[str, Any]:
+    """
+    One chat log line.
+
+    Args:
+        session_id (str): Browser session (or any other conversation id).
+        profile (str, optional): Topic / profile the message belongs to.
+        role (str): Speaker role, e.g. "user", "student", "assistant" or an agent name.
+        content (Any): Message text (or structured content).
+        latency (float, optional): Seconds it took to produce the message, when known.
+        ts (datetime, optional): When the message was produced. Defaults to now.
+        **extra: Additional fields, e.g. `name` or `page`.
+    """
+    record = {
+        "ts": (ts or datetime.now()).astimezone().isoformat(timespec="milliseconds"),
+        "session": session_id,
+        "profile": profile,
+        "role": role,
+        "content": content,
+        "latency": round(latency, 3) if latency is not None else None,
+    }
+    record.update(extra)
+    return record
+
+
+class ChatLogWriter:
+    """
+    Appends chat messages as compact JSON lines to rotating segment files.
+
+    `log` only queues the record; a daemon thread collects what arrives
+    within `flush_interval` seconds (at most `max_batch` records) and
+    appends it to the current segment in one write. Segments are named
+    `chat-<time of first record>-<pid>-<n>.jsonl`, so they sort by time and
+    several processes never share a file. A write error is reported and the
+    batch dropped; logging never fails a chat turn.
+
+    Example:
+        writer = get_chat_log_writer()
+        writer.log(session_id, profile, "user", prompt)
+    """
+
+    def __init__(self,
+                 directory: str = CHAT_LOG_DIR,
+                 segment_bytes: int = CHAT_LOG_SEGMENT_BYTES,
+                 flush_interval: float = CHAT_LOG_FLUSH_SECONDS,
+                 max_batch: int = CHAT_LOG_MAX_BATCH):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.segment: Optional[str] = None
+        self.segments: List[str] = []
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._file = None
+        self._size = 0
+        self._seq = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _ensure_thread(self) -> bool:
+        with self._lock:
+            if self._closed:
+                return False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+                self._thread.start()
+            return True
+
+    def log(self, session_id: str, profile: Optional[str], role: str, content: Any,
+            latency: Optional[float] = None, **extra: Any):
+        """Queue one message; see `make_record` for the fields."""
+        self.write_record(make_record(session_id, profile, role, content, latency, **extra))
+
+    def log_messages(self, session_id: str, profile: Optional[str], messages: Iterable[Dict[str, Any]],
+                     latency: Optional[float] = None, **extra: Any):
+        """
+        Queue an autogen chat history (dicts with role, content and maybe name).
+
+        Tool messages and messages without content are skipped; `latency` is
+        recorded on the last message, the one that completed the turn.
+        """
+        messages = [m for m in messages if m.get("role") != "tool" and m.get("content")]
+        for i, m in enumerate(messages):
+            fields = dict(extra, name=m["name"]) if m.get("name") else extra
+            self.log(session_id, profile, m.get("role", "user"), m["content"],
+                     latency if i == len(messages) - 1 else None, **fields)
+
+    def write_record(self, record: Dict[str, Any]):
+        if not self._ensure_thread():
+            print("Chat log writer is closed; dropped a record.")
+            return
+        self._queue.put(record)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far. Returns False if `timeout` ran out first."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self):
+        """Write everything queued, stop the thread and close the segment."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self):
+        while True:
+            batch, markers = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP or isinstance(item, tuple):
+                    markers.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.max_batch or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                if marker is _STOP:
+                    self._close_segment()
+                    return
+                marker[1].set()
+
+    def _write(self, records: List[Dict[str, Any]]):
+        try:
+            if self._file is not None and os.fstat(self._file.fileno()).st_nlink == 0:
+                # The segment was removed under us (e.g. compacted); what is appended to it would be lost.
+                self._close_segment()
+            chunk: List[bytes] = []
+            chunk_size = 0
+            for record in records:
+                line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+                if self._file is None or (self._size + chunk_size
+                                          and self._size + chunk_size + len(line) > self.segment_bytes):
+                    self._append(chunk, chunk_size)
+                    chunk, chunk_size = [], 0
+                    self._open_segment(record.get("ts"))
+                chunk.append(line)
+                chunk_size += len(line)
+            self._append(chunk, chunk_size)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Dropped chat log records: {e}")
+
+    def _append(self, chunk: List[bytes], size: int):
+        if chunk:
+            self._file.write(b"".join(chunk))
+            self._file.flush()
+            self._size += size
+
+    def _open_segment(self, ts: Optional[str]):
+        self._close_segment()
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            stamp = datetime.fromisoformat(ts).strftime("%Y%m%d-%H%M%S")
+        except (TypeError, ValueError):
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self._seq += 1
+        self.segment = os.path.join(self.directory, f"chat-{stamp}-{os.getpid()}-{self._seq:04d}.jsonl")
+        self.segments.append(self.segment)
+        self._file = open(self.segment, "ab")
+        self._size = self._file.tell()
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._size = 0
+
+
+_default_writer: Optional[ChatLogWriter] = None
+_default_writer_lock = threading.Lock()
+
+
+def get_chat_log_writer() -> ChatLogWriter:
+    """Return the process-wide ChatLogWriter on CHAT_LOG_DIR, closed (and flushed) at exit."""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = ChatLogWriter()
+            atexit.register(_default_writer.close)
+        return _default_writer
+
+
+def legacy_records(path: str) -> List[Dict[str, Any]]:
+    """
+    Chat log records of a `save_messages_to_json` file (`YYYY-MM-DD HH-MM.json`).
+
+    The file becomes one session, `legacy-<file name>`, whose messages are
+    stamped with the time in the file name, one millisecond apart to keep
+    their order.
+
+    Raises:
+        OSError, ValueError: If the file cannot be read or is not a message list.
+    """
+    name = os.path.basename(path)
+    match = LEGACY_NAME.match(name)
+    if not match:
+        raise ValueError(f"not a legacy chat log name: {name}")
+    with open(path, encoding="utf-8") as f:
+        messages = json.load(f)
+    if not isinstance(messages, list):
+        raise ValueError("not a list of messages")
+    started = datetime.strptime(match.group(1), "%Y-%m-%d %H-%M").timestamp()
+    session = f"legacy-{os.path.splitext(name)[0].replace(' ', '_')}"
+    return [make_record(session, None, m.get("role", "user"), m.get("content"),
+                        ts=datetime.fromtimestamp(started + i / 1000), source=name)
+            for i, m in enumerate(m for m in messages if isinstance(m, dict))]
+
+
+def migrate_legacy_logs(source: str = CHAT_LOG_DIR,
+                        directory: Optional[str] = None,
+                        archive: Optional[str] = None) -> Dict[str, int]:
+    """
+    Convert `save_messages_to_json` files in `source` to JSONL segments (see `legacy_records`).
+
+    Converted files are moved to `archive` (default `<source>/legacy`), so
+    running the migration twice does not duplicate them. Unreadable files
+    are reported and left in place.
+
+    Returns:
+        dict: Number of files migrated, files skipped and records written.
+    """
+    directory = directory or source
+    archive = archive or os.path.join(source, "legacy")
+    writer = ChatLogWriter(directory)
+    stats = {"files": 0, "skipped": 0, "records": 0}
+    paths = sorted(p for p in glob.glob(os.path.join(source, "*.json")) if LEGACY_NAME.match(os.path.basename(p)))
+    migrated = []
+    try:
+        for path in paths:
+            try:
+                records = legacy_records(path)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {path}: {e}")
+                stats["skipped"] += 1
+                continue
+            for record in records:
+                writer.write_record(record)
+            stats["records"] += len(records)
+            migrated.append(path)
+            stats["files"] += 1
+    finally:
+        writer.close()
+    os.makedirs(archive, exist_ok=True)
+    for path in migrated:
+        shutil.move(path, os.path.join(archive, os.path.basename(path)))
+    return stats
+
+
+def log_paths(directory: str) -> List[str]:
+    """Uncompacted logs of `directory`: JSONL segments, then legacy JSON files, each in name (time) order."""
+    return (sorted(glob.glob(os.path.join(directory, SEGMENT_GLOB)))
+            + sorted(p for p in glob.glob(os.path.join(directory, "*.json")) if LEGACY_NAME.match(os.path.basename(p))))
+
+
+def archive_path(directory: str, day: str) -> str:
+    return os.path.join(directory, ARCHIVE_DIR, f"chat-{day}.jsonl.gz")
+
+
+def archive_day(path: str) -> str:
+    """'YYYY-MM-DD' of an archive file name."""
+    return os.path.basename(path)[len("chat-"):-len(".jsonl.gz")]
+
+
+def archive_paths(directory: str) -> List[str]:
+    """Archive days of `directory`, oldest first."""
+    return sorted(glob.glob(os.path.join(directory, ARCHIVE_DIR, ARCHIVE_GLOB)))
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the records of one log file: a JSONL segment, a gzip archive day or a legacy JSON file.
+
+    Segments and archives are read line by line; lines that do not parse
+    (e.g. one still being written) are skipped.
+    """
+    if path.endswith(".json"):
+        yield from legacy_records(path)
+        return
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def iter_records(directory: str = CHAT_LOG_DIR,
+                 since: Optional[str] = None,
+                 until: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream every chat log record of `directory`, archived ones first, without loading whole files.
+
+    Archive days are read in date order, then the live segments and legacy
+    files; records keep the order they were written in within each file.
+
+    Args:
+        directory (str): The chat log directory.
+        since (str, optional): First day to include, 'YYYY-MM-DD'.
+        until (str, optional): Last day to include, 'YYYY-MM-DD'.
+    """
+    for path in archive_paths(directory):
+        day = archive_day(path)
+        if (since and day < since) or (until and day > until):
+            continue
+        yield from read_records(path)
+    for path in log_paths(directory):
+        try:
+            for record in read_records(path):
+                day = str(record.get("ts") or "")[:10]
+                if (since and day < since) or (until and day > until):
+                    continue
+                yield record
+        except (OSError, ValueError) as e:
+            print(f"Skipping chat log {path}: {e}")
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def open_segments(paths: Iterable[str]) -> Set[str]:
+    """
+    The segments of `paths` a running process may still be appending to.
+
+    A ChatLogWriter only ever appends to its newest segment, so that is the
+    last-numbered segment of every process (pid in the name) that is alive.
+    """
+    newest: Dict[int, Tuple[int, str]] = {}
+    for path in paths:
+        match = SEGMENT_NAME.match(os.path.basename(path))
+        if match:
+            pid, seq = int(match.group(1)), int(match.group(2))
+            if pid not in newest or seq > newest[pid][0]:
+                newest[pid] = (seq, path)
+    return {path for pid, (_, path) in newest.items() if _pid_alive(pid)}
+
+
+def compact_logs(directory: str = CHAT_LOG_DIR,
+                 compact_after_days: float = CHAT_LOG_COMPACT_AFTER_DAYS,
+                 retention_days: int = CHAT_LOG_RETENTION_DAYS,
+                 now: Optional[datetime] = None,
+                 buffer_bytes: int = 16 * 1024 * 1024) -> Dict[str, int]:
+    """
+    Pack idle segments and legacy files into one gzip file per day and apply the retention policy.
+
+    A file is compacted once it has not been modified for `compact_after_days`;
+    the segment a running writer, in this or another process, may still
+    append to never is (see `open_segments`). Its records are appended,
+    as compact JSON lines, to `<directory>/archive/chat-<day>.jsonl.gz` of
+    their day, each compaction run adding one gzip member per day, and the
+    file is removed. With `retention_days`, records and archive days older
+    than that are deleted instead.
+
+    A run interrupted between writing an archive and removing its sources
+    leaves those records in both; readers see them twice, the ChatIndex once.
+
+    Returns:
+        dict: Files compacted, records archived and dropped, archive days
+        removed, and bytes before and after.
+    """
+    now = now or datetime.now()
+    cutoff = (now - timedelta(days=retention_days)).strftime("%Y-%m-%d") if retention_days > 0 else None
+    idle_since = now.timestamp() - compact_after_days * 86400
+    paths = log_paths(directory)
+    live = open_segments(paths)
+    if _default_writer is not None and _default_writer.segment:
+        live.add(_default_writer.segment)
+    stats = {"files": 0, "records": 0, "dropped": 0, "removed_days": 0, "bytes_before": 0, "bytes_after": 0}
+    days: Dict[str, List[bytes]] = {}
+    pending: List[str] = []
+    buffered = 0
+
+    def flush():
+        nonlocal buffered
+        for day, lines in sorted(days.items()):
+            path = archive_path(directory, day)
+            before = os.path.getsize(path) if os.path.exists(path) else 0
+            with gzip.open(path, "ab", compresslevel=6) as f:
+                f.write(b"".join(lines))
+            stats["bytes_after"] += os.path.getsize(path) - before
+        for path in pending:
+            os.remove(path)
+        days.clear()
+        pending.clear()
+        buffered = 0
+
+    os.makedirs(os.path.join(directory, ARCHIVE_DIR), exist_ok=True)
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            if stat.st_mtime > idle_since or path in live:
+                continue
+            records = list(read_records(path))
+        except (OSError, ValueError) as e:
+            print(f"Skipping chat log {path}: {e}")
+            continue
+        for record in records:
+            day = str(record.get("ts") or "")[:10] or "unknown"
+            if cutoff and day < cutoff:
+                stats["dropped"] += 1
+                continue
+            line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+            days.setdefault(day, []).append(line)
+            buffered += len(line)
+            stats["records"] += 1
+        pending.append(path)
+        stats["files"] += 1
+        stats["bytes_before"] += stat.st_size
+        if buffered >= buffer_bytes:
+            flush()
+    flush()
+
+    if cutoff:
+        for path in archive_paths(directory):
+            if archive_day(path) < cutoff:
+                os.remove(path)
+                stats["removed_days"] += 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat log maintenance.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate", help="Convert legacy per-turn JSON files to JSONL segments.")
+    migrate.add_argument("--source", default=CHAT_LOG_DIR, help="Directory with the legacy JSON files.")
+    migrate.add_argument("--dest", default=None, help="Directory for the segments (default: --source).")
+    migrate.add_argument("--archive", default=None, help="Where converted files are moved (default: <source>/legacy).")
+    compact = commands.add_parser("compact", help="Pack idle logs into gzip archive days and apply retention.")
+    compact.add_argument("--dir", default=CHAT_LOG_DIR, help="The chat log directory.")
+    compact.add_argument("--after-days", type=float, default=CHAT_LOG_COMPACT_AFTER_DAYS,
+                         help="Compact files not modified for this many days.")
+    compact.add_argument("--retention-days", type=int, default=CHAT_LOG_RETENTION_DAYS,
+                         help="Delete messages older than this many days (0 keeps everything).")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        stats = migrate_legacy_logs(args.source, args.dest, args.archive)
+        print(f"Migrated {stats['files']} files ({stats['records']} messages), skipped {stats['skipped']}.")
+    elif args.command == "compact":
+        stats = compact_logs(args.dir, args.after_days, args.retention_days)
+        ratio = stats["bytes_before"] / stats["bytes_after"] if stats["bytes_after"] else 0
+        print(f"Compacted {stats['files']} files ({stats['records']} messages, {ratio:.1f}x smaller), "
+              f"dropped {stats['dropped']} messages and {stats['removed_days']} archive days.")
+
+
+if __name__ == "__main__":
+    main()
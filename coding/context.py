@@ -0,0 +1,300 @@
+import os
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from autogen.code_utils import content_str
+from autogen.io import IOStream
+from autogen.token_count_utils import count_token, get_max_token_limit
+
+from coding.llmcache import ResponseCache, cached_generate_reply
+from coding.streaming import TokenStream
+
+# Turns kept verbatim; older ones are folded into the rolling summary.
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "4"))
+# Turns allowed to pile up past CONTEXT_KEEP_TURNS before a summary update folds them in one call.
+CONTEXT_FOLD_BATCH = int(os.getenv("CONTEXT_FOLD_BATCH", "2"))
+# Prompt tokens (summary + turns + new message) per model; CONTEXT_TOKEN_BUDGET overrides them all.
+CONTEXT_TOKEN_BUDGETS = {"gpt-4o-mini": 4000, "gpt-4o": 4000}
+DEFAULT_TOKEN_BUDGET = 3000
+SUMMARY_WORDS = 150
+
+SUMMARY_PROMPT = """
+Update the running summary of a conversation with the new messages below.
+Keep names, facts, numbers, decisions and open questions; drop greetings and repetition.
+Write at most {words} words, in the language of the conversation, and output the summary only.
+
+Current summary:
+{summary}
+
+New messages:
+{transcript}
+"""
+
+Message = Dict[str, Any]
+Turn = List[Message]
+# summarizer(previous summary, messages to fold in) -> new summary
+Summarizer = Callable[[str, List[Message]], str]
+
+_estimated_models: Set[str] = set()
+
+
+def _estimate_tokens(text: str) -> int:
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+def count_tokens(messages: List[Message], model: str) -> int:
+    """
+    Prompt tokens of `messages` for `model`, counted by autogen.token_count_utils.
+
+    When tiktoken cannot be used for `model` (unknown model, or its encoding
+    files cannot be downloaded) this falls back, once reported, to an
+    estimate: a token per 4 ASCII characters and one per other character.
+    """
+    if model not in _estimated_models:
+        try:
+            return count_token(messages, model)
+        except Exception as e:
+            print(f"Estimating token counts for {model}: {e}")
+            _estimated_models.add(model)
+    return 3 + sum(3 + _estimate_tokens(content_str(m.get("content")) + str(m.get("name") or ""))
+                   for m in messages)
+
+
+def token_budget(model: str) -> int:
+    """Prompt token budget of `model`, never more than half of its context window."""
+    override = os.getenv("CONTEXT_TOKEN_BUDGET")
+    budget = int(override) if override else CONTEXT_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+    try:
+        return min(budget, get_max_token_limit(model) // 2)
+    except KeyError:
+        return budget
+
+
+class ContextReport(NamedTuple):
+    prompt_tokens: int
+    budget: int
+    verbatim_turns: int
+    summarized_turns: int
+    over_budget_turns: int = 0
+
+    def describe(self) -> str:
+        text = f"prompt {self.prompt_tokens}/{self.budget} tokens · {self.verbatim_turns} turns"
+        if self.summarized_turns:
+            text += f" + summary of {self.summarized_turns}"
+        if self.over_budget_turns:
+            text += f" ({self.over_budget_turns} over budget)"
+        return text
+
+
+class ConversationContext:
+    """
+    Bounded prompt history of one conversation: a rolling summary followed by
+    the most recent turns verbatim.
+
+    A turn is a list of messages (e.g. a question and its answer). Once
+    `keep_turns + fold_batch` turns are waiting, `fold` folds all but the
+    last `keep_turns` into the summary. The update only sends the previous
+    summary and the turns being folded, so its cost does not grow with the
+    conversation. `build` enforces the model's token budget by leaving the
+    oldest verbatim turns out of the prompt; they stay in `turns` and reach
+    the summary with the next `fold`.
+
+    `fold` may run in another thread than `build` and `add_turn`; a fold
+    that raced with another one is discarded.
+
+    Example:
+        context = ConversationContext()
+        messages = context.build([{"role": "user", "content": question}], model)
+        ...
+        context.add_turn([{"role": "user", "content": question}, {"role": "assistant", "content": answer}])
+        if context.needs_fold():
+            context.fold(summarizer)
+    """
+
+    def __init__(self, keep_turns: int = CONTEXT_KEEP_TURNS, fold_batch: int = CONTEXT_FOLD_BATCH):
+        self.keep_turns = keep_turns
+        self.fold_batch = max(1, fold_batch)
+        self.summary = ""
+        self.summarized = 0
+        self.turns: List[Turn] = []
+        self.reports: List[ContextReport] = []
+        self._over_budget = 0
+        self._lock = threading.Lock()
+
+    def add_turn(self, messages: Turn):
+        with self._lock:
+            self.turns.append(list(messages))
+
+    def set_turns(self, turns: List[Turn]):
+        """Replace the unsummarized turns with `turns`, the whole conversation after its first `summarized` turns."""
+        with self._lock:
+            self.turns = [list(turn) for turn in turns]
+
+    def summary_message(self) -> Optional[Message]:
+        if not self.summary:
+            return None
+        return {"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"}
+
+    def needs_fold(self) -> bool:
+        with self._lock:
+            return len(self.turns) >= self.keep_turns + self.fold_batch or self._over_budget > 0
+
+    def fold(self, summarizer: Summarizer) -> bool:
+        """
+        Fold every turn but the last `keep_turns` (and any the budget left out) into the summary.
+
+        Returns:
+            bool: Whether the summary was updated.
+        """
+        with self._lock:
+            count = min(len(self.turns), max(len(self.turns) - self.keep_turns, self._over_budget))
+            if count <= 0:
+                return False
+            summary, folding = self.summary, self.turns[:count]
+        new_summary = summarizer(summary, [m for turn in folding for m in turn])
+        with self._lock:
+            raced = self.summary != summary or any(a is not b for a, b in zip(self.turns[:count], folding))
+            if raced or not new_summary:
+                return False
+            self.summary = new_summary
+            del self.turns[:count]
+            self.summarized += count
+            self._over_budget = 0
+        return True
+
+    def build(self, prompt: List[Message], model: str, pinned: Optional[List[Message]] = None) -> List[Message]:
+        """
+        Messages to send for `prompt`: `pinned`, the summary, as many recent turns
+        as the token budget of `model` allows (at least the newest one), then `prompt`.
+
+        Records a ContextReport in `reports`.
+        """
+        with self._lock:
+            turns = list(self.turns)
+            summarized = self.summarized
+            head = list(pinned or [])
+            if self.summary:
+                head.append(self.summary_message())
+        budget = token_budget(model)
+        tokens = count_tokens(head + prompt, model)
+        kept: List[Turn] = []
+        for turn in reversed(turns):
+            cost = count_tokens(turn, model) - 3
+            if kept and tokens + cost > budget:
+                break
+            kept.insert(0, turn)
+            tokens += cost
+        messages = head + [m for turn in kept for m in turn] + prompt
+        report = ContextReport(count_tokens(messages, model), budget, len(kept), summarized, len(turns) - len(kept))
+        with self._lock:
+            self._over_budget = report.over_budget_turns
+            self.reports.append(report)
+        return messages
+
+    @property
+    def last_report(self) -> Optional[ContextReport]:
+        return self.reports[-1] if self.reports else None
+
+
+def llm_summarizer(agent,
+                   model: str,
+                   lang: str,
+                   cache: Optional[ResponseCache] = None,
+                   words: int = SUMMARY_WORDS) -> Summarizer:
+    """
+    A Summarizer asking `agent` for the updated summary, through the response cache.
+
+    The reply is never streamed to the page. `agent` should be dedicated to
+    summarizing: its own history and hooks are not involved, but its system
+    message is.
+    """
+    def summarize(summary: str, messages: List[Message]) -> str:
+        transcript = "\n".join(f"{m.get('name') or m.get('role', 'user')}: {content_str(m.get('content'))}"
+                               for m in messages if m.get("content"))
+        prompt = SUMMARY_PROMPT.format(words=words, summary=summary or "(none)", transcript=transcript)
+        with IOStream.set_default(TokenStream()):
+            reply, _ = cached_generate_reply(cache, agent, [{"role": "user", "content": prompt}], model, lang)
+        text = reply.get("content") if isinstance(reply, dict) else reply
+        return (text or "").strip() or summary
+
+    return summarize
+
+
+def _group_turns(messages: List[Message]) -> List[Turn]:
+    """Split a chat into turns: a message plus the tool responses that follow it."""
+    turns: List[Turn] = []
+    for message in messages:
+        if turns and message.get("role") == "tool":
+            turns[-1].append(message)
+        else:
+            turns.append([message])
+    return turns
+
+
+def _turn_key(turn: Turn) -> Tuple[str, str]:
+    return str(turn[0].get("name") or ""), content_str(turn[0].get("content"))
+
+
+class ContextTransform:
+    """
+    autogen MessageTransform that bounds the history agents see during one chat.
+
+    The first message (the task) is always kept; the rest is handled as a
+    ConversationContext whose summary is updated, synchronously, when turns
+    pile up. One instance can be shared by all agents of a chat: turns are
+    matched by speaker name and content, not role, so they share the summary.
+    A chat that does not continue the summarized one starts a new context.
+
+    Example:
+        context = ContextTransform(model, llm_summarizer(summary_agent, model, lang))
+        TransformMessages(transforms=[context], verbose=False).add_to_agent(teacher)
+    """
+
+    def __init__(self,
+                 model: str,
+                 summarizer: Summarizer,
+                 keep_turns: int = CONTEXT_KEEP_TURNS,
+                 fold_batch: int = CONTEXT_FOLD_BATCH):
+        self.model = model
+        self.summarizer = summarizer
+        self.keep_turns = keep_turns
+        self.fold_batch = fold_batch
+        self.reports: List[ContextReport] = []
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, first: Optional[Tuple[str, str]]):
+        self.context = ConversationContext(self.keep_turns, self.fold_batch)
+        self._first = first
+        self._folded: List[Tuple[str, str]] = []
+
+    def apply_transform(self, messages: List[Message]) -> List[Message]:
+        if len(messages) < 2:
+            return messages
+        first, turns = messages[0], _group_turns(messages[1:])
+        keys = [_turn_key(turn) for turn in turns]
+        with self._lock:
+            context = self.context
+            if (self._first != _turn_key([first])
+                    or keys[:context.summarized] != self._folded):
+                self._reset(_turn_key([first]))
+                context = self.context
+            context.set_turns(turns[context.summarized:])
+            if context.needs_fold() and context.fold(self.summarizer):
+                self._folded = keys[:context.summarized]
+            result = context.build([], self.model, pinned=[first])
+            self.reports.append(context.last_report)
+        return result
+
+    def get_logs(self, pre_transform_messages: List[Message],
+                 post_transform_messages: List[Message]) -> Tuple[str, bool]:
+        report = self.reports[-1] if self.reports else None
+        changed = len(post_transform_messages) != len(pre_transform_messages)
+        return (f"Context: {report.describe()}" if report else "Context: unchanged"), changed
+
+    def take_reports(self) -> List[ContextReport]:
+        """Reports of the calls since the last `take_reports`, oldest first."""
+        with self._lock:
+            reports, self.reports = self.reports, []
+        return reports
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import streamlit as st
+
+# Messages shown when a history is first drawn, and how many more each "load older" click adds.
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "50"))
+HISTORY_PAGE = int(os.getenv("HISTORY_PAGE", "50"))
+# Rendered fragments kept in memory, across sessions.
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "4096"))
+
+
+def message_key(msg: Dict[str, Any]) -> str:
+    """
+    The message's `id` with its role and name, or for messages without an id a hash of role, name and content.
+
+    Renderers style messages by role, and an id (`<seq>-<content hash>`, see
+    coding.messages) says nothing about it: two sessions can hold the same
+    content at the same position under different roles.
+    """
+    if msg.get("id"):
+        return f"{msg['id']}\x00{msg.get('role')}\x00{msg.get('name')}"
+    text = f"{msg.get('role')}\x00{msg.get('name')}\x00{msg.get('content')}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class FragmentCache:
+    """
+    LRU cache of rendered message fragments keyed by (renderer, history key, message key).
+
+    Messages do not change once shown, so a fragment is built once and
+    reused on every rerun, by every session showing the same message in
+    the same history.
+    """
+
+    def __init__(self, maxsize: int = FRAGMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._fragments: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, renderer: str, msg: Dict[str, Any], build: Callable[[Dict[str, Any]], str],
+            history: str = "") -> str:
+        key = (renderer, history, message_key(msg))
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        fragment = build(msg)
+        with self._lock:
+            self._fragments[key] = fragment
+            while len(self._fragments) > self.maxsize:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+
+_fragment_cache: Optional[FragmentCache] = None
+_fragment_cache_lock = threading.Lock()
+
+
+def get_fragment_cache() -> FragmentCache:
+    """Return the process-wide FragmentCache, creating it on first use."""
+    global _fragment_cache
+    with _fragment_cache_lock:
+        if _fragment_cache is None:
+            _fragment_cache = FragmentCache()
+        return _fragment_cache
+
+
+def visible_messages(container_obj,
+                     messages: List[Dict[str, Any]],
+                     key: str,
+                     window: int = HISTORY_WINDOW,
+                     page: int = HISTORY_PAGE) -> List[Dict[str, Any]]:
+    """
+    The most recent messages of a history, with a "load older" button above them.
+
+    How many are shown is kept in `st.session_state[f"history_shown_{key}"]`;
+    it starts at `window` and grows by `page` per click. A `window` of 0 or
+    less shows everything.
+
+    Args:
+        container_obj: Where the button goes.
+        messages (List[Dict[str, Any]]): The whole history, oldest first.
+        key (str): Identifies the history, e.g. the session_state key of its messages.
+        window (int): Messages shown at first.
+        page (int): Messages added per "load older" click.
+    """
+    if window <= 0:
+        return messages
+    state_key = f"history_shown_{key}"
+    shown = st.session_state.setdefault(state_key, window)
+    hidden = max(0, len(messages) - shown)
+    if hidden:
+        container_obj.button(
+            f"⬆️ Load {min(page, hidden)} older messages ({hidden} hidden)",
+            key=f"history_older_{key}",
+            on_click=lambda: st.session_state.update({state_key: st.session_state[state_key] + page}))
+    return messages[hidden:]
+
+
+def render_html_history(container_obj,
+                        messages: List[Dict[str, Any]],
+                        key: str,
+                        fragment: Callable[[Dict[str, Any]], str],
+                        window: int = HISTORY_WINDOW,
+                        page: int = HISTORY_PAGE):
+    """
+    Draw the visible part of a history as one HTML block of cached per-message fragments.
+
+    `fragment(msg)` returns the HTML of one message; it is called once per
+    message, not once per rerun. Joining the fragments into a single
+    markdown element keeps the element count of a rerun constant.
+    """
+    visible = visible_messages(container_obj, messages, key, window, page)
+    if not visible:
+        return
+    cache = get_fragment_cache()
+    renderer = f"{fragment.__module__}.{fragment.__qualname__}"
+    # A blank line between fragments keeps each one a markdown block of its own, as if drawn separately.
+    container_obj.markdown("\n\n".join(cache.get(renderer, msg, fragment, key) for msg in visible),
+                           unsafe_allow_html=True)
@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from coding.constant import JOB_DEFINITION
+from coding.textindex import fold, tokenize
+
+INTENT_EXAMPLES_PATH = os.getenv("INTENT_EXAMPLES_PATH",
+                                 os.path.join(os.path.dirname(__file__), "intent_examples.json"))
+# Below this probability a prompt is not trusted to a fast path and goes through the full pipeline.
+INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.6"))
+FEATURE_BITS = 18
+
+# How the home page answers each intent, and the LLM calls that saves on the
+# full pipeline (student rewrite, teacher answer, follow-up suggestions).
+FAST_PATHS = {"SELF_INTRODUCE": "canned", "OPENING_MSG": "canned", "REPLY_TASK": "teacher"}
+# Intents defined by their job marker: their fast path is taken only for a
+# prompt that starts with it, never on the classifier's confidence alone.
+MARKED_INTENTS = frozenset({"REPLY_TASK"})
+CALLS_AVOIDED = {"canned": 3, "teacher": 2, "pipeline": 0}
+_MARKER_RE = re.compile(r"^\s*\[(" + "|".join(JOB_DEFINITION) + r")\]:?\s*")
+
+
+def strip_marker(prompt: str) -> str:
+    """`prompt` without a leading job marker such as "[REPLY_TASK]" or "[OPENING_MSG]:"."""
+    return _MARKER_RE.sub("", prompt, count=1)
+
+
+def job_marker(prompt: str) -> Optional[str]:
+    """The job marker `prompt` starts with, e.g. "REPLY_TASK" for "[REPLY_TASK] ...", or None."""
+    match = _MARKER_RE.match(prompt)
+    return match.group(1) if match else None
+
+
+class Intent(NamedTuple):
+    label: str
+    confidence: float
+    seconds: float
+    marker: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        """"canned", "teacher" or "pipeline": the cheapest way to answer that can be trusted."""
+        if self.confidence < INTENT_MIN_CONFIDENCE:
+            return "pipeline"
+        if self.label in MARKED_INTENTS and self.marker != self.label:
+            return "pipeline"
+        return FAST_PATHS.get(self.label, "pipeline")
+
+    def describe(self) -> str:
+        return f"{self.label} {self.confidence:.0%} ({self.seconds * 1000:.2f} ms)"
+
+
+def features(text: str) -> List[int]:
+    """
+    Hashed features of a prompt: its tokens (see coding.textindex.tokenize),
+    its character 3- to 5-grams, its first token and its length.
+
+    Character n-grams let the few labelled examples generalize to
+    inflections and unseen wordings ("introduce" / "introduction").
+    """
+    tokens = tokenize(text)
+    padded = f" {' '.join(fold(text).split())} "
+    grams = tokens + [padded[i:i + n] for n in range(3, 6) for i in range(len(padded) - n + 1)]
+    grams += [f"^{tokens[0]}" if tokens else "^", f"#len{min(len(tokens), 8)}"]
+    mask = (1 << FEATURE_BITS) - 1
+    return [zlib.crc32(g.encode("utf-8")) & mask for g in grams]
+
+
+class IntentClassifier:
+    """
+    CPU-only prompt classifier: TF-IDF over hashed features with a softmax (multinomial logistic) model.
+
+    Only the hash buckets seen in training get a weight, so the model is a
+    small dense matrix however large the hash space is. Classifying a
+    prompt is a tokenize, a gather and a softmax over the labels, well under
+    a millisecond.
+
+    Example:
+        clf = IntentClassifier().fit(texts, labels)
+        clf.classify("Introduce yourself")  # Intent("SELF_INTRODUCE", 0.93, ...)
+    """
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self.columns: Dict[int, int] = {}
+        self.idf: Optional[np.ndarray] = None
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+
+    def _row(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Columns and L2-normalized TF-IDF values of `text`'s known features."""
+        counts: Dict[int, int] = {}
+        for f in features(text):
+            col = self.columns.get(f)
+            if col is not None:
+                counts[col] = counts.get(col, 0) + 1
+        cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.idf[cols]
+        norm = np.linalg.norm(values)
+        return cols, values / norm if norm else values
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str], epochs: int = 300, rate: float = 5.0,
+            l2: float = 1e-4) -> "IntentClassifier":
+        self.labels = sorted(set(labels))
+        rows = [features(t) for t in texts]
+        self.columns = {}
+        for row in rows:
+            for f in row:
+                self.columns.setdefault(f, len(self.columns))
+        df = np.zeros(len(self.columns))
+        for row in rows:
+            df[list({self.columns[f] for f in row})] += 1
+        self.idf = np.log((1 + len(texts)) / (1 + df)) + 1
+
+        x = np.zeros((len(texts), len(self.columns)), dtype=np.float32)
+        for i, text in enumerate(texts):
+            cols, values = self._row(text)
+            x[i, cols] = values
+        y = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        y[np.arange(len(texts)), [self.labels.index(label) for label in labels]] = 1
+
+        w = np.zeros((len(self.columns), len(self.labels)), dtype=np.float32)
+        b = np.zeros(len(self.labels), dtype=np.float32)
+        for _ in range(epochs):
+            p = _softmax(x @ w + b)
+            grad = (p - y) / len(texts)
+            w -= rate * (x.T @ grad + l2 * w)
+            b -= rate * grad.sum(axis=0)
+        self.weights, self.bias = w, b
+        return self
+
+    def _predict(self, text: str) -> np.ndarray:
+        cols, values = self._row(text)
+        return _softmax(values @ self.weights[cols] + self.bias)
+
+    def probabilities(self, text: str) -> Dict[str, float]:
+        return dict(zip(self.labels, self._predict(text).tolist()))
+
+    def classify(self, text: str) -> Intent:
+        start = time.perf_counter()
+        p = self._predict(text)
+        best = int(p.argmax())
+        return Intent(self.labels[best], float(p[best]), time.perf_counter() - start, job_marker(text))
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    e = np.exp(z - z.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def load_examples(path: str = INTENT_EXAMPLES_PATH) -> List[Tuple[str, str]]:
+    """
+    Labelled prompts: those of the examples file at `path`, plus the
+    JOB_DEFINITION descriptions of every label as examples of it.
+    """
+    with open(path, encoding="utf-8") as f:
+        examples = [(text, label) for label, texts in json.load(f).items() for text in texts]
+    for label, definition in JOB_DEFINITION.items():
+        for text in definition if isinstance(definition, list) else [definition]:
+            examples.append((text, label))
+    return examples
+
+
+_default_classifier: Optional[IntentClassifier] = None
+_default_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier() -> IntentClassifier:
+    """Return the process-wide IntentClassifier trained on `load_examples()`, training it on first use."""
+    global _default_classifier
+    with _default_classifier_lock:
+        if _default_classifier is None:
+            texts, labels = zip(*load_examples())
+            _default_classifier = IntentClassifier().fit(texts, labels)
+        return _default_classifier
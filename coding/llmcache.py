@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from coding.tracing import annotate
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("data", "llm_cache.sqlite"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    reply TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Keep only role and content, with whitespace runs collapsed, for cache keys."""
+    return [
+        {"role": m.get("role", "user"), "content": re.sub(r"\s+", " ", str(m.get("content") or "")).strip()}
+        for m in messages
+    ]
+
+
+class ResponseCache:
+    """
+    On-disk exact-match cache of LLM replies, bounded to `max_entries`.
+
+    Keys hash the model, the agent's system message, the reply language
+    and the normalized message list. When the cache grows past its bound
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model: str, system_message: str, lang: str, messages: List[Dict[str, Any]]) -> str:
+        payload = json.dumps(
+            {"model": model, "system": system_message, "lang": lang, "messages": normalize_messages(messages)},
+            ensure_ascii=False, sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT reply FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, reply: Any):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO responses (key, reply, created_at, last_used) VALUES (?, ?, ?, ?)",
+                         (key, json.dumps(reply, ensure_ascii=False), now, now))
+            excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute("DELETE FROM responses WHERE key IN "
+                             "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)", (excess,))
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+def cached_generate_reply(cache: Optional[ResponseCache],
+                          agent,
+                          messages: List[Dict[str, Any]],
+                          model: str,
+                          lang: str,
+                          bypass: bool = False) -> Tuple[Any, bool]:
+    """
+    `agent.generate_reply(messages=messages)` through the response cache.
+
+    A hit returns the stored reply without any network call. With `bypass`
+    (or no cache) the agent is always called and nothing is stored; empty
+    replies are never stored. Whether the cache was hit is set as
+    `cache_hit` on the current tracing span.
+
+    Each call is a one-off request, not a round of a chat, so the agent's
+    consecutive auto-reply counter is reset first. Otherwise a long session
+    reaches `max_consecutive_auto_reply` and autogen stops replying or asks
+    the console for input.
+
+    Returns:
+        Tuple[Any, bool]: The reply and whether it came from the cache.
+    """
+    agent.reset_consecutive_auto_reply_counter()
+    if cache is None or bypass:
+        return agent.generate_reply(messages=messages), False
+
+    key = cache.make_key(model, agent.system_message, lang, messages)
+    reply = cache.get(key)
+    annotate(cache_hit=reply is not None)
+    if reply is not None:
+        return reply, True
+
+    reply = agent.generate_reply(messages=messages)
+    if reply:
+        cache.put(key, reply)
+    return reply, False
+
+
+async def a_cached_generate_reply(cache: Optional[ResponseCache],
+                                  agent,
+                                  messages: List[Dict[str, Any]],
+                                  model: str,
+                                  lang: str,
+                                  bypass: bool = False,
+                                  pending: Optional[Set["asyncio.Task"]] = None,
+                                  dispatched: Optional[asyncio.Event] = None) -> Tuple[Any, bool]:
+    """
+    Async `cached_generate_reply` built on `agent.a_generate_reply`.
+
+    Cache reads and writes run in the loop's executor. With `pending`, the
+    write of a fresh reply is started as a task added to that set instead of
+    being awaited, so the caller can move on and await the set later.
+    `dispatched` is set once the request has been handed to the agent (or
+    answered from the cache), which is when the caller may stop yielding to it.
+    """
+    agent.reset_consecutive_auto_reply_counter()
+    if cache is None or bypass:
+        if dispatched is not None:
+            dispatched.set()
+        return await agent.a_generate_reply(messages=messages), False
+
+    key = cache.make_key(model, agent.system_message, lang, messages)
+    reply = await asyncio.to_thread(cache.get, key)
+    annotate(cache_hit=reply is not None)
+    if dispatched is not None:
+        dispatched.set()
+    if reply is not None:
+        return reply, True
+
+    reply = await agent.a_generate_reply(messages=messages)
+    if reply:
+        store = asyncio.to_thread(cache.put, key, reply)
+        if pending is None:
+            await store
+        else:
+            pending.add(asyncio.ensure_future(store))
+    return reply, False
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide ResponseCache at LLM_CACHE_PATH, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
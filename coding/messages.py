@@ -0,0 +1,144 @@
+import hashlib
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import streamlit as st
+
+
+class StoredMessage:
+    """
+    One message of a MessageStore: id, role, content and optional name and avatar image.
+
+    Slotted, with interned role and name strings and the id kept as two
+    integers, it takes less memory than the dict it replaces, and still
+    answers `msg.get("role")` and `msg["content"]` the way the renderers expect.
+    """
+
+    __slots__ = ("seq", "digest", "role", "content", "name", "image")
+    FIELDS = ("id", "role", "content", "name", "image")
+
+    def __init__(self, seq: int, digest: int, role: str, content: Any, name: Optional[str] = None,
+                 image: Optional[str] = None):
+        self.seq = seq
+        self.digest = digest
+        self.role = sys.intern(role)
+        self.content = content
+        self.name = sys.intern(name) if name else None
+        self.image = image
+
+    @property
+    def id(self) -> str:
+        return f"{self.seq:06d}-{self.digest:012x}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.FIELDS if getattr(self, key) is not None}
+
+    def __repr__(self) -> str:
+        return f"StoredMessage({self.to_dict()!r})"
+
+
+def content_hash(content: Any) -> int:
+    return int.from_bytes(hashlib.blake2b(str(content).encode("utf-8"), digest_size=6).digest(), "big")
+
+
+class MessageStore:
+    """
+    Message history of one chat in one session, with stable ids and dedup-on-append.
+
+    Every message gets the id `<sequence>-<content hash>`, which never
+    changes and never repeats, so renderers can cache by it. A message whose
+    content was already appended in the current turn is dropped: live reply
+    hooks and the chat history replayed after the chat record the same
+    messages, under different role labels. Pages call `start_turn` before
+    each chat.
+
+    `since(cursor)` returns the messages appended after a cursor (a length
+    taken earlier), for drawing only what is new.
+
+    Example:
+        store = get_message_store()
+        store.start_turn()
+        store.append("user", prompt)
+        for msg in store: ...
+    """
+
+    def __init__(self, messages: Iterable[Dict[str, Any]] = ()):
+        self._messages: List[StoredMessage] = []
+        self._turn_hashes: Set[int] = set()
+        self.dropped = 0
+        # An existing history is kept as it is, repeats included.
+        for m in messages:
+            self.start_turn()
+            self.append(m.get("role", "user"), m.get("content", ""), m.get("name"), m.get("image"))
+        self.start_turn()
+
+    def start_turn(self):
+        """Start a new turn: messages seen before it may be appended again."""
+        self._turn_hashes = set()
+
+    def append(self, role: str, content: Any, name: Optional[str] = None,
+               image: Optional[str] = None, key: Any = None) -> Optional[StoredMessage]:
+        """
+        Append a message unless the current turn already has the same content.
+
+        Args:
+            key (Any, optional): What to compare instead of `content`, e.g. the
+                raw text when `content` was cleaned up for display.
+
+        Returns:
+            StoredMessage: The stored message, or None if it was a duplicate.
+        """
+        digest = content_hash(content)
+        turn_key = digest if key is None else content_hash(key)
+        if turn_key in self._turn_hashes:
+            self.dropped += 1
+            return None
+        self._turn_hashes.add(turn_key)
+        message = StoredMessage(len(self._messages), digest, role, content, name, image)
+        self._messages.append(message)
+        return message
+
+    def extend(self, messages: Iterable[Dict[str, Any]]) -> List[StoredMessage]:
+        """Append message dicts (role, content, maybe name and image); returns the ones stored."""
+        added = []
+        for m in messages:
+            message = self.append(m.get("role", "user"), m.get("content", ""), m.get("name"), m.get("image"))
+            if message is not None:
+                added.append(message)
+        return added
+
+    def since(self, cursor: int) -> Tuple[List[StoredMessage], int]:
+        """Messages appended after `cursor` (from an earlier call, or 0) and the cursor to pass next time."""
+        return self._messages[cursor:], len(self._messages)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[StoredMessage]:
+        return iter(self._messages)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[StoredMessage, List[StoredMessage]]:
+        return self._messages[index]
+
+
+def get_message_store(key: str = "messages") -> MessageStore:
+    """
+    The MessageStore at `st.session_state[key]`, created on first use.
+
+    A plain list of message dicts found there (from before the store) is
+    converted, keeping its messages.
+    """
+    store = st.session_state.get(key)
+    if not isinstance(store, MessageStore):
+        store = MessageStore(store or [])
+        st.session_state[key] = store
+    return store
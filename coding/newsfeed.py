@@ -0,0 +1,120 @@
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from coding.newsframe import PreparedNews
+from coding.newsstore import NEWS_REFRESH_SECONDS, NewsStore, get_news_store
+
+
+@dataclass(frozen=True)
+class NewsSnapshot:
+    """
+    One version of the news shared by every session in the process.
+
+    `version` increases whenever new articles arrive; `refreshed_at` is the
+    last time the upstream API was checked, so `age` says how stale it may be.
+    The snapshot's rows never change, but its text index is shared with the
+    snapshots that follow and extended in place (see PreparedNews.extend);
+    searches return only the rows of this snapshot.
+    """
+    version: int
+    news: PreparedNews
+    refreshed_at: float
+
+    @property
+    def age(self) -> float:
+        """Seconds since the upstream API was last checked successfully."""
+        return time.time() - self.refreshed_at
+
+    def describe(self) -> str:
+        return f"news snapshot v{self.version}: {len(self.news)} articles, {self.age:.0f}s old"
+
+
+class NewsFeed:
+    """
+    Process-wide holder of the current NewsSnapshot, refreshed in the background.
+
+    A daemon thread refreshes the NewsStore every `ttl` seconds and swaps in
+    a new snapshot with a single reference assignment. `current` only reads
+    that reference, so readers never wait for a refresh in progress; the one
+    exception is a cold start with an empty store, which has nothing to serve
+    until the first fetch completes.
+    """
+
+    def __init__(self,
+                 store: Optional[NewsStore] = None,
+                 ttl: float = NEWS_REFRESH_SECONDS,
+                 max_pages: int = 5):
+        self.store = store or get_news_store()
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self._snapshot: Optional[NewsSnapshot] = None
+        self._init_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def current(self) -> NewsSnapshot:
+        """Return the latest snapshot, starting the background refresher on first use."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._init_lock:
+            if self._snapshot is None:
+                if self.store.count() == 0:
+                    self.store.refresh(max_pages=self.max_pages)
+                self._swap(self.store.prepared())
+                self.start()
+            return self._snapshot
+
+    def _swap(self, news: PreparedNews):
+        old = self._snapshot
+        refreshed_at = self.store.last_refresh or 0.0
+        if old is not None and old.news is news:
+            if refreshed_at != old.refreshed_at:
+                self._snapshot = replace(old, refreshed_at=refreshed_at)
+            return
+        self._snapshot = NewsSnapshot(
+            version=1 if old is None else old.version + 1,
+            news=news,
+            refreshed_at=refreshed_at,
+        )
+        print(f"Loaded {self._snapshot.describe()}")
+
+    def refresh_now(self) -> NewsSnapshot:
+        """Run one refresh cycle in the calling thread and publish its result."""
+        self.store.refresh_if_stale(max_age=self.ttl, max_pages=self.max_pages)
+        self._swap(self.store.prepared())
+        return self._snapshot
+
+    def _run(self):
+        while not self._stop.wait(self.ttl):
+            try:
+                self.refresh_now()
+            except Exception as e:
+                print(f"News refresh failed, keeping {self._snapshot.describe()}: {e}")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="news-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_default_feed: Optional[NewsFeed] = None
+_default_feed_lock = threading.Lock()
+
+
+def get_news_feed() -> NewsFeed:
+    """Return the process-wide NewsFeed over the default NewsStore, creating it on first use."""
+    global _default_feed
+    with _default_feed_lock:
+        if _default_feed is None:
+            _default_feed = NewsFeed()
+        return _default_feed
@@ -0,0 +1,158 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from coding.textindex import InvertedIndex, is_literal
+from coding.tools import NEWS_SEARCH_COLUMNS, build_news_index
+
+REQUIRED_COLUMNS = {'ar_section', 'ar_pubdate', 'ar_head', 'ar_desc'}
+
+
+class PreparedNews:
+    """
+    A news DataFrame bundled with the lookup structures search_news needs.
+
+    Built once per news snapshot and then shared by every tool call:
+        - `pubdates`: `ar_pubdate` parsed to datetime64 (NaT where unparsable),
+          with the positions of the valid dates sorted by date so a
+          `date_from`/`date_to` range is two binary searches;
+        - `section_codes`: categorical code of `ar_section` per row, with the
+          row positions of every section precomputed;
+        - `text_index`: an InvertedIndex keyed by `ar_id` for keyword queries.
+
+    `frame` is kept exactly as given (newest `ar_id` first from the store) and
+    must be treated as read-only. Use `extend` to get a new snapshot with more
+    articles; it reuses the parsed dates and the text index of this one.
+    """
+
+    def __init__(self,
+                 df: pd.DataFrame,
+                 text_index: Optional[InvertedIndex] = None,
+                 pubdates: Optional[np.ndarray] = None):
+        self.frame = df.reset_index(drop=True)
+        n = len(self.frame)
+
+        if 'ar_pubdate' in self.frame.columns:
+            if pubdates is None:
+                pubdates = pd.to_datetime(self.frame['ar_pubdate'], errors='coerce').to_numpy()
+        else:
+            pubdates = np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.pubdates = pubdates
+        valid = np.flatnonzero(~np.isnat(pubdates))
+        self._date_order = valid[np.argsort(pubdates[valid], kind='stable')]
+        self._sorted_dates = pubdates[self._date_order]
+
+        sections = pd.Categorical(self.frame['ar_section'] if 'ar_section' in self.frame.columns else [None] * n)
+        self.section_codes = sections.codes
+        by_code = np.argsort(self.section_codes, kind='stable')
+        bounds = np.searchsorted(self.section_codes[by_code], np.arange(len(sections.categories) + 1))
+        self._section_positions: Dict[str, np.ndarray] = {
+            section: by_code[bounds[code]:bounds[code + 1]]
+            for code, section in enumerate(sections.categories)
+        }
+
+        self.text_index = text_index if text_index is not None else build_news_index(self.frame)
+        ids = self.frame['ar_id'].tolist() if 'ar_id' in self.frame.columns else []
+        self._position_by_id = {ar_id: pos for pos, ar_id in enumerate(ids)}
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    def extend(self, new_df: pd.DataFrame) -> "PreparedNews":
+        """
+        Return a snapshot with `new_df` (articles newer than every current one) on top.
+
+        Only the new rows are parsed and indexed. The text index is shared with
+        this snapshot and grows under it: the index locks out searches while
+        it is extended, and lookups map `ar_id`s back through the snapshot's
+        own rows, so ids it does not hold are ignored.
+        """
+        if new_df.empty:
+            return self
+        if self.frame.empty:
+            return PreparedNews(new_df)
+        self.text_index.add_many(new_df.to_dict(orient="records"), key_field='ar_id')
+        new_dates = pd.to_datetime(new_df['ar_pubdate'], errors='coerce').to_numpy()
+        return PreparedNews(
+            pd.concat([new_df, self.frame], ignore_index=True),
+            text_index=self.text_index,
+            pubdates=np.concatenate([new_dates, self.pubdates]),
+        )
+
+    def _date_positions(self, date_from: Optional[str], date_to: Optional[str]) -> np.ndarray:
+        lo, hi = 0, len(self._sorted_dates)
+        if date_from is not None:
+            lo = np.searchsorted(self._sorted_dates, pd.to_datetime(date_from).to_datetime64(), side='left')
+        if date_to is not None:
+            hi = np.searchsorted(self._sorted_dates, pd.to_datetime(date_to).to_datetime64(), side='right')
+        return np.sort(self._date_order[lo:max(lo, hi)])
+
+    def _section_rows(self, sections: List[str]) -> np.ndarray:
+        parts = [self._section_positions[s] for s in set(sections) if s in self._section_positions]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+
+    def _text_positions(self, query: str, search_columns: List[str]) -> np.ndarray:
+        if self._position_by_id and is_literal(query) and set(search_columns) <= set(self.text_index.fields):
+            ids = self.text_index.search(query, search_columns)
+            return np.sort(np.fromiter((self._position_by_id[i] for i in ids if i in self._position_by_id),
+                                       dtype=np.intp))
+        text_mask = pd.Series(False, index=self.frame.index)
+        for col in search_columns:
+            text_mask |= self.frame[col].astype(str).str.contains(query, case=False, na=False)
+        return np.flatnonzero(text_mask.to_numpy())
+
+    def search(self,
+               query: Optional[str] = None,
+               search_columns: Optional[List[str]] = None,
+               sections: Optional[List[str]] = None,
+               date_from: Optional[str] = None,
+               date_to: Optional[str] = None,
+               news_number: Optional[int] = 5) -> pd.DataFrame:
+        """
+        Same filters, errors and result rows as coding.tools.search_news on `frame`.
+
+        Each given filter yields a sorted array of row positions; the arrays are
+        intersected and the first `news_number` rows are returned in frame order.
+        """
+        if self.frame.empty:
+            raise ValueError("DataFrame is empty. Fetch news first with fetch_all_news.")
+
+        missing_req = REQUIRED_COLUMNS - set(self.frame.columns)
+        if missing_req:
+            raise KeyError(f"Required columns missing from DataFrame: {missing_req}")
+
+        if search_columns is None:
+            search_columns = NEWS_SEARCH_COLUMNS
+
+        missing_search = set(search_columns) - set(self.frame.columns)
+        if missing_search:
+            raise KeyError(f"Search columns not found in DataFrame: {missing_search}")
+
+        filters = []
+        if date_from is not None or date_to is not None:
+            filters.append(self._date_positions(date_from, date_to))
+        if sections is not None:
+            filters.append(self._section_rows(sections))
+        if query is not None:
+            filters.append(self._text_positions(query, search_columns))
+
+        if not filters:
+            result = self.frame
+        else:
+            positions = filters[0]
+            for other in filters[1:]:
+                positions = np.intersect1d(positions, other, assume_unique=True)
+            if news_number is not None and news_number >= 0:
+                positions = positions[:news_number]
+            result = self.frame.iloc[positions]
+        result = result.reset_index(drop=True)
+
+        if news_number is not None:
+            result = result.head(news_number)
+
+        return result
@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+import requests
+
+from coding.newsframe import PreparedNews
+from coding.tools import fetch_news_json, json_to_dataframe
+
+NEWS_STORE_PATH = os.getenv("NEWS_STORE_PATH", os.path.join("data", "news.sqlite"))
+NEWS_REFRESH_SECONDS = float(os.getenv("NEWS_REFRESH_SECONDS", "300"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    ar_id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class NewsStore:
+    """
+    Local SQLite store of Taipei Times articles keyed by `ar_id`.
+
+    The API lists articles newest first, so `refresh` walks pages from 1
+    upward and stops at the first page containing an article that is
+    already stored; a warm refresh therefore costs a single round trip.
+    Tool calls read with `prepared` (or `load` for the bare frame), which
+    never touches the network and only reads rows newer than the last read;
+    those rows extend the cached PreparedNews, so its date, section and
+    text indexes are built once and then kept up to date.
+    """
+
+    def __init__(self,
+                 path: str = NEWS_STORE_PATH,
+                 list_type: str = 'all',
+                 base_url: Optional[str] = None):
+        self.path = path
+        self.list_type = list_type
+        self.base_url = base_url
+        self._refresh_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._prepared = PreparedNews(pd.DataFrame())
+        self._loaded_max: Optional[int] = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def max_ar_id(self) -> Optional[int]:
+        with self._connect() as conn:
+            return conn.execute("SELECT MAX(ar_id) FROM news").fetchone()[0]
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+    @property
+    def last_refresh(self) -> Optional[float]:
+        """Epoch seconds of the last successful refresh, or None if never refreshed."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'last_refresh'").fetchone()
+        return float(row[0]) if row else None
+
+    def upsert(self, records: List[Dict[str, Any]], conn: Optional[sqlite3.Connection] = None) -> int:
+        """
+        Insert article records, replacing any stored copy with the same `ar_id`.
+
+        Returns:
+            int: Number of records whose `ar_id` was not stored before.
+        """
+        if conn is None:
+            with self._connect() as conn:
+                return self.upsert(records, conn)
+
+        now = time.time()
+        rows = [(int(r["ar_id"]), json.dumps(r, ensure_ascii=False), now)
+                for r in records if r.get("ar_id") is not None]
+        before = conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+        conn.executemany("INSERT OR REPLACE INTO news (ar_id, payload, fetched_at) VALUES (?, ?, ?)", rows)
+        return conn.execute("SELECT COUNT(*) FROM news").fetchone()[0] - before
+
+    def refresh(self, max_pages: int = 5) -> int:
+        """
+        Pull pages newer than the highest stored `ar_id`.
+
+        Pages are fetched in order starting at 1 and the walk stops at the
+        first page that overlaps the store or at an empty page. Only a cold
+        fill (an empty store) also stops after `max_pages`: a warm refresh
+        that has not reached a stored article yet keeps paging, since
+        committing without the overlap would move `max_ar_id` past articles
+        that later refreshes never revisit. The new rows are committed in
+        one transaction, so a failed page leaves the store untouched for
+        the same reason.
+
+        Args:
+            max_pages (int): Depth of a cold fill, in pages.
+
+        Returns:
+            int: Number of new articles stored.
+        """
+        with self._refresh_lock:
+            known_max = self.max_ar_id()
+            fetched: List[Dict[str, Any]] = []
+            page = 0
+            while known_max is not None or page < max_pages:
+                page += 1
+                try:
+                    json_data = fetch_news_json(page, self.list_type, base_url=self.base_url)
+                except requests.RequestException as e:
+                    print(f"Failed to refresh news store at page {page}: {e}")
+                    return 0
+                records = json_to_dataframe(json_data).to_dict(orient="records")
+                if not records:
+                    break
+                fetched.extend(records)
+                if known_max is not None and any(
+                        int(r["ar_id"]) <= known_max for r in records if r.get("ar_id") is not None):
+                    break
+
+            with self._connect() as conn:
+                added = self.upsert(fetched, conn)
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_refresh', ?)",
+                             (str(time.time()),))
+            return added
+
+    def refresh_if_stale(self, max_age: float = NEWS_REFRESH_SECONDS, max_pages: int = 5) -> int:
+        """Refresh only when the last successful refresh is older than `max_age` seconds."""
+        last = self.last_refresh
+        if last is not None and time.time() - last < max_age:
+            return 0
+        return self.refresh(max_pages=max_pages)
+
+    def prepared(self) -> PreparedNews:
+        """
+        Return every stored article as a PreparedNews, newest `ar_id` first.
+
+        The snapshot is cached and shared between callers; rows stored since
+        the previous call are read and indexed incrementally.
+        """
+        with self._load_lock:
+            since = -1 if self._loaded_max is None else self._loaded_max
+            with self._connect() as conn:
+                rows = conn.execute("SELECT payload FROM news WHERE ar_id > ? ORDER BY ar_id DESC",
+                                    (since,)).fetchall()
+            if rows:
+                records = [json.loads(payload) for (payload,) in rows]
+                self._prepared = self._prepared.extend(pd.DataFrame(records))
+                self._loaded_max = int(records[0]["ar_id"])
+            return self._prepared
+
+    def load(self) -> pd.DataFrame:
+        """
+        Return every stored article, sorted newest `ar_id` first like fetch_all_news.
+
+        The frame is shared between callers, so treat it as read-only.
+        """
+        return self.prepared().frame
+
+
+_default_store: Optional[NewsStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_news_store() -> NewsStore:
+    """Return the process-wide NewsStore at NEWS_STORE_PATH, creating it on first use."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = NewsStore()
+        return _default_store
@@ -0,0 +1,255 @@
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Union
+
+from autogen.io import IOStream
+
+from coding.context import ContextReport, ConversationContext, Summarizer
+from coding.llmcache import ResponseCache, a_cached_generate_reply
+from coding.streaming import StageTiming, TokenQueue, TokenStream
+from coding.tracing import span
+from coding.usage import StageUsage, client_usage, usage_since
+
+FOLLOWUP_PROMPT = """
+Please rewrite 3 follow-up questions that are:
+- short (less than 20 words)
+- directly askable to the teacher
+- concrete and deep
+Avoid any explanation, format, or labels.
+Content:
+{teacher_msg}
+"""
+
+
+def safe_content(raw_content):
+    content = raw_content.strip() if raw_content else ""
+    if not content or content.lower() in [":student_agent", ":teacher_agent"]:
+        return "⚠️ 沒有收到有效回覆，請稍後再試一次或修改問題。"
+    return content
+
+
+def safe_extract_content(reply):
+    if isinstance(reply, dict):
+        return safe_content(reply.get("content", ""))
+    elif isinstance(reply, str):
+        return safe_content(reply)
+    return "⚠️ 回覆格式錯誤"
+
+
+def extract_followups(raw):
+    lines = raw.splitlines()
+    questions = []
+    for l in lines:
+        l = re.sub(r"^[^\w一-鿿]*", "", l.strip())
+        if 4 <= len(l) <= 50 and ("?" in l or "？" in l):
+            questions.append(l)
+    return list(dict.fromkeys(questions))[:3]
+
+
+class TurnView:
+    """
+    Where a TurnPipeline shows its progress. The base class draws nothing.
+
+    Every method is called on the event loop thread (the Streamlit script
+    thread when run from the app), so implementations may draw directly.
+    """
+
+    def stream(self, stage: str) -> TokenStream:
+        """A TokenStream drawing the reply of `stage` as it arrives."""
+        return TokenStream()
+
+    def message(self, role: str, content: str, stream: TokenStream):
+        """Show and record the final text of a reply drawn by `stream`."""
+
+    def followups(self, questions: List[str]):
+        """Show the suggested follow-up questions."""
+
+    def tick(self, elapsed: float):
+        """Called every `TurnPipeline.tick` seconds while the turn runs."""
+
+
+class TurnResult(NamedTuple):
+    student: str
+    teacher: str
+    followups: List[str]
+    timings: List[StageTiming]
+    context: Optional[ContextReport] = None
+    usage: Optional[List[StageUsage]] = None
+
+
+class TurnPipeline:
+    """
+    One user turn of the two-agent chat (student rewrite, teacher answer,
+    follow-up suggestions) run on an asyncio event loop.
+
+    Stages still run in dependency order, but everything that does not feed
+    the next LLM call is moved off its path:
+        - the next request starts as soon as a reply's text is complete,
+          while that reply is finalized on screen and recorded;
+        - response-cache writes run in the background and are only awaited
+          at the end of the turn;
+        - streamed tokens are drawn by a coroutine on the loop thread while
+          the OpenAI client reads the response in an executor thread.
+
+    With a `context`, the teacher gets the conversation so far (a rolling
+    summary plus the recent turns, within the model's token budget) and the
+    turn is added to it; when turns pile up, `summarizer` folds them into the
+    summary in the background, next to the follow-up request.
+
+    `models` maps stage names ("student", "teacher", "follow-up") to the
+    model each runs on, for cache keys and usage records; the agents must
+    already be configured for them. Stages not in it use `model`. The
+    tokens and cost of each stage are in the result's `usage`.
+
+    `run` drives the turn and calls `view.tick` between events. A Streamlit
+    rerun (the user sending a new prompt) raises out of the next draw or
+    tick; the turn is then cancelled and the exception re-raised. Requests
+    already sent keep running in their executor threads, but their results
+    are discarded and nothing waits for them.
+    """
+
+    def __init__(self,
+                 student,
+                 teacher,
+                 model: str,
+                 lang: str,
+                 cache: Optional[ResponseCache] = None,
+                 bypass: bool = False,
+                 view: Optional[TurnView] = None,
+                 tick: float = 0.2,
+                 context: Optional[ConversationContext] = None,
+                 summarizer: Optional[Summarizer] = None,
+                 models: Optional[Dict[str, str]] = None):
+        self.student = student
+        self.teacher = teacher
+        self.model = model
+        self.lang = lang
+        self.cache = cache
+        self.bypass = bypass
+        self.view = view or TurnView()
+        self.tick = tick
+        self.context = context
+        self.summarizer = summarizer
+        self.models = models or {}
+        self.timings: List[StageTiming] = []
+        self.usage: List[StageUsage] = []
+        self._pending: Set[asyncio.Task] = set()
+
+    async def generate(self,
+                       stage: str,
+                       agent,
+                       content: Union[str, List[Dict[str, Any]]],
+                       stream: Optional[TokenStream] = None,
+                       dispatched: Optional[asyncio.Event] = None) -> str:
+        """
+        Reply of `agent` to `content`, drawing tokens into `stream` and recording the stage timing and usage.
+
+        `content` is the text of a single user message or a whole message list.
+        """
+        messages = [{"role": "user", "content": content}] if isinstance(content, str) else content
+        stream = stream or TokenStream()
+        stream.reset()
+        queue: "asyncio.Queue" = asyncio.Queue()
+        model = self.models.get(stage, self.model)
+        before = client_usage(agent)
+        with span(stage, kind="stage", agent=agent.name, model=model) as stage_span:
+            with IOStream.set_default(TokenQueue(asyncio.get_running_loop(), queue)):
+                # The task copies the current context, so the agent streams into `queue`
+                # and its spans are children of this stage's.
+                task = asyncio.ensure_future(a_cached_generate_reply(
+                    self.cache, agent, messages,
+                    model, self.lang, self.bypass, pending=self._pending, dispatched=dispatched))
+            task.add_done_callback(lambda _: queue.put_nowait(None))
+            try:
+                while (item := await queue.get()) is not None:
+                    stream.feed(item[1], item[0])
+                raw, hit = task.result()
+            finally:
+                task.cancel()
+            timing = stream.timing(stage, cached=hit)
+            if stage_span is not None:
+                stage_span.set(cache_hit=hit, ttft=round(timing.ttft, 3))
+        self.timings.append(timing)
+        self.usage.append(usage_since(agent, before, stage, model, cached=hit))
+        return safe_extract_content(raw)
+
+    @staticmethod
+    async def _start(generate, *args) -> "asyncio.Task":
+        """Start `generate(*args)` as a task and return once its request is on the wire."""
+        dispatched = asyncio.Event()
+        task = asyncio.ensure_future(generate(*args, dispatched=dispatched))
+        waiter = asyncio.ensure_future(dispatched.wait())
+        await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+        return task
+
+    async def turn(self, prompt: str, direct: bool = False) -> TurnResult:
+        """
+        Run the turn's stages. With `direct`, the teacher answers `prompt`
+        itself: there is no student rewrite and no follow-up suggestions.
+        """
+        self.timings = []
+        self.usage = []
+        student_msg = ""
+        if not direct:
+            student_stream = self.view.stream("student")
+            student_msg = await self.generate("student", self.student, prompt, student_stream)
+
+        teacher_input = student_msg or prompt
+        if self.context is not None:
+            teacher_input = self.context.build([{"role": "user", "content": teacher_input}],
+                                               self.models.get("teacher", self.model))
+        teacher_stream = self.view.stream("teacher")
+        teacher = await self._start(self.generate, "teacher", self.teacher, teacher_input, teacher_stream)
+        if not direct:
+            self.view.message("student", student_msg, student_stream)
+        teacher_msg = await teacher
+        if self.context is not None:
+            self.context.add_turn([{"role": "user", "content": prompt}, {"role": "assistant", "content": teacher_msg}])
+            if self.summarizer is not None and self.context.needs_fold():
+                self._pending.add(asyncio.ensure_future(asyncio.to_thread(self.context.fold, self.summarizer)))
+
+        questions = []
+        if direct:
+            self.view.message("assistant", teacher_msg, teacher_stream)
+        else:
+            followup = await self._start(
+                self.generate, "follow-up", self.student, FOLLOWUP_PROMPT.format(teacher_msg=teacher_msg))
+            self.view.message("assistant", teacher_msg, teacher_stream)
+            questions = extract_followups(await followup)
+            self.view.followups(questions)
+
+        await asyncio.gather(*self._pending)
+        self._pending.clear()
+        report = self.context.last_report if self.context is not None else None
+        return TurnResult(student_msg, teacher_msg, questions, list(self.timings), report, list(self.usage))
+
+    async def _supervise(self, prompt: str, direct: bool = False) -> TurnResult:
+        main = asyncio.ensure_future(self.turn(prompt, direct))
+        started = time.perf_counter()
+        try:
+            while not (await asyncio.wait({main}, timeout=self.tick))[0]:
+                self.view.tick(time.perf_counter() - started)
+            return main.result()
+        finally:
+            if not main.done():
+                main.cancel()
+                await asyncio.wait({main})
+            for task in self._pending:
+                task.cancel()
+            await asyncio.gather(*self._pending, return_exceptions=True)
+            self._pending.clear()
+
+    def run(self, prompt: str, direct: bool = False) -> TurnResult:
+        """
+        Run one turn to completion in a fresh event loop; `direct` is as in `turn`.
+
+        The loop is closed without joining its executor, so a cancelled turn
+        returns at once instead of waiting for in-flight requests.
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self._supervise(prompt, direct))
+        finally:
+            loop.close()
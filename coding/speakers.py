@@ -0,0 +1,103 @@
+import os
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from autogen.agentchat.group.patterns import AutoPattern
+from autogen.agentchat.group.speaker_selection_result import SpeakerSelectionResult
+from autogen.agentchat.group.targets.group_manager_target import GroupManagerTarget
+from autogen.code_utils import content_str
+
+from coding.tracing import annotate
+
+# "rules" picks the group chat's next speaker from GROUP_SPEAKER_RULES, asking the
+# LLM only when no rule applies; "auto" asks the LLM every round (AutoPattern).
+GROUP_SPEAKER_SELECTION = os.getenv("GROUP_SPEAKER_SELECTION", "rules")
+# Next speaker value of a rule that ends the group chat.
+TERMINATE = None
+
+
+class SpeakerRule(NamedTuple):
+    """
+    After `speaker` spoke, `next_speaker` speaks (TERMINATE ends the chat) if `when` holds for the message.
+
+    `when` takes the last message (a dict) and defaults to always.
+    """
+    speaker: str
+    next_speaker: Optional[str]
+    when: Optional[Callable[[Dict[str, Any]], bool]] = None
+
+    def applies(self, speaker: str, message: Dict[str, Any]) -> bool:
+        return speaker == self.speaker and (self.when is None or self.when(message))
+
+
+def mentions(*words: str) -> Callable[[Dict[str, Any]], bool]:
+    """A `when` condition: the message text contains any of `words` (case-insensitive)."""
+    lowered = [w.lower() for w in words]
+
+    def condition(message: Dict[str, Any]) -> bool:
+        text = content_str(message.get("content")).lower()
+        return any(w in text for w in lowered)
+
+    return condition
+
+
+# The group page's turn: the teacher answers (tool calls go to the tool executor
+# and their results back to the teacher before any rule is consulted), asks the
+# Tech and General agents for their opinions, then the student sums up.
+GROUP_SPEAKER_RULES = (
+    SpeakerRule("Teacher_Agent", "Tech_Agent", mentions("Tech_Agent", "General_Agent", "opinion")),
+    SpeakerRule("Tech_Agent", "General_Agent"),
+    SpeakerRule("General_Agent", "Student_Agent"),
+    SpeakerRule("Student_Agent", TERMINATE, mentions("ALL DONE")),
+)
+
+
+class RuleTarget(GroupManagerTarget):
+    """
+    Group after-work that picks the next speaker from a rule table, and asks the group manager's LLM otherwise.
+
+    The first rule that applies to the last speaker and their message wins.
+    When none does (a speaker without rules, a teacher reply that invites no
+    opinions, a student asking a follow-up) the selection falls back to the
+    LLM, as GroupManagerTarget always does. Being a GroupManagerTarget, it
+    makes the pattern check the manager has the LLM config it may need.
+    """
+
+    rules: Tuple[Any, ...] = ()
+
+    def resolve(self, groupchat, current_agent, user_agent) -> SpeakerSelectionResult:
+        message = groupchat.messages[-1] if groupchat.messages else {}
+        for rule in self.rules:
+            if rule.applies(current_agent.name, message):
+                annotate(selected_by="rule", next_speaker=rule.next_speaker or "terminate")
+                if rule.next_speaker is TERMINATE:
+                    return SpeakerSelectionResult(terminate=True)
+                return SpeakerSelectionResult(agent_name=rule.next_speaker)
+        annotate(selected_by="llm")
+        return super().resolve(groupchat, current_agent, user_agent)
+
+    def display_name(self) -> str:
+        return "the speaker rules"
+
+
+class RulePattern(AutoPattern):
+    """
+    AutoPattern whose next speaker comes from `rules` (see RuleTarget), the LLM deciding only when none applies.
+
+    Example:
+        pattern = RulePattern(initial_agent=teacher, agents=[teacher, tech, general, student],
+                              rules=GROUP_SPEAKER_RULES, group_manager_args={"llm_config": llm_config})
+    """
+
+    def __init__(self, *args, rules: Sequence[SpeakerRule] = GROUP_SPEAKER_RULES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rules = tuple(rules)
+        self.group_after_work = RuleTarget(rules=self.rules, selection_message=self.selection_message)
+
+
+def group_pattern(selection: str = GROUP_SPEAKER_SELECTION, **kwargs) -> AutoPattern:
+    """The group chat pattern for `selection` ("rules" or "auto"); `kwargs` go to the pattern."""
+    if selection == "auto":
+        return AutoPattern(**kwargs)
+    if selection == "rules":
+        return RulePattern(**kwargs)
+    raise ValueError(f"Unknown speaker selection {selection!r}, expected 'rules' or 'auto'")
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, NamedTuple, Optional, Tuple
+
+from autogen.events.client_events import StreamEvent
+from autogen.io import IOConsole, IOStream
+
+CURSOR = "▌"
+
+
+class StageTiming(NamedTuple):
+    stage: str
+    ttft: float
+    ttlt: float
+    cached: bool = False
+
+    def describe(self) -> str:
+        if self.cached:
+            return f"{self.stage} {self.ttlt:.2f}s (cache)"
+        return f"{self.stage} first token {self.ttft:.2f}s / done {self.ttlt:.2f}s"
+
+
+class TokenStream:
+    """
+    autogen IOStream that renders streamed completion tokens into a Streamlit placeholder.
+
+    With `stream=True` in the LLMConfig, the OpenAI client sends every content
+    delta as a StreamEvent to `IOStream.get_default()`. Installed with
+    `stream_tokens`, this stream appends each delta to `text` and redraws
+    `placeholder` (any Streamlit container, or None to only record timings);
+    all other events and input go to the console as before.
+
+    Any other event (e.g. autogen announcing a completed message during
+    `initiate_chat`) ends the message being drawn: with `keep` its text stays
+    on screen without the cursor, otherwise it is removed because the caller
+    renders final messages itself. Times are measured from the last `reset`
+    and span every message since then.
+    """
+
+    def __init__(self, placeholder: Any = None, prefix: str = "", cursor: str = CURSOR, keep: bool = False):
+        self.placeholder = placeholder
+        self.prefix = prefix
+        self.cursor = cursor
+        self.keep = keep
+        self._console = IOConsole()
+        self.reset()
+
+    def reset(self):
+        self.text = ""
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self._slot = None
+
+    def send(self, message: Any) -> None:
+        if not isinstance(message, StreamEvent):
+            self.end_message()
+            self._console.send(message)
+            return
+        self.feed(message.content.content, time.perf_counter())
+
+    def feed(self, delta: str, at: float):
+        """Append a token that arrived at `perf_counter()` time `at` and redraw."""
+        if self.first_token_at is None:
+            self.first_token_at = at
+        self.last_token_at = at
+        self.text += delta
+        if self.placeholder is not None:
+            if self._slot is None:
+                self._slot = self.placeholder.empty()
+            self._slot.markdown(f"{self.prefix}{self.text}{self.cursor}")
+
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n", flush: bool = False) -> None:
+        self._console.print(*objects, sep=sep, end=end, flush=flush)
+
+    def input(self, prompt: str = "", *, password: bool = False) -> str:
+        return self._console.input(prompt, password=password)
+
+    def end_message(self):
+        """Finish the message being drawn; the next token starts a new one below it."""
+        if self._slot is not None:
+            if self.keep:
+                self._slot.markdown(f"{self.prefix}{self.text}")
+            else:
+                self._slot.empty()
+            self._slot = None
+        self.text = ""
+
+    def clear(self):
+        """Remove the partially rendered message, e.g. before the final text is drawn elsewhere."""
+        if self._slot is not None:
+            self._slot.empty()
+            self._slot = None
+
+    def timing(self, stage: str, cached: bool = False) -> StageTiming:
+        """
+        Time to first and last token of the current message.
+
+        When no token was streamed (a cache hit, or a client without streaming
+        support) both equal the time elapsed since `reset`.
+        """
+        end = time.perf_counter() if self.last_token_at is None else self.last_token_at
+        first = end if self.first_token_at is None else self.first_token_at
+        return StageTiming(stage, first - self.started_at, end - self.started_at, cached)
+
+
+class TokenQueue:
+    """
+    autogen IOStream that hands streamed tokens from worker threads to an asyncio.Queue.
+
+    `ConversableAgent.a_generate_reply` runs the OpenAI client in the event
+    loop's executor, so StreamEvents are sent from a worker thread, where
+    Streamlit cannot draw. This stream puts `(arrival time, delta)` on `queue`
+    through the loop instead; a coroutine on the loop thread passes them to
+    `TokenStream.feed`. Other events go to the console.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: "asyncio.Queue[Optional[Tuple[float, str]]]"):
+        self.loop = loop
+        self.queue = queue
+        self._console = IOConsole()
+
+    def send(self, message: Any) -> None:
+        if isinstance(message, StreamEvent):
+            try:
+                self.loop.call_soon_threadsafe(self.queue.put_nowait, (time.perf_counter(), message.content.content))
+            except RuntimeError:
+                pass  # The turn was cancelled and its loop closed; the reply is discarded.
+        else:
+            self._console.send(message)
+
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n", flush: bool = False) -> None:
+        self._console.print(*objects, sep=sep, end=end, flush=flush)
+
+    def input(self, prompt: str = "", *, password: bool = False) -> str:
+        return self._console.input(prompt, password=password)
+
+
+@contextmanager
+def stream_tokens(placeholder: Any = None, prefix: str = "", keep: bool = False) -> Iterator[TokenStream]:
+    """
+    Render tokens streamed by agents inside the `with` block into `placeholder`.
+
+    On exit a message still being drawn is kept or removed according to `keep`.
+
+    Example:
+        with st.chat_message("assistant"):
+            with stream_tokens(st.container(), prefix="👩‍🏫 ") as stream:
+                reply = teacher.generate_reply(messages=messages)
+            stream.clear()
+            st.markdown(f"👩‍🏫 {reply}")
+    """
+    stream = TokenStream(placeholder, prefix=prefix, keep=keep)
+    with IOStream.set_default(stream):
+        yield stream
+    if keep:
+        stream.end_message()
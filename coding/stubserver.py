@@ -0,0 +1,294 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Union
+
+NEWS_PATH_RE = re.compile(r"^/ajax_json/(\d+)/list/(?:([^/]+)/)?$")
+
+
+def make_article(ar_id: int,
+                 section: str = "Taiwan News",
+                 pubdate: str = "2025-05-12",
+                 head: Optional[str] = None,
+                 desc: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build one article record shaped like the Taipei Times `ajax_json` payload.
+    """
+    return {
+        "ar_id": ar_id,
+        "ar_section": section,
+        "ar_pubdate": pubdate,
+        "ar_head": head if head is not None else f"Headline {ar_id}",
+        "ar_desc": desc if desc is not None else f"Description of article {ar_id}",
+        "url": f"https://www.taipeitimes.com/News/taiwan/archives/2025/05/12/{ar_id}",
+    }
+
+
+def paginate(articles: List[Dict[str, Any]], page_size: int = 20) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Split articles into 1-indexed pages, newest `ar_id` first, like the live API.
+    """
+    ordered = sorted(articles, key=lambda a: a["ar_id"], reverse=True)
+    return {
+        i // page_size + 1: ordered[i:i + page_size]
+        for i in range(0, len(ordered), page_size)
+    }
+
+
+class NewsStubServer:
+    """
+    Local threaded HTTP server that serves canned `ajax_json` news pages.
+
+    `pages` maps a page index to its list of article dicts; pages may be
+    swapped at any time to simulate new articles arriving. Every request
+    sleeps `latency` seconds first, and requested paths are recorded in
+    `hits` so tests can assert how many round trips a code path made.
+    Pages listed in `failing` are answered with HTTP 500.
+    """
+
+    def __init__(self, pages: Optional[Dict[int, List[Dict[str, Any]]]] = None,
+                 latency: float = 0.0):
+        self.pages = pages or {}
+        self.latency = latency
+        self.failing: Set[int] = set()
+        self.hits: List[str] = []
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.hits.append(self.path)
+                if stub.latency:
+                    time.sleep(stub.latency)
+                match = NEWS_PATH_RE.match(self.path)
+                if not match:
+                    self.send_error(404)
+                    return
+                if int(match.group(1)) in stub.failing:
+                    self.send_error(500)
+                    return
+                page = stub.pages.get(int(match.group(1)), [])
+                body = json.dumps(page).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "NewsStubServer":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+@contextmanager
+def news_stub(pages: Optional[Dict[int, List[Dict[str, Any]]]] = None,
+              latency: float = 0.0) -> Iterator[NewsStubServer]:
+    """
+    Run a NewsStubServer for the duration of a `with` block.
+
+    Example:
+        with news_stub(paginate([make_article(i) for i in range(1, 101)])) as stub:
+            df = fetch_all_news(1, 5, base_url=stub.base_url)
+    """
+    server = NewsStubServer(pages, latency=latency).start()
+    try:
+        yield server
+    finally:
+        server.stop()
+
+
+def echo_responder(request: Dict[str, Any]) -> str:
+    """Default OpenAIStubServer reply: echoes the start of the last message."""
+    messages = request.get("messages") or [{}]
+    content = messages[-1].get("content") or ""
+    return f"Stub reply to: {str(content)[:80]}"
+
+
+def tool_call(name: str, arguments: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    One canned tool call, for a responder reply like `{"tool_calls": [tool_call("get_time")]}`.
+    """
+    return {"type": "function", "function": {"name": name, "arguments": json.dumps(arguments or {})}}
+
+
+class OpenAIStubServer:
+    """
+    Local OpenAI-compatible `/v1/chat/completions` endpoint for offline runs.
+
+    `responder` maps the decoded request body to the reply: its text, or an
+    assistant message dict with `content` and/or `tool_calls` (see
+    `tool_call`). Every request sleeps `latency` seconds (time to first
+    token) and is appended to `requests`, so tests can count LLM calls; the
+    tool calls returned are counted by name in `tool_calls`. Replies then
+    take `token_latency` seconds per generated word: requests with
+    `"stream": true` get them as server-sent chunks of one word each, the
+    others get the whole reply once it is "generated".
+    Point an LLMConfig at it with `base_url=stub.base_url` and any non-empty
+    api_key.
+    """
+
+    def __init__(self,
+                 responder: Callable[[Dict[str, Any]], Union[str, Dict[str, Any]]] = echo_responder,
+                 latency: float = 0.0,
+                 token_latency: float = 0.0):
+        self.responder = responder
+        self.latency = latency
+        self.token_latency = token_latency
+        self.requests: List[Dict[str, Any]] = []
+        self.tool_calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def completion(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        reply = self.responder(request)
+        message = {"role": "assistant", "content": reply} if isinstance(reply, str) else {
+            "role": "assistant", "content": None, **reply}
+        with self._lock:
+            n = len(self.requests)
+            if message.get("tool_calls"):
+                message["tool_calls"] = [{"id": f"call_stub_{n}_{i}", **call}
+                                         for i, call in enumerate(message["tool_calls"])]
+                self.tool_calls.update(call["function"]["name"] for call in message["tool_calls"])
+        prompt_tokens = sum(len(str(m.get("content") or "").split()) for m in request.get("messages", []))
+        completion_tokens = len((message["content"] or "").split()) + sum(
+            len(call["function"]["arguments"].split()) for call in message.get("tool_calls") or [])
+        return {
+            "id": f"chatcmpl-stub-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def chunks(self, done: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """The streamed form of a `completion`: one `chat.completion.chunk` per word or tool call."""
+        choice = done["choices"][0]
+        words = re.findall(r"\s*\S+", choice["message"]["content"] or "")
+        deltas = [{"content": word} for word in words]
+        deltas += [{"tool_calls": [{"index": i, **call}]} for i, call in enumerate(choice["message"].get("tool_calls") or [])]
+        head = {k: done[k] for k in ("id", "created", "model")}
+        for i, delta in enumerate(deltas or [{"content": ""}]):
+            delta = {"role": "assistant", **delta} if i == 0 else delta
+            yield {**head, "object": "chat.completion.chunk",
+                   "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield {**head, "object": "chat.completion.chunk",
+               "choices": [{"index": 0, "delta": {}, "finish_reason": choice["finish_reason"]}]}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def stream(self, done):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for i, chunk in enumerate(stub.chunks(done)):
+                    if i and stub.token_latency:
+                        time.sleep(stub.token_latency)
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests.append(request)
+                if stub.latency:
+                    time.sleep(stub.latency)
+                done = stub.completion(request)
+                if request.get("stream"):
+                    self.stream(done)
+                    return
+                if stub.token_latency:
+                    time.sleep(stub.token_latency * done["usage"]["completion_tokens"])
+                body = json.dumps(done).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "OpenAIStubServer":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+@contextmanager
+def openai_stub(responder: Callable[[Dict[str, Any]], Union[str, Dict[str, Any]]] = echo_responder,
+                latency: float = 0.0,
+                token_latency: float = 0.0) -> Iterator[OpenAIStubServer]:
+    """
+    Run an OpenAIStubServer for the duration of a `with` block.
+
+    Example:
+        with openai_stub(latency=0.5) as stub:
+            config = LLMConfig(api_type="openai", model="gpt-4o-mini", api_key="stub", base_url=stub.base_url)
+    """
+    server = OpenAIStubServer(responder, latency=latency, token_latency=token_latency).start()
+    try:
+        yield server
+    finally:
+        server.stop()
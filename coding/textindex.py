@@ -0,0 +1,210 @@
+import re
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set
+
+# Han and kana are written without spaces, so a CJK run is indexed as its single
+# characters plus overlapping bigrams; any other run of word characters is one token.
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_CJK_RE = re.compile(f"[{_CJK}]")
+_RUN_RE = re.compile(f"[{_CJK}]+|[^\\W{_CJK}]+")
+# Characters that make a pandas `str.contains(..., regex=True)` query more than a literal.
+REGEX_METACHARS = frozenset(".^$*+?{}[]\\|()")
+
+
+def fold(text: str) -> str:
+    """Case-fold text the same way the substring searches in coding.tools do."""
+    return text.lower()
+
+
+def _text(value: Any) -> Optional[str]:
+    """Case-folded `str(value)`, or None for a missing value (None or NaN)."""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return fold(str(value))
+
+
+def _cjk_tokens(run: str) -> List[str]:
+    return list(run) + [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split case-folded text into index tokens: word runs, plus CJK characters and bigrams.
+
+    Example:
+        >>> tokenize("Taiwan 半導體 AI-chips")
+        ['taiwan', '半', '導', '體', '半導', '導體', 'ai', 'chips']
+    """
+    tokens = []
+    for run in _RUN_RE.findall(fold(text)):
+        if _CJK_RE.match(run):
+            tokens.extend(_cjk_tokens(run))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def is_literal(query: str) -> bool:
+    """True if `query` has no regex metacharacters, i.e. it matches itself as a regex."""
+    return not (REGEX_METACHARS & set(query))
+
+
+class InvertedIndex:
+    """
+    Token postings over one or more text fields, answering case-insensitive substring queries.
+
+    Every document is stored as its case-folded field texts plus, per field,
+    a posting set for each token (see `tokenize`). A query is split into the
+    same runs: CJK runs resolve to the postings of their bigrams, inner word
+    runs must appear verbatim, the first word run must end a document token
+    and the last must start one (a lone run may sit anywhere inside one).
+    Intersecting those postings gives a small candidate set, which is then
+    confirmed with a plain substring check, so results are exactly those of
+    `query.lower() in text.lower()`.
+
+    Documents are keyed by any hashable id and may be added at any time, so
+    the index can be extended as new records arrive instead of rebuilt.
+    Adds, removes and searches hold one lock, so a background thread may
+    extend an index that other threads are searching.
+    """
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        self._texts: Dict[Hashable, Dict[str, Optional[str]]] = {}
+        self._postings: Dict[str, Dict[str, Set[Hashable]]] = {f: {} for f in self.fields}
+        # Per-field vocabulary joined into one newline-separated string, so partial
+        # tokens are found by a single regex scan; dropped whenever the vocabulary changes.
+        self._vocab: Dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._texts
+
+    def add(self, key: Hashable, values: Dict[str, Any]):
+        """
+        Index one document, replacing any previous document with the same key.
+
+        Values are converted with `str()`, as `Series.astype(str)` does. A
+        missing value (None or NaN) matches no query, as in
+        `str.contains(..., na=False)`, which sees it as missing.
+        """
+        texts = {f: _text(values.get(f)) for f in self.fields}
+        tokens = {f: set(tokenize(text)) if text is not None else set() for f, text in texts.items()}
+        with self._lock:
+            if key in self._texts:
+                self.remove(key)
+            self._texts[key] = texts
+            for f, field_tokens in tokens.items():
+                postings = self._postings[f]
+                for token in field_tokens:
+                    keys = postings.get(token)
+                    if keys is None:
+                        keys = postings[token] = set()
+                        self._vocab.pop(f, None)
+                    keys.add(key)
+
+    def add_many(self, records: Iterable[Dict[str, Any]], key_field: str):
+        for record in records:
+            self.add(record[key_field], record)
+
+    def remove(self, key: Hashable):
+        with self._lock:
+            texts = self._texts.pop(key, None)
+            if texts is None:
+                return
+            for f, text in texts.items():
+                postings = self._postings[f]
+                for token in set(tokenize(text or "")):
+                    keys = postings.get(token)
+                    if keys is not None:
+                        keys.discard(key)
+                        if not keys:
+                            del postings[token]
+                            self._vocab.pop(f, None)
+
+    def _partial_tokens(self, field: str, run: str, prefix: bool, suffix: bool) -> Set[str]:
+        """
+        Vocabulary tokens containing `run`; with `prefix` they must start with it,
+        with `suffix` they must end with it. Called with the lock held.
+        """
+        vocab = self._vocab.get(field)
+        if vocab is None:
+            vocab = self._vocab[field] = "\n" + "\n".join(self._postings[field]) + "\n"
+        needle = ("\n" if prefix else "") + run + ("\n" if suffix else "")
+        tokens = set()
+        pos = vocab.find(needle)
+        while pos != -1:
+            start = vocab.rfind("\n", 0, pos + 1) + 1
+            end = vocab.find("\n", pos + len(needle) - 1 if suffix else pos + 1)
+            tokens.add(vocab[start:end])
+            pos = vocab.find(needle, pos + 1)
+        return tokens
+
+    def _candidates(self, query: str, field: str) -> Optional[Set[Hashable]]:
+        """Keys that can contain `query` in `field`, or None when the query has no tokens."""
+        runs = _RUN_RE.findall(query)
+        if not runs:
+            return None
+        postings = self._postings[field]
+        last = len(runs) - 1
+        # Exact lookups are cheap and selective, so intersect them before scanning the vocabulary.
+        exact = [i for i, run in enumerate(runs) if _CJK_RE.match(run) or 0 < i < last]
+        order = exact + [i for i in sorted({0, last}) if i not in exact]
+        result: Optional[Set[Hashable]] = None
+        for i in order:
+            run = runs[i]
+            if _CJK_RE.match(run):
+                lookups = [run] if len(run) == 1 else [run[j:j + 2] for j in range(len(run) - 1)]
+                matched = None
+                for token in lookups:
+                    keys = postings.get(token, set())
+                    matched = set(keys) if matched is None else matched & keys
+            elif i in exact:
+                matched = postings.get(run, set())
+            else:
+                matched = set()
+                for token in self._partial_tokens(field, run, prefix=i > 0, suffix=i < last):
+                    matched |= postings[token]
+            result = set(matched) if result is None else result & matched
+            if not result:
+                return set()
+        return result
+
+    def search(self, query: str, fields: Optional[Sequence[str]] = None) -> Set[Hashable]:
+        """
+        Keys of documents whose text contains `query` (case-insensitive) in any of `fields`.
+
+        Args:
+            query (str): Literal substring to look for.
+            fields (Sequence[str], optional): Subset of the indexed fields. Defaults to all.
+
+        Raises:
+            KeyError: If a requested field was not indexed.
+        """
+        fields = self.fields if fields is None else tuple(fields)
+        missing = set(fields) - set(self.fields)
+        if missing:
+            raise KeyError(f"Fields not indexed: {missing}")
+
+        needle = fold(query)
+        # A query that is one bare word run, or at most two CJK characters, is
+        # contained in every candidate by construction and needs no confirmation.
+        run = _RUN_RE.fullmatch(needle)
+        exact = run is not None and (not _CJK_RE.match(needle) or len(needle) <= 2)
+        found: Set[Hashable] = set()
+        with self._lock:
+            for f in fields:
+                candidates = self._candidates(needle, f)
+                if candidates is None:
+                    candidates = self._texts.keys()
+                elif exact:
+                    found |= candidates
+                    continue
+                for k in candidates:
+                    text = self._texts[k][f]
+                    if k not in found and text is not None and needle in text:
+                        found.add(k)
+        return found
@@ -0,0 +1,124 @@
+import copy
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple
+
+from coding.textindex import fold
+from coding.tracing import annotate
+
+# Every function wrapped by tool_cache, by name, so stats can be reported in one place.
+_CACHED_TOOLS: Dict[str, Callable] = {}
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+    ttl: float
+
+
+def normalize_arg(value: Any, fold_case: bool = True) -> Hashable:
+    """
+    Turn a tool argument into a hashable cache-key component.
+
+    With `fold_case`, strings are folded with coding.textindex.fold, the
+    `str.lower()` the substring searches match with, and otherwise kept as
+    they are: `" ai "` and `"ai"`, or `"STRASSE"` and `"straße"`, find
+    different rows and so get different keys. Lists, tuples and sets become
+    sorted tuples of their distinct normalized items, so
+    `["Sports", "business"]` and `["business", "sports"]` share one key.
+    """
+    if isinstance(value, str):
+        return fold(value) if fold_case else value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = {normalize_arg(v, fold_case) for v in value}
+        return tuple(sorted(items, key=repr))
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalize_arg(v, fold_case)) for k, v in value.items()))
+    return value
+
+
+def tool_cache(ttl: float, maxsize: int = 256, case_sensitive: Iterable[str] = ()):
+    """
+    Memoize an agent tool function with a per-entry TTL and LRU eviction.
+
+    Calls are keyed on their bound arguments after `normalize_arg`, so only
+    wrap tools whose results do not depend on letter case (except for the
+    parameters named in `case_sensitive`) or on the order of list items.
+    Results are deep-copied in and out of the cache: callers can mutate what
+    they get back, and what autogen serializes is exactly what the tool
+    returned. Exceptions are not cached. Whether a call was a hit is set as
+    `cache_hit` on the current tracing span.
+
+    The wrapper keeps the tool's name, docstring and signature, so autogen
+    builds the same tool schema, and adds `cache_info()` / `cache_clear()`.
+
+    Args:
+        ttl (float): Seconds an entry stays valid.
+        maxsize (int): Entries kept; the least recently used is evicted first.
+        case_sensitive (Iterable[str]): Parameters whose strings are not case-folded.
+
+    Example:
+        @tool_cache(ttl=60, case_sensitive=("sections",))
+        def AG_search_news(query=None, sections=None): ...
+    """
+    exact = frozenset(case_sensitive)
+
+    def decorator(fn: Callable) -> Callable:
+        sig = inspect.signature(fn)
+        entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        lock = threading.Lock()
+        stats = {"hits": 0, "misses": 0}
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple((name, normalize_arg(value, name not in exact))
+                        for name, value in bound.arguments.items())
+            now = time.monotonic()
+            with lock:
+                entry = entries.get(key)
+                if entry is not None and entry[0] > now:
+                    entries.move_to_end(key)
+                    stats["hits"] += 1
+                    hit = copy.deepcopy(entry[1])
+                else:
+                    hit = None
+                    stats["misses"] += 1
+            annotate(cache_hit=hit is not None)
+            if hit is not None:
+                return hit
+
+            result = fn(*args, **kwargs)
+            with lock:
+                entries[key] = (time.monotonic() + ttl, copy.deepcopy(result))
+                entries.move_to_end(key)
+                while len(entries) > maxsize:
+                    entries.popitem(last=False)
+            return result
+
+        def cache_info() -> CacheInfo:
+            with lock:
+                return CacheInfo(stats["hits"], stats["misses"], maxsize, len(entries), ttl)
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+                stats["hits"] = stats["misses"] = 0
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        _CACHED_TOOLS[fn.__name__] = wrapper
+        return wrapper
+
+    return decorator
+
+
+def cache_stats() -> Dict[str, CacheInfo]:
+    """CacheInfo of every tool wrapped with tool_cache, by tool name."""
+    return {name: fn.cache_info() for name, fn in _CACHED_TOOLS.items()}
@@ -0,0 +1,239 @@
+import argparse
+import copy
+import hashlib
+import inspect
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, get_args
+
+import autogen
+from autogen import OpenAIWrapper
+from autogen.tools import Tool
+
+from coding.agenttools import AG_search_expert, AG_search_news, AG_search_textbook, get_time
+
+# Generated by `python -m coding.toolregistry`; entries whose fingerprint no longer matches are recomputed.
+TOOL_SCHEMAS_PATH = os.getenv("TOOL_SCHEMAS_PATH", os.path.join(os.path.dirname(__file__), "tool_schemas.json"))
+
+# Agent tools in registration order, with the descriptions the pages give the LLM.
+DEFAULT_TOOLS: Dict[str, Tuple[Callable, str]] = {
+    "AG_search_expert": (AG_search_expert, "Search EXPERTS_LIST by name, discipline, or interest."),
+    "AG_search_textbook": (AG_search_textbook, "Search TEXTBOOK_LIST by title, discipline, or related_expert."),
+    "AG_search_news": (AG_search_news, "Search a pre-fetched news DataFrame by keywords, sections, and date range."),
+    "get_time": (get_time, "Get the current date & time."),
+}
+
+
+def _signature_text(func: Callable) -> str:
+    """
+    `inspect.signature(func)` as text, stable across processes.
+
+    autogen turns the string metadata of `Annotated` parameters into Field
+    objects in place, whose repr holds a memory address; use their
+    description instead.
+    """
+    def describe(annotation) -> str:
+        metadata = getattr(annotation, "__metadata__", None)
+        if metadata is None:
+            return inspect.formatannotation(annotation)
+        notes = [getattr(m, "description", m) for m in metadata]
+        return f"Annotated[{inspect.formatannotation(get_args(annotation)[0])}, {notes!r}]"
+
+    sig = inspect.signature(func)
+    params = [f"{p.kind.name} {p.name}: {describe(p.annotation)} = {p.default!r}" for p in sig.parameters.values()]
+    return f"({', '.join(params)}) -> {describe(sig.return_annotation)}"
+
+
+def fingerprint(func: Callable, name: str, description: str) -> str:
+    """
+    Hash of everything a tool schema is generated from.
+
+    autogen builds the schema from the name, the description and the
+    signature (annotations and defaults), so an unchanged fingerprint means
+    an unchanged schema. The autogen version is included because it owns the
+    generator.
+    """
+    source = f"{autogen.__version__}|{name}|{description}|{_signature_text(func)}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def compile_schema(func: Callable, name: str, description: str) -> Dict[str, Any]:
+    """The tool schema autogen would generate when registering `func` for an LLM."""
+    return Tool(func_or_tool=func, name=name, description=description).tool_schema
+
+
+class CompiledTool(Tool):
+    """
+    An autogen Tool whose JSON schema is computed once, not on every registration.
+
+    Registering it with `register_for_llm()` / `register_for_execution()`
+    (without a new name or description) reuses the same object, so agents
+    get the precomputed schema and it is listed in `agent.tools` as usual.
+    """
+
+    def __init__(self, func: Callable, name: str, description: str, schema: Dict[str, Any]):
+        super().__init__(func_or_tool=func, name=name, description=description)
+        self._schema = schema
+
+    @property
+    def tool_schema(self) -> Dict[str, Any]:
+        return copy.deepcopy(self._schema)
+
+    @property
+    def function_schema(self) -> Dict[str, Any]:
+        return copy.deepcopy(self._schema["function"])
+
+
+class ToolRegistry:
+    """
+    Precompiled schemas for a fixed set of agent tools, registered in bulk.
+
+    Schemas are loaded from `cache_path` when the stored fingerprint of a
+    tool still matches its function; otherwise (or without a cache file) they
+    are generated once here. A stale entry is reported, never used.
+
+    Args:
+        tools (dict): Tool name -> (function, default description), in registration order.
+        cache_path (str, optional): JSON file written by `write_cache`.
+    """
+
+    def __init__(self, tools: Dict[str, Tuple[Callable, str]], cache_path: Optional[str] = TOOL_SCHEMAS_PATH):
+        self.tools = dict(tools)
+        self.cache_path = cache_path
+        cached = self._read_cache()
+        self._compiled: Dict[Tuple[str, str], CompiledTool] = {}
+        for name, (func, description) in self.tools.items():
+            fp = fingerprint(func, name, description)
+            entry = cached.get(name)
+            if entry is not None and entry.get("fingerprint") == fp:
+                schema = entry["schema"]
+            else:
+                if entry is not None:
+                    print(f"Tool schema cache is stale for {name}; regenerate with `python -m coding.toolregistry`.")
+                schema = compile_schema(func, name, description)
+            self._compiled[(name, description)] = CompiledTool(func, name, description, schema)
+
+    def _read_cache(self) -> Dict[str, Dict[str, Any]]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable tool schema cache {self.cache_path}: {e}")
+            return {}
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.tools)
+
+    def get(self, name: str, description: Optional[str] = None) -> CompiledTool:
+        """
+        The compiled tool `name`, optionally with another description.
+
+        A description override reuses the precomputed parameters; the variant
+        is compiled once and kept.
+
+        Raises:
+            KeyError: If `name` is not a registered tool.
+        """
+        func, default = self.tools[name]
+        description = description or default
+        key = (name, description)
+        if key not in self._compiled:
+            schema = copy.deepcopy(self._compiled[(name, default)].tool_schema)
+            schema["function"]["description"] = description
+            self._compiled[key] = CompiledTool(func, name, description, schema)
+        return self._compiled[key]
+
+    def register(self,
+                 caller,
+                 executor,
+                 names: Optional[Iterable[str]] = None,
+                 descriptions: Optional[Dict[str, str]] = None) -> List[CompiledTool]:
+        """
+        Register tools for the LLM of `caller` and for execution by `executor`.
+
+        Same effect as one `register_function(func, caller=caller, executor=executor,
+        description=...)` per tool, but without generating any schema, and the
+        caller's OpenAI client (which autogen rebuilds, with a fresh SSL
+        context, after every single tool signature update) is rebuilt once.
+
+        Args:
+            caller (ConversableAgent): Agent that proposes the tool calls.
+            executor (ConversableAgent): Agent that executes them.
+            names (Iterable[str], optional): Tools to register, in order. Defaults to all.
+            descriptions (dict, optional): Tool name -> description override.
+
+        Raises:
+            RuntimeError: If `caller` has no LLM config.
+        """
+        if not caller.llm_config:
+            raise RuntimeError("LLM config must be setup before registering a function for LLM.")
+        tools = [self.get(name, (descriptions or {}).get(name))
+                 for name in (self.names if names is None else names)]
+        added = {tool.name for tool in tools}
+        current = caller.llm_config["tools"] if "tools" in caller.llm_config else []
+        caller.llm_config["tools"] = ([t for t in current if t.get("function", {}).get("name") not in added]
+                                      + [tool.tool_schema for tool in tools])
+        caller._tools.extend(tool for tool in tools if tool not in caller._tools)
+        caller.client = OpenAIWrapper(**caller.llm_config)
+        for tool in tools:
+            executor.register_for_execution()(tool)
+        return tools
+
+    def check(self) -> List[str]:
+        """Names of tools whose precompiled schema differs from a freshly generated one."""
+        return [name for name, (func, description) in self.tools.items()
+                if self._compiled[(name, description)].tool_schema != compile_schema(func, name, description)]
+
+    def write_cache(self, path: Optional[str] = None) -> str:
+        path = path or self.cache_path
+        entries = {
+            name: {
+                "fingerprint": fingerprint(func, name, description),
+                "schema": compile_schema(func, name, description),
+            }
+            for name, (func, description) in self.tools.items()
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        return path
+
+
+TOOL_REGISTRY = ToolRegistry(DEFAULT_TOOLS)
+
+
+def register_tools(caller,
+                   executor,
+                   names: Optional[Iterable[str]] = None,
+                   descriptions: Optional[Dict[str, str]] = None) -> List[CompiledTool]:
+    """ToolRegistry.register on the default agent tools (see DEFAULT_TOOLS)."""
+    return TOOL_REGISTRY.register(caller, executor, names=names, descriptions=descriptions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate or verify the agent tool schema cache.")
+    parser.add_argument("--check", action="store_true",
+                        help="Exit with status 1 if the cache file or any compiled schema is out of date.")
+    parser.add_argument("--output", default=TOOL_SCHEMAS_PATH)
+    args = parser.parse_args()
+
+    if args.check:
+        registry = ToolRegistry(DEFAULT_TOOLS, cache_path=args.output)
+        cached = registry._read_cache()
+        stale = [name for name, (func, description) in DEFAULT_TOOLS.items()
+                 if cached.get(name, {}).get("fingerprint") != fingerprint(func, name, description)]
+        drifted = registry.check()
+        for name in sorted(set(stale) | set(drifted)):
+            print(f"{name}: schema cache out of date")
+        sys.exit(1 if stale or drifted else 0)
+
+    path = ToolRegistry(DEFAULT_TOOLS, cache_path=None).write_cache(args.output)
+    print(f"Wrote {len(DEFAULT_TOOLS)} tool schemas to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,54 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
-from coding.constant import TEXTBOOK_LIST, EXPERTS_LIST
+from coding.catalog import expert_catalog, textbook_catalog
+from coding.textindex import InvertedIndex, is_literal
 from typing import Optional, List
 import streamlit as st
 
-def fetch_news_json(page_idx: int, list_type: str = 'all') -> dict:
+# Base URL of the Taipei Times JSON API; point it at a local stub server for tests.
+NEWS_API_BASE = os.getenv("NEWS_API_BASE", "https://www.taipeitimes.com")
+# Pages fetched in parallel by fetch_all_news, and the per-request timeout in seconds.
+NEWS_FETCH_WORKERS = int(os.getenv("NEWS_FETCH_WORKERS", "8"))
+NEWS_FETCH_TIMEOUT = float(os.getenv("NEWS_FETCH_TIMEOUT", "10"))
+# Text columns searched by search_news when none are given.
+NEWS_SEARCH_COLUMNS = ['ar_head', 'ar_desc']
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """
+    Return the shared keep-alive session used for news requests.
+
+    The connection pool is sized to NEWS_FETCH_WORKERS so concurrent page
+    fetches reuse connections instead of opening a new one per request.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(NEWS_FETCH_WORKERS, 1))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+def fetch_news_json(page_idx: int,
+                    list_type: str = 'all',
+                    base_url: Optional[str] = None,
+                    session: Optional[requests.Session] = None,
+                    timeout: Optional[float] = NEWS_FETCH_TIMEOUT) -> dict:
+    base_url = (base_url or NEWS_API_BASE).rstrip("/")
     if list_type == 'all':  
-        api_url = f"https://www.taipeitimes.com/ajax_json/{page_idx}/list/"
+        api_url = f"{base_url}/ajax_json/{page_idx}/list/"
     else:
-        api_url = f"https://www.taipeitimes.com/ajax_json/{page_idx}/list/{list_type}/"
+        api_url = f"{base_url}/ajax_json/{page_idx}/list/{list_type}/"
 
-    response = requests.get(api_url)
+    response = (session or get_session()).get(api_url, timeout=timeout)
     response.raise_for_status()
     return response.json()
 
@@ -19,7 +57,10 @@ def json_to_dataframe(json_data: dict) -> pd.DataFrame:
 
 def fetch_all_news(start_page: int = 1,
                    end_page: int = 1,
-                   list_type: str = 'all') -> pd.DataFrame:
+                   list_type: str = 'all',
+                   base_url: Optional[str] = None,
+                   max_workers: int = NEWS_FETCH_WORKERS,
+                   timeout: Optional[float] = NEWS_FETCH_TIMEOUT) -> pd.DataFrame:
     """
     Retrieve and compile Taipei Times news into a single DataFrame from API.
 
@@ -27,18 +68,32 @@ def fetch_all_news(start_page: int = 1,
         start_page (int): First page index to retrieve.
         end_page (int): Last page index to retrieve (inclusive).
         list_type (str): Section of news ('front', 'taiwan', etc.).
+        base_url (str, optional): API host to fetch from. Defaults to NEWS_API_BASE.
+        max_workers (int): Maximum pages in flight at once over the shared session.
+            1 fetches the pages one after another.
+        timeout (float, optional): Per-request timeout in seconds.
 
     Returns:
         pd.DataFrame: Consolidated, sorted, and deduplicated DataFrame of news items.
+            A page that fails is reported and skipped without affecting the others.
     """
-    frames = []
-    for page in range(start_page, end_page + 1):
+    session = get_session()
+
+    def fetch_page(page: int) -> Optional[pd.DataFrame]:
         try:
-            json_data = fetch_news_json(page, list_type)
-            df = json_to_dataframe(json_data)
-            frames.append(df)
-        except requests.HTTPError as e:
+            json_data = fetch_news_json(page, list_type, base_url=base_url, session=session, timeout=timeout)
+            return json_to_dataframe(json_data)
+        except (requests.RequestException, ValueError) as e:
             print(f"Failed to fetch page {page}: {e}")
+            return None
+
+    pages = range(start_page, end_page + 1)
+    if max_workers <= 1 or len(pages) <= 1:
+        results = [fetch_page(page) for page in pages]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pages))) as pool:
+            results = list(pool.map(fetch_page, pages))
+    frames = [df for df in results if df is not None]
 
     if not frames:
         return pd.DataFrame()
@@ -58,7 +113,8 @@ def search_news(
     sections: Optional[List[str]] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-    news_number: Optional[int] = 5
+    news_number: Optional[int] = 5,
+    text_index: Optional[InvertedIndex] = None
 ) -> pd.DataFrame:
     """
     Search a pre-fetched news DataFrame with multiple optional filters.
@@ -77,6 +133,10 @@ def search_news(
         sections (List[str], optional): List of ar_section values to include.
         date_from (str, optional): Start date (inclusive) 'YYYY-MM-DD'.
         date_to (str, optional): End date (inclusive) 'YYYY-MM-DD'.
+        text_index (InvertedIndex, optional): Index keyed by `ar_id` covering at least
+            the rows of `df` (see build_news_index). When given, literal queries are
+            answered from its postings instead of scanning every row; queries with
+            regex metacharacters still go through `str.contains`.
 
     Returns:
         pd.DataFrame: Filtered DataFrame matching all provided criteria.
@@ -96,7 +156,7 @@ def search_news(
 
     # Default search columns
     if search_columns is None:
-        search_columns = ['ar_head', 'ar_desc']
+        search_columns = NEWS_SEARCH_COLUMNS
 
     # Ensure search_columns exist
     missing_search = set(search_columns) - set(df.columns)
@@ -107,9 +167,13 @@ def search_news(
 
     # Text query filter
     if query is not None:
-        text_mask = pd.Series(False, index=df.index)
-        for col in search_columns:
-            text_mask |= df[col].astype(str).str.contains(query, case=False, na=False)
+        if (text_index is not None and 'ar_id' in df.columns and is_literal(query)
+                and set(search_columns) <= set(text_index.fields)):
+            text_mask = df['ar_id'].isin(text_index.search(query, search_columns))
+        else:
+            text_mask = pd.Series(False, index=df.index)
+            for col in search_columns:
+                text_mask |= df[col].astype(str).str.contains(query, case=False, na=False)
         mask &= text_mask
 
     # Section filter
@@ -133,24 +197,25 @@ def search_news(
 
     return result
 
+def build_news_index(df: pd.DataFrame) -> InvertedIndex:
+    """
+    Build an InvertedIndex over the NEWS_SEARCH_COLUMNS of a news DataFrame, keyed by `ar_id`.
+
+    The index can be extended with `add_many` as new articles arrive.
+    """
+    index = InvertedIndex(NEWS_SEARCH_COLUMNS)
+    if not df.empty:
+        index.add_many(df.to_dict(orient="records"), key_field='ar_id')
+    return index
+
 def search_expert(name: str = None,
                   discipline: str = None,
                   interest: str = None):
-    results = []
-    for exp in EXPERTS_LIST["EXPERTS"]:
-        if ((name and name.lower() in exp["NAME"].lower()) or
-            (discipline and discipline.lower() in exp["DISCIPLINE"].lower()) or
-            (interest and interest.lower() in exp["INTEREST"].lower())):
-            results.append(exp)
+    results = expert_catalog().search(NAME=name, DISCIPLINE=discipline, INTEREST=interest)
     return results or [{"error": "No matching experts found."}]
 
 def search_textbook(title: str = None,
                     discipline: str = None,
                     related_expert: str = None):
-    results = []
-    for tb in TEXTBOOK_LIST["TEXTBOOKS"]:
-        if ((title and title.lower() in tb["TITLE"].lower()) or
-            (discipline and discipline.lower() in tb["DISCIPLINE"].lower()) or
-            (related_expert and related_expert.lower() in tb["RELATED_EXPERT"].lower())):
-            results.append(tb)
+    results = textbook_catalog().search(TITLE=title, DISCIPLINE=discipline, RELATED_EXPERT=related_expert)
     return results or [{"error": "No matching textbooks found."}]
\ No newline at end of file
@@ -0,0 +1,453 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, suppress
+from html import escape
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Set TRACING=0 to turn spans off; TRACE_PATH="" keeps them in memory only.
+TRACING = os.getenv("TRACING", "1") != "0"
+TRACE_PATH = os.getenv("TRACE_PATH", os.path.join("data", "traces.jsonl"))
+# Finished traces kept in memory for the trace panel.
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "100"))
+# TRACE_PATH is rolled over to TRACE_PATH.1 once it grows past this size, and
+# the older files to .2, .3 ... up to TRACE_BACKUPS; the oldest is dropped.
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(8 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.getenv("TRACE_BACKUPS", "3"))
+
+
+class Span:
+    """
+    One timed operation of a trace: a turn, an agent stage, an LLM request, a tool call.
+
+    Spans started while another is current become its children. Times are
+    epoch seconds; `attributes` holds what is known about the operation
+    (agent, model, tokens, cache hits) and `error` the exception it ended with.
+    """
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes: Any):
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(8)
+        self.span_id = secrets.token_hex(4)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.end or time.time()) - self.start)
+
+    def set(self, **attributes: Any) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "name": self.name, "start": self.start, "end": self.end,
+                "duration_ms": round(self.duration * 1000, 3), "attributes": self.attributes,
+                "error": self.error}
+
+
+class JsonlSpanExporter:
+    """
+    Appends finished spans to a JSON Lines file, one span per line.
+
+    Once the file has grown past `max_bytes` it is renamed to `<path>.1`
+    (older files move up to `<path>.<backups>`, the oldest is removed) and a
+    new one started, so traces take at most about `(backups + 1) * max_bytes`
+    on disk. `max_bytes` 0 never rolls the file over.
+    """
+
+    def __init__(self, path: str = TRACE_PATH, max_bytes: int = TRACE_MAX_BYTES, backups: int = TRACE_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def _roll_over(self):
+        # Another process appending to the same file may have rolled it over first.
+        with suppress(FileNotFoundError):
+            if self.backups <= 0:
+                os.remove(self.path)
+                return
+            for n in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{n}"):
+                    os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+            os.replace(self.path, f"{self.path}.1")
+
+    def export(self, spans: List[Span]):
+        lines = [json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n" for s in spans]
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if self.max_bytes > 0 and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    self._roll_over()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+        except OSError as e:
+            print(f"Could not write traces to {self.path}: {e}")
+
+
+class Tracer:
+    """
+    Collects finished spans by trace and hands each trace to the exporter once its root ends.
+
+    A trace is exported in one write when its root span finishes; spans of
+    it that finish later (background work) are exported on their own. The
+    last `keep` traces stay in memory for `trace()`.
+    """
+
+    def __init__(self, exporter: Optional[JsonlSpanExporter] = None, keep: int = TRACE_KEEP):
+        self.exporter = exporter
+        self.keep = keep
+        self._open: Dict[str, List[Span]] = {}
+        self._done: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def finish(self, span: Span):
+        with self._lock:
+            if span.trace_id in self._done:
+                self._done[span.trace_id].append(span)
+                spans = [span]
+            else:
+                self._open.setdefault(span.trace_id, []).append(span)
+                if span.parent_id is not None:
+                    return
+                spans = self._open.pop(span.trace_id)
+                self._done[span.trace_id] = spans
+                while len(self._done) > self.keep:
+                    self._done.popitem(last=False)
+        if self.exporter is not None:
+            self.exporter.export(spans)
+
+    def trace(self, trace_id: str) -> List[Span]:
+        """Finished spans of a trace, by start time."""
+        with self._lock:
+            return sorted(self._done.get(trace_id, []), key=lambda s: s.start)
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("trace_span", default=None)
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide Tracer, exporting to TRACE_PATH, creating it on first use."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(JsonlSpanExporter(TRACE_PATH) if TRACE_PATH else None)
+        return _tracer
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def annotate(**attributes: Any):
+    """Set attributes on the current span, if there is one."""
+    span = _current.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Time the block as a span, child of the current one; yields the span (None when TRACING is off).
+
+    Example:
+        with span("turn", page="two_agents") as turn:
+            ...
+        st.session_state["last_trace"] = turn.trace_id
+    """
+    if not TRACING:
+        yield None
+        return
+    s = Span(name, _current.get(), **attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        s.end = time.time()
+        get_tracer().finish(s)
+
+
+def traced(name: Optional[str] = None, arguments: bool = False, **attributes: Any) -> Callable[[Callable], Callable]:
+    """
+    Decorator running each call of the function in a span named `name` (default: the function name).
+
+    With `arguments`, the call's keyword arguments are recorded (as text, at
+    most 200 characters). The wrapper keeps the function's name, docstring
+    and signature, so it can wrap agent tools without changing their schema.
+
+    Example:
+        @traced(kind="tool", arguments=True)
+        def get_time(): ...
+    """
+    def decorator(fn: Callable) -> Callable:
+        label = name or fn.__name__
+
+        def describe(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+            return {**attributes, "arguments": str(kwargs)[:200]} if arguments else attributes
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(label, **describe(kwargs)):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label, **describe(kwargs)):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def waterfall_html(spans: List[Span]) -> str:
+    """
+    A trace as an HTML waterfall: one row per span, indented under its parent, with a bar for its time.
+    """
+    if not spans:
+        return ""
+    ids = {s.span_id for s in spans}
+    children: Dict[Optional[str], List[Span]] = {}
+    for s in sorted(spans, key=lambda s: s.start):
+        children.setdefault(s.parent_id if s.parent_id in ids else None, []).append(s)
+    start = min(s.start for s in spans)
+    total = max((s.end or s.start) for s in spans) - start or 1e-9
+
+    rows = []
+
+    def add(parent_id: Optional[str], depth: int):
+        for s in children.get(parent_id, []):
+            left = (s.start - start) / total * 100
+            width = max(s.duration / total * 100, 0.5)
+            details = ", ".join(f"{k}={v}" for k, v in s.attributes.items() if k != "arguments")
+            color = "#e57373" if s.error else ("#81c784" if s.attributes.get("cache_hit") else "#64b5f6")
+            rows.append(
+                f"<div title='{escape(details)}' style='font-size: 12px; white-space: nowrap;'>"
+                f"<div style='padding-left: {depth * 10}px;'>{escape(s.name)} "
+                f"<b>{s.duration * 1000:.0f} ms</b></div>"
+                f"<div style='margin-left: {left:.2f}%; width: {width:.2f}%; height: 6px; "
+                f"background-color: {color}; border-radius: 3px;'></div></div>")
+            add(s.span_id, depth + 1)
+
+    add(None, 0)
+    return "\n".join(rows)
+
+
+def _usage(response: Any) -> Dict[str, Any]:
+    usage = getattr(response, "usage", None)
+    found = {"response_model": getattr(response, "model", None),
+             "prompt_tokens": getattr(usage, "prompt_tokens", None),
+             "completion_tokens": getattr(usage, "completion_tokens", None),
+             "cost": getattr(response, "cost", None)}
+    return {k: v for k, v in found.items() if v is not None}
+
+
+# Marks an agent, client, group chat or pattern whose methods are already wrapped.
+_INSTRUMENTED = "_trace_instrumented"
+
+
+def _mark(obj: Any) -> bool:
+    """Mark `obj` as instrumented; False if it already was."""
+    if obj is None or getattr(obj, _INSTRUMENTED, False):
+        return False
+    setattr(obj, _INSTRUMENTED, True)
+    return True
+
+
+def _wrap(obj: Any, method: str, label: str, describe: Callable[..., Dict[str, Any]],
+          before: Optional[Callable[[], None]] = None):
+    """Replace the bound `obj.<method>` on the instance with one that runs it in a span."""
+    original = getattr(obj, method, None)
+    if original is None:
+        return
+    if asyncio.iscoroutinefunction(original):
+        @functools.wraps(original)
+        async def async_wrapper(*args, **kwargs):
+            if before is not None:
+                before()
+            with span(label, **describe(obj, *args, **kwargs)):
+                return await original(*args, **kwargs)
+        setattr(obj, method, async_wrapper)
+    else:
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            if before is not None:
+                before()
+            with span(label, **describe(obj, *args, **kwargs)):
+                return original(*args, **kwargs)
+        setattr(obj, method, wrapper)
+
+
+def _instrument_client(client: Any):
+    """Trace an OpenAIWrapper's requests as "llm" spans with the model and token counts."""
+    if not _mark(client):
+        return
+    create = client.create
+
+    @functools.wraps(create)
+    def traced_create(**config):
+        settings = {**((getattr(client, "_config_list", None) or [{}])[0]), **config}
+        with span("llm", model=settings.get("model"), stream=bool(settings.get("stream"))) as s:
+            response = create(**config)
+            if s is not None:
+                s.set(**_usage(response))
+            return response
+
+    client.create = traced_create
+
+
+class _InSpan:
+    """
+    Stands in for an agent in autogen's `a_generate_oai_reply`, so the reply's span reaches the executor thread.
+
+    autogen runs `generate_oai_reply` through `run_in_executor`, which does not
+    carry the caller's context to the thread. Everything but that call goes to
+    the agent; the call runs in a copy of the thread's context (which holds the
+    IOStream autogen set for it) with the caller's span made current.
+    """
+
+    def __init__(self, agent: Any, parent: Optional[Span]):
+        self._agent = agent
+        self._parent = parent
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._agent, name)
+
+    def _run(self, *args, **kwargs):
+        _current.set(self._parent)
+        return self._agent.generate_oai_reply(*args, **kwargs)
+
+    def generate_oai_reply(self, *args, **kwargs):
+        return contextvars.copy_context().run(self._run, *args, **kwargs)
+
+
+def _agent(agent, *args, **kwargs) -> Dict[str, Any]:
+    return {"agent": agent.name}
+
+
+def _chat(agent, recipient=None, *args, **kwargs) -> Dict[str, Any]:
+    return {"sender": agent.name, "recipient": getattr(recipient or kwargs.get("recipient"), "name", None)}
+
+
+def _selection(groupchat, last_speaker=None, *args, **kwargs) -> Dict[str, Any]:
+    method = groupchat.speaker_selection_method
+    return {"last_speaker": getattr(last_speaker or kwargs.get("last_speaker"), "name", None),
+            "method": getattr(method, "__name__", str(method))}
+
+
+def instrument_agents(*agents: Any):
+    """
+    Trace these autogen agents: generate_reply, initiate_chat and their LLM requests, as spans.
+
+    Only the given instances are changed (their methods are wrapped on the
+    instance, nothing on the autogen classes), and an agent is wrapped once
+    however often it is passed. LLM request spans carry the model and token
+    counts; the agent's client is instrumented on each reply, since autogen
+    replaces it when tools are registered. The async LLM reply keeps
+    autogen's implementation and only gets the reply's span into the
+    executor thread it runs the request in (see `_InSpan`).
+
+    Example:
+        student, teacher = ConversableAgent(...), ConversableAgent(...)
+        instrument_agents(student, teacher)
+    """
+    if not TRACING:
+        return
+    from autogen import ConversableAgent
+
+    for agent in agents:
+        if not isinstance(agent, ConversableAgent) or not _mark(agent):
+            continue
+
+        def client(agent=agent):
+            _instrument_client(getattr(agent, "client", None))
+
+        for method in ["generate_reply", "a_generate_reply"]:
+            _wrap(agent, method, "generate_reply", _agent, before=client)
+        for method in ["initiate_chat", "a_initiate_chat"]:
+            _wrap(agent, method, "initiate_chat", _chat)
+
+        for entry in agent._reply_func_list:
+            if entry["reply_func"] is ConversableAgent.a_generate_oai_reply:
+                entry["reply_func"] = _a_generate_oai_reply
+
+
+async def _a_generate_oai_reply(self, messages=None, sender=None, config=None):
+    """autogen's `a_generate_oai_reply`, with the caller's span current in the executor thread."""
+    from autogen import ConversableAgent
+
+    return await ConversableAgent.a_generate_oai_reply(
+        _InSpan(self, _current.get()), messages=messages, sender=sender, config=config)
+
+
+def instrument_groupchat(groupchat: Any):
+    """Trace a GroupChat's speaker selection, including the LLM requests of the agents it selects with."""
+    if not TRACING or not _mark(groupchat):
+        return
+    for method in ["select_speaker", "a_select_speaker"]:
+        _wrap(groupchat, method, "select_speaker", _selection)
+
+    create_internal_agents = getattr(groupchat, "_create_internal_agents", None)
+    if create_internal_agents is not None:
+        @functools.wraps(create_internal_agents)
+        def traced_internal_agents(*args, **kwargs):
+            internal = create_internal_agents(*args, **kwargs)
+            instrument_agents(*internal)
+            return internal
+
+        groupchat._create_internal_agents = traced_internal_agents
+
+
+def instrument_pattern(pattern: Any):
+    """
+    Trace the group chats run with an autogen group Pattern (`initiate_group_chat(pattern=...)`).
+
+    autogen builds the group chat, its manager and tool executor anew for
+    every chat, in `prepare_group_chat`; every agent and group chat it
+    returns is instrumented as it is built. The manager runs the chat with
+    the copy of the group chat it registered as its reply config, so that
+    copy is instrumented too.
+    """
+    if not TRACING or not _mark(pattern):
+        return
+    from autogen import ConversableAgent
+    from autogen.agentchat.groupchat import GroupChat
+
+    prepare = pattern.prepare_group_chat
+
+    @functools.wraps(prepare)
+    def traced_prepare(*args, **kwargs):
+        components = prepare(*args, **kwargs)
+        for component in components:
+            for item in (component if isinstance(component, list) else [component]):
+                if isinstance(item, ConversableAgent):
+                    instrument_agents(item)
+                    for entry in item._reply_func_list:
+                        if isinstance(entry["config"], GroupChat):
+                            instrument_groupchat(entry["config"])
+                elif isinstance(item, GroupChat):
+                    instrument_groupchat(item)
+        return components
+
+    pattern.prepare_group_chat = traced_prepare
@@ -0,0 +1,197 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+USAGE_LEDGER_PATH = os.getenv("USAGE_LEDGER_PATH", os.path.join("data", "usage.sqlite"))
+# Default daily spend limit of a profile, in USD; 0 means no limit.
+DAILY_BUDGET = float(os.getenv("DAILY_BUDGET", "1.0"))
+# Model the router gives the cheap stages, and every stage once a profile is over budget.
+CHEAP_MODEL = os.getenv("CHEAP_MODEL", "gpt-4o-mini")
+# Stages of a home page turn, and the ones that do not need the chosen model.
+STAGES = ("student", "teacher", "follow-up", "summary")
+CHEAP_STAGES = ("student", "follow-up", "summary")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    session TEXT,
+    profile TEXT,
+    stage TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    cached INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS usage_profile_day ON usage (profile, day);
+"""
+
+
+class StageUsage(NamedTuple):
+    """Tokens and cost of one stage of a turn, on `model`; `cached` when the reply came from the response cache."""
+    stage: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    cached: bool = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class UsageTotals(NamedTuple):
+    profile: Optional[str]
+    stage: str
+    model: str
+    requests: int
+    cached: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+
+
+def client_usage(agent) -> Dict[str, Any]:
+    """A copy of the usage autogen has counted for `agent`'s client so far, by response model."""
+    summary = getattr(getattr(agent, "client", None), "total_usage_summary", None) or {}
+    return {model: dict(usage) for model, usage in summary.items() if isinstance(usage, dict)}
+
+
+def usage_since(agent, before: Dict[str, Any], stage: str, model: str, cached: bool = False) -> StageUsage:
+    """
+    The usage of `agent` since `before` (from `client_usage`) as the StageUsage of `stage`.
+
+    autogen adds the `usage` fields of every response (counted locally for
+    streamed ones) to its client's summary; the difference is what the
+    stage's requests used. The agent must not serve another stage meanwhile.
+    """
+    prompt = completion = 0
+    cost = 0.0
+    for name, usage in client_usage(agent).items():
+        earlier = before.get(name, {})
+        prompt += usage.get("prompt_tokens", 0) - earlier.get("prompt_tokens", 0)
+        completion += usage.get("completion_tokens", 0) - earlier.get("completion_tokens", 0)
+        cost += usage.get("cost", 0) - earlier.get("cost", 0)
+    return StageUsage(stage, model, prompt, completion, round(cost, 8), cached)
+
+
+def today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+class UsageLedger:
+    """
+    Persisted record of the tokens and cost of every turn stage, by session, profile, stage and model.
+
+    Example:
+        ledger = get_usage_ledger()
+        ledger.record(session_id(), profile, result.usage)
+        ledger.spent(profile)  # USD today
+    """
+
+    def __init__(self, path: str = USAGE_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, session: Optional[str], profile: Optional[str], usages: Iterable[StageUsage],
+               ts: Optional[float] = None):
+        ts = time.time() if ts is None else ts
+        day = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+        rows = [(ts, day, session, profile, u.stage, u.model, u.prompt_tokens, u.completion_tokens, u.cost,
+                 int(u.cached)) for u in usages]
+        with self._lock, self._connect() as conn:
+            conn.executemany("INSERT INTO usage (ts, day, session, profile, stage, model, prompt_tokens, "
+                             "completion_tokens, cost, cached) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def totals(self, profile: Optional[str] = None, day: Optional[str] = None) -> List[UsageTotals]:
+        """Usage summed by profile, stage and model; only `profile`'s and `day`'s when given."""
+        where, params = [], []
+        if profile is not None:
+            where.append("profile = ?")
+            params.append(profile)
+        if day is not None:
+            where.append("day = ?")
+            params.append(day)
+        sql = ("SELECT profile, stage, model, COUNT(*), SUM(cached), SUM(prompt_tokens), SUM(completion_tokens), "
+               "SUM(cost) FROM usage" + (" WHERE " + " AND ".join(where) if where else "")
+               + " GROUP BY profile, stage, model ORDER BY profile, stage, model")
+        with self._connect() as conn:
+            return [UsageTotals(*row) for row in conn.execute(sql, params)]
+
+    def spent(self, profile: Optional[str], day: Optional[str] = None) -> float:
+        """USD spent by `profile` on `day` (default: today)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT COALESCE(SUM(cost), 0) FROM usage WHERE profile = ? AND day = ?",
+                               (profile, day or today())).fetchone()
+        return row[0]
+
+    def rename_profile(self, old: str, new: str):
+        """Move `old`'s usage to `new`, so a renamed profile keeps its spend."""
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE usage SET profile = ? WHERE profile = ?", (new, old))
+
+
+class Route(NamedTuple):
+    """The model of each turn stage, and the profile's spend and budget it was decided on."""
+    models: Dict[str, str]
+    spent: float
+    budget: float
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget > 0 and self.spent >= self.budget
+
+
+class BudgetRouter:
+    """
+    Picks the model of each stage of a turn from the profile's spend.
+
+    The cheap stages (student rewrite, follow-up suggestions, summaries) run
+    on `cheap_model`; the teacher answer runs on the model the user chose
+    until the profile has spent its daily budget, after which it runs on
+    `cheap_model` too. A budget of 0 means no limit.
+    """
+
+    def __init__(self, ledger: UsageLedger, cheap_model: str = CHEAP_MODEL, cheap_stages=CHEAP_STAGES):
+        self.ledger = ledger
+        self.cheap_model = cheap_model
+        self.cheap_stages = set(cheap_stages)
+
+    def route(self, profile: Optional[str], model: str, budget: float = DAILY_BUDGET) -> Route:
+        spent = self.ledger.spent(profile)
+        over = budget > 0 and spent >= budget
+        models = {stage: self.cheap_model if over or stage in self.cheap_stages else model for stage in STAGES}
+        return Route(models, spent, budget)
+
+
+_default_ledger: Optional[UsageLedger] = None
+_default_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Return the process-wide UsageLedger at USAGE_LEDGER_PATH, creating it on first use."""
+    global _default_ledger
+    with _default_ledger_lock:
+        if _default_ledger is None:
+            _default_ledger = UsageLedger()
+        return _default_ledger
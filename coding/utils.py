@@ -1,20 +1,56 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from typing import List, Dict, Any, Optional
 import json
 import os
+from contextlib import contextmanager
 from datetime import datetime
 
+from coding.history import HISTORY_WINDOW, visible_messages
+from coding.messages import get_message_store
+from coding.tracing import get_tracer, span, waterfall_html
+
 def paging():
-    st.page_link("streamlit_app.py", label="Home", icon="🏠")
+    st.page_link("streamlit_app_2agent.py", label="Home", icon="🏠")
     st.page_link("pages/one_agent.py", label="Teacher Agents' Talk", icon="👩‍💼")
     st.page_link("pages/two_agents.py", label="Two Agents' Talk", icon="🧑‍🤝‍🧑")
     st.page_link("pages/group_agents.py", label="Group Agents' Talk", icon="💭")
+    st.page_link("pages/chat_analytics.py", label="Chat Analytics", icon="📊")
+
+def session_id() -> str:
+    """Id of the current browser session, for chat logs; "local" outside a Streamlit run."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
 
-def display_session_msg(container_obj, user_image: Optional[str] = None):
-    # Initialize messages list if not present
-    messages = st.session_state.setdefault("messages", [])
+@contextmanager
+def turn_span(page: str, **attributes):
+    """
+    Trace a chat turn as a root span, remembered as the session's last trace for show_trace_panel.
 
-    for msg in messages:
+    Works as a decorator too: `@turn_span("home")` above a page's chat function.
+    """
+    with span("turn", page=page, session=session_id(), **attributes) as turn:
+        if turn is not None:
+            st.session_state["last_trace"] = turn.trace_id
+        yield turn
+
+def show_trace_panel(container_obj=st):
+    """Optional waterfall of the session's last traced turn; call it after the turn has run."""
+    if not container_obj.checkbox("Show last turn trace", value=False, key="show_trace"):
+        return
+    trace_id = st.session_state.get("last_trace")
+    spans = get_tracer().trace(trace_id) if trace_id else []
+    if not spans:
+        container_obj.caption("No traced turn yet.")
+        return
+    container_obj.caption(f"Trace `{trace_id}` · {len(spans)} spans · {spans[0].duration * 1000:.0f} ms")
+    container_obj.markdown(waterfall_html(spans), unsafe_allow_html=True)
+
+def display_session_msg(container_obj, user_image: Optional[str] = None, window: int = HISTORY_WINDOW):
+    messages = get_message_store()
+
+    # Only the most recent messages are drawn; older ones behind a "load older" button.
+    for msg in visible_messages(container_obj, messages, "messages", window):
         role = msg.get("role", "user")
         content = msg.get("content", "")
         avatar = None
@@ -37,13 +73,12 @@ def show_chat_history(container_obj, chat_history: List[Dict[str, Any]], user_im
       1. Skipping any entries whose role is 'tool'
       2. Skipping entries with null or empty content
       3. Stripping out the "ALL DONE" token
-    Displays each valid message via Streamlit and returns the processed messages
-    as a JSON-formatted string.
+    Adds each valid message to the session's MessageStore, where the reply
+    hooks may already have put it, and returns the ones that were new as a
+    JSON-formatted string.
     """
-    if 'messages' not in st.session_state:
-        st.session_state.messages = []
-
-    processed = []
+    store = get_message_store()
+    cursor = len(store)
 
     for entry in chat_history:
         if entry.get('role') == 'tool':
@@ -62,12 +97,8 @@ def show_chat_history(container_obj, chat_history: List[Dict[str, Any]], user_im
 
             continue
 
-        # role = entry.get('role', 'user')
-        # message = {"role": role, "content": content}
-        # processed.append(message)
-
         # Append to session history
-        # st.session_state.messages.append(message)
+        store.append(entry.get('role', 'user'), content, entry.get('name'), key=entry.get('content'))
 
         # Display according to role
         # if role == 'assistant':
@@ -75,8 +106,9 @@ def show_chat_history(container_obj, chat_history: List[Dict[str, Any]], user_im
         # else:
         #     container_obj.chat_message("ai").write(content)
 
-    # Return the processed messages as a JSON string
-    return json.dumps(processed, ensure_ascii=False, indent=2)
+    # Return the messages new since the call as a JSON string
+    processed, _ = store.since(cursor)
+    return json.dumps([m.to_dict() for m in processed], ensure_ascii=False, indent=2)
 
 def save_messages_to_json(
     messages: List[Dict[str, Any]],
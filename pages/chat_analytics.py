@@ -0,0 +1,79 @@
+import streamlit as st
+
+import time
+
+from coding.utils import paging
+from coding.chatlog import get_chat_log_writer
+from coding.chatindex import get_chat_index
+
+user_name = "Gild"
+
+
+def refresh_index():
+    # Records still queued in this process are written first, so they are indexed too.
+    get_chat_log_writer().flush(timeout=2)
+    started = time.perf_counter()
+    stats = get_chat_index().ingest()
+    st.session_state["chat_index_stats"] = (stats, time.perf_counter() - started)
+
+
+def main():
+    st.set_page_config(
+        page_title='K-Assistant - The Residemy Agent',
+        layout='wide',
+        initial_sidebar_state='auto',
+        menu_items={
+            'Get Help': 'https://streamlit.io/',
+            'Report a bug': 'https://github.com',
+            'About': 'About your application: **Hello world**'
+            },
+        page_icon="img/favicon.ico"
+    )
+
+    st.title(f"📊 {user_name}'s Chat Analytics")
+
+    index = get_chat_index()
+    if "chat_index_stats" not in st.session_state:
+        refresh_index()
+
+    with st.sidebar:
+        paging()
+
+        st.button("Refresh index", on_click=refresh_index)
+        stats, elapsed = st.session_state["chat_index_stats"]
+        st.caption(f"Last refresh: {stats.added} new messages from {stats.files} files in {elapsed * 1000:.0f} ms")
+        since = st.date_input("From", value=None)
+        until = st.date_input("To", value=None)
+
+    since = since.isoformat() if since else None
+    until = until.isoformat() if until else None
+
+    daily = index.daily_counts(since, until)
+    roles = index.role_counts()
+    answer_length = index.average_answer_length(since=since, until=until)
+
+    col_1, col_2, col_3 = st.columns(3)
+    col_1.metric("Messages", f"{int(daily['messages'].sum()):,}")
+    col_2.metric("Days", daily["day"].nunique())
+    col_3.metric("Average answer length", f"{answer_length:.0f} chars" if answer_length is not None else "—")
+
+    st.subheader("Messages per day")
+    if daily.empty:
+        st.info("No chat logs indexed yet.")
+    else:
+        st.bar_chart(daily.pivot(index="day", columns="role", values="messages").fillna(0))
+    st.subheader("Messages per role")
+    st.dataframe(roles, hide_index=True)
+
+    st.subheader("Search")
+    col_1, col_2 = st.columns([3, 1])
+    query = col_1.text_input("Search messages", placeholder="e.g. 台灣 history")
+    role = col_2.selectbox("Role", ["All"] + [r for r in roles["role"] if r])
+    if query:
+        started = time.perf_counter()
+        results = index.search(query, limit=50, role=None if role == "All" else role, since=since, until=until)
+        st.caption(f"{len(results)} matches in {(time.perf_counter() - started) * 1000:.0f} ms")
+        st.dataframe(results, hide_index=True)
+
+if __name__ == "__main__":
+    main()
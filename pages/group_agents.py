@@ -1,21 +1,29 @@
 import streamlit as st
 
-import time
 import json
+import time
 from dotenv import load_dotenv
 import os
 
 # Import ConversableAgent class
 import autogen
 from autogen import ConversableAgent, LLMConfig, Agent
-from autogen import AssistantAgent, UserProxyAgent, LLMConfig, register_function
+from autogen import AssistantAgent, UserProxyAgent, LLMConfig
 from autogen.code_utils import content_str
+from autogen.agentchat.contrib.capabilities.transform_messages import TransformMessages
 from autogen.agentchat import initiate_group_chat
-from autogen.agentchat.group.patterns import AutoPattern
 
 from coding.constant import JOB_DEFINITION, RESPONSE_FORMAT
-from coding.utils import show_chat_history, display_session_msg, save_messages_to_json, paging
-from coding.agenttools import AG_search_expert, AG_search_news, AG_search_textbook, get_time
+from coding.utils import show_chat_history, display_session_msg, session_id, paging, show_trace_panel, turn_span
+from coding.tracing import instrument_agents, instrument_pattern, span
+from coding.chatlog import get_chat_log_writer
+from coding.messages import get_message_store
+from coding.toolregistry import register_tools
+from coding.context import ContextTransform, llm_summarizer
+from coding.llmcache import get_response_cache
+from coding.streaming import stream_tokens
+from coding.agentpool import current_session, get_agent_pool
+from coding.speakers import GROUP_SPEAKER_SELECTION, group_pattern
 
 # Load environment variables from .env file
 load_dotenv(override=True)
@@ -37,54 +45,20 @@ llm_config_gemini = LLMConfig(
     api_key=GEMINI_API_KEY,   # Authentication
 )
 
+llm_model = "gpt-4o-mini"
+
 llm_config_openai = LLMConfig(
     api_type = "openai", 
-    model="gpt-4o-mini",    # The specific model
+    model=llm_model,        # The specific model
     api_key=OPEN_API_KEY,   # Authentication
+    stream=True,            # Tokens are rendered as they arrive, see coding/streaming.py
 )
 
-def stream_data(stream_str):
-    for word in stream_str.split(" "):
-        yield word + " "
-        time.sleep(0.05)
-
 def save_lang():
     st.session_state['lang_setting'] = st.session_state.get("language_select")
 
-def main():
-    st.set_page_config(
-        page_title='K-Assistant - The Residemy Agent',
-        layout='wide',
-        initial_sidebar_state='auto',
-        menu_items={
-            'Get Help': 'https://streamlit.io/',
-            'Report a bug': 'https://github.com',
-            'About': 'About your application: **Hello world**'
-            },
-        page_icon="img/favicon.ico"
-    )
-
-    # Show title and description.
-    st.title(f"💬 {user_name}'s Group Chatbot")
-
-    with st.sidebar:
-        paging()
-
-        selected_lang = st.selectbox("Language", ["English", "繁體中文"], index=0, on_change=save_lang, key="language_select")
-        if 'lang_setting' in st.session_state:
-            lang_setting = st.session_state['lang_setting']
-        else:
-            lang_setting = selected_lang
-            st.session_state['lang_setting'] = lang_setting
-
-        st_c_1 = st.container(border=True)
-        with st_c_1:
-            st.image("https://www.w3schools.com/howto/img_avatar.png")
-
-    st_c_chat = st.container(border=True)
-    
-    display_session_msg(st_c_chat, user_image)
-
+def build_agents(lang_setting, model):
+    # Built once per (language, model) by the agent pool, not on every rerun.
     student_persona = f"""You are a student willing to learn. After your result, say 'ALL DONE'. Please output in {lang_setting}"""
 
     teacher_persona = f"""You are a teacher. Please try to use tools to answer student's question according to the following rules:
@@ -115,7 +89,6 @@ def main():
         teacher_agent = ConversableAgent(
             name="Teacher_Agent",
             system_message=teacher_persona,
-            functions=[AG_search_news, AG_search_textbook, AG_search_expert],
         )
 
         tech_agent = ConversableAgent(
@@ -129,46 +102,34 @@ def main():
             system_message="You handle general, non-technical support questions."
         )
 
+        summary_agent = ConversableAgent(
+            name="Summary_Agent",
+            system_message="You keep a short running summary of a conversation between agents.",
+        )
+
     user = ConversableAgent(
         name="user", 
         human_input_mode="ALWAYS",
         is_termination_msg=lambda x: content_str(x.get("content")).find("ALL DONE") >= 0,
         )
 
-    pattern = AutoPattern(
+    # Next speakers come from coding.speakers.GROUP_SPEAKER_RULES; the manager's LLM picks only when no rule applies.
+    pattern = group_pattern(
+        GROUP_SPEAKER_SELECTION,
         initial_agent=teacher_agent,  # Agent that starts the conversation
         agents=[teacher_agent, tech_agent, general_agent, student_agent],
         user_agent=user,
         group_manager_args={"llm_config": llm_config_openai}
     )
 
-    register_function(
-        AG_search_expert,
-        caller=teacher_agent,
-        executor=student_agent,
-        description="Search EXPERTS_LIST by name, discipline, or interest.",
-    )
+    register_tools(teacher_agent, student_agent)
+    instrument_agents(student_agent, teacher_agent, tech_agent, general_agent, summary_agent, user)
+    instrument_pattern(pattern)
 
-    register_function(
-        AG_search_textbook,
-        caller=teacher_agent,
-        executor=student_agent,
-        description="Search TEXTBOOK_LIST by title, discipline, or related_expert.",
-    )
-
-    register_function(
-        AG_search_news,
-        caller=teacher_agent,
-        executor=student_agent,
-        description="Search a pre-fetched news DataFrame by keywords, sections, and date range.",
-    )
-
-    register_function(
-        get_time,
-        caller=teacher_agent,
-        executor=student_agent,
-        description="Get the current date & time.",
-    )
+    # Agents see the task, a rolling summary and the recent rounds instead of the whole chat.
+    context = ContextTransform(model, llm_summarizer(summary_agent, model, lang_setting, get_response_cache()))
+    for agent in [student_agent, teacher_agent, tech_agent, general_agent]:
+        TransformMessages(transforms=[context], verbose=False).add_to_agent(agent)
 
     def st_reply_function(recipient, messages, sender, config):
         messages_content = messages[-1]['content']
@@ -176,14 +137,14 @@ def main():
         
         if messages_content and len(messages_content) > 0:
             if messages_role != 'tool':
-                st_c_chat.chat_message("Student").write(messages_content)
+                current_session().container.chat_message("Student").write(messages_content)
 
                 message = {"role": "Student", "content": messages_content}
                 # Append to session history
-                st.session_state.messages.append(message)
+                get_message_store().append(**message)
 
             elif messages_role == 'tool':
-                st_c_chat.badge("Using tool...", icon="🛠️")
+                current_session().container.badge("Using tool...", icon="🛠️")
 
         return False, None
 
@@ -193,13 +154,13 @@ def main():
 
         if messages_content and len(messages_content) > 0:
             if messages_role != 'tool':
-                st_c_chat.chat_message("assistant", avatar=user_image).write(messages_content)
+                current_session().container.chat_message("assistant", avatar=user_image).write(messages_content)
                 message = {"role": messages_role, "content": messages_content}
                 # Append to session history
-                st.session_state.messages.append(message)
+                get_message_store().append(**message)
             elif messages_role == 'tool':
-                st_c_chat.chat_message("assistant", avatar=user_image).write("Try to use tool.")
-                st_c_chat.badge("tea - Using tool...", icon="🛠️")
+                current_session().container.chat_message("assistant", avatar=user_image).write("Try to use tool.")
+                current_session().container.badge("tea - Using tool...", icon="🛠️")
 
         return False, None
 
@@ -209,14 +170,14 @@ def main():
 
         if messages_content and len(messages_content) > 0:
             if messages_role != 'tool':
-                st_c_chat.chat_message("General").write(messages_content)
+                current_session().container.chat_message("General").write(messages_content)
 
                 message = {"role": "General", "content": messages_content}
                 # Append to session history
-                st.session_state.messages.append(message)
+                get_message_store().append(**message)
 
             elif messages_role == 'tool':
-                st_c_chat.badge("gen-Using tool...", icon="🛠️")
+                current_session().container.badge("gen-Using tool...", icon="🛠️")
 
         return False, None
 
@@ -227,13 +188,13 @@ def main():
 
         if messages_content and len(messages_content) > 0:
             if messages_role != 'tool':
-                st_c_chat.chat_message("Tech").write(messages_content)
+                current_session().container.chat_message("Tech").write(messages_content)
                 message = {"role": "Tech", "content": messages_content}
                 # Append to session history
-                st.session_state.messages.append(message)
+                get_message_store().append(**message)
 
             elif messages_role == 'tool':
-                st_c_chat.badge("tech-Using tool...", icon="🛠️")
+                current_session().container.badge("tech-Using tool...", icon="🛠️")
 
 
         return False, None
@@ -261,27 +222,79 @@ def main():
         [Agent, None],
         reply_func=gen_reply_function, 
         config={"callback": None},
-    ) 
+    )
+
+    return {"student": student_agent, "teacher": teacher_agent, "tech": tech_agent, "general": general_agent, "user": user, "pattern": pattern,
+            "context": context}
+
+def main():
+    st.set_page_config(
+        page_title='K-Assistant - The Residemy Agent',
+        layout='wide',
+        initial_sidebar_state='auto',
+        menu_items={
+            'Get Help': 'https://streamlit.io/',
+            'Report a bug': 'https://github.com',
+            'About': 'About your application: **Hello world**'
+            },
+        page_icon="img/favicon.ico"
+    )
+
+    # Show title and description.
+    st.title(f"💬 {user_name}'s Group Chatbot")
+
+    with st.sidebar:
+        paging()
+
+        selected_lang = st.selectbox("Language", ["English", "繁體中文"], index=0, on_change=save_lang, key="language_select")
+        if 'lang_setting' in st.session_state:
+            lang_setting = st.session_state['lang_setting']
+        else:
+            lang_setting = selected_lang
+            st.session_state['lang_setting'] = lang_setting
+
+        st_c_1 = st.container(border=True)
+        with st_c_1:
+            st.image("https://www.w3schools.com/howto/img_avatar.png")
+
+    st_c_chat = st.container(border=True)
+    
+    display_session_msg(st_c_chat, user_image)
+
+    agent_pool = get_agent_pool(__file__, build_agents)
 
     def generate_response(prompt):
-        chat_result, _, _ = initiate_group_chat(
-            pattern=pattern,
-            messages=prompt,
-            max_rounds=12
-        )
+        with agent_pool.acquire(lang_setting, llm_model, container=st_c_chat) as agents, \
+                stream_tokens(st_c_chat):
+            with span("initiate_group_chat", pattern=type(agents["pattern"]).__name__, max_rounds=12):
+                chat_result, _, _ = initiate_group_chat(
+                    pattern=agents["pattern"],
+                    messages=prompt,
+                    max_rounds=12
+                )
+            reports = agents["context"].take_reports()
         response = chat_result.chat_history
+        if reports:
+            st_c_chat.caption("🧮 prompt tokens per round: " + ", ".join(str(r.prompt_tokens) for r in reports)
+                              + f" · {reports[-1].describe()}")
         # st.write(response)
         return response
 
+    @turn_span("group_agents")
     def chat(prompt: str):
+        get_message_store().start_turn()
+        started = time.perf_counter()
         response = generate_response(prompt)
-        conv_res = show_chat_history(st_c_chat, response, user_image)
-        messages = json.loads(conv_res)
-        file_path = save_messages_to_json(messages, output_dir="chat_logs")
-        st.write(f"Saved chat history to `{file_path}`")
+        show_chat_history(st_c_chat, response, user_image)
+        chat_log = get_chat_log_writer()
+        chat_log.log_messages(session_id(), None, response, time.perf_counter() - started, page="group_agents")
+        st.write(f"Saved chat history to `{chat_log.directory}`")
         st_c_chat.chat_message("assistant").write("Any question?")
     if prompt := st.chat_input(placeholder=placeholderstr, key="chat_bot"):
         chat(prompt)
 
+    with st.sidebar:
+        show_trace_panel()
+
 if __name__ == "__main__":
     main()
@@ -1,6 +1,5 @@
 import streamlit as st
 
-import time
 import json
 from dotenv import load_dotenv
 import os
@@ -8,11 +7,15 @@ import os
 # Import ConversableAgent class
 import autogen
 from autogen import ConversableAgent, LLMConfig, Agent
-from autogen import AssistantAgent, UserProxyAgent, LLMConfig, register_function
+from autogen import AssistantAgent, UserProxyAgent, LLMConfig
 from autogen.code_utils import content_str
 from coding.constant import JOB_DEFINITION, RESPONSE_FORMAT
-from coding.utils import show_chat_history, display_session_msg, save_messages_to_json, paging
-from coding.agenttools import AG_search_expert, AG_search_news, AG_search_textbook, get_time
+from coding.utils import show_chat_history, display_session_msg, save_messages_to_json, paging, show_trace_panel, turn_span
+from coding.tracing import instrument_agents
+from coding.messages import get_message_store
+from coding.toolregistry import register_tools
+from coding.streaming import stream_tokens
+from coding.agentpool import current_session, get_agent_pool
 
 # Load environment variables from .env file
 load_dotenv(override=True)
@@ -34,54 +37,20 @@ llm_config_gemini = LLMConfig(
     api_key=GEMINI_API_KEY,   # Authentication
 )
 
+llm_model = "gpt-4o-mini"
+
 llm_config_openai = LLMConfig(
     api_type = "openai", 
-    model="gpt-4o-mini",    # The specific model
+    model=llm_model,        # The specific model
     api_key=OPEN_API_KEY,   # Authentication
+    stream=True,            # Tokens are rendered as they arrive, see coding/streaming.py
 )
 
-def stream_data(stream_str):
-    for word in stream_str.split(" "):
-        yield word + " "
-        time.sleep(0.05)
-
 def save_lang():
     st.session_state['lang_setting'] = st.session_state.get("language_select")
 
-def main():
-    st.set_page_config(
-        page_title='K-Assistant - The Residemy Agent',
-        layout='wide',
-        initial_sidebar_state='auto',
-        menu_items={
-            'Get Help': 'https://streamlit.io/',
-            'Report a bug': 'https://github.com',
-            'About': 'About your application: **0.20.3.9**'
-            },
-        page_icon="img/favicon.ico"
-    )
-
-    # Show title and description.
-    st.title(f"💬 {user_name}'s Chatbot")
-
-    with st.sidebar:
-        paging()
-
-        selected_lang = st.selectbox("Language", ["English", "繁體中文"], index=0, on_change=save_lang, key="language_select")
-        if 'lang_setting' in st.session_state:
-            lang_setting = st.session_state['lang_setting']
-        else:
-            lang_setting = selected_lang
-            st.session_state['lang_setting'] = lang_setting
-
-        st_c_1 = st.container(border=True)
-        with st_c_1:
-            st.image("https://www.w3schools.com/howto/img_avatar.png")
-
-    st_c_chat = st.container(border=True)
-    
-    display_session_msg(st_c_chat, user_image)
-
+def build_agents(lang_setting, model):
+    # Built once per (language, model) by the agent pool, not on every rerun.
     student_persona = f"""You are a student willing to learn. After your result, say 'ALL DONE'. Please output in {lang_setting}"""
 
     teacher_persona = f"""You are a teacher. Please try to use tools to answer student's question according to the following rules:
@@ -122,32 +91,68 @@ def main():
         is_termination_msg=lambda x: content_str(x.get("content")).find("##ALL DONE##") >= 0,
     )
 
-    def register_agent_methods(agent, proxy, methods):
-        for name, description, func in methods:
-            agent.register_for_llm(name=name, description=description)(func)
-            proxy.register_for_execution(name=name)(func)
+    register_tools(
+        teacher_agent,
+        user_proxy,
+        names=["get_time", "AG_search_expert", "AG_search_textbook", "AG_search_news"],
+        descriptions={"get_time": "Retrieve the current date and time."},
+    )
 
-    methods_to_register = [
-        ("get_time", "Retrieve the current date and time.", get_time),
-        ("AG_search_expert", "Search EXPERTS_LIST by name, discipline, or interest.", AG_search_expert),
-        ("AG_search_textbook", "Search TEXTBOOK_LIST by title, discipline, or related_expert.", AG_search_textbook),
-        ("AG_search_news", "Search a pre-fetched news DataFrame by keywords, sections, and date range.", AG_search_news),
-    ]
+    instrument_agents(teacher_agent, user_proxy)
 
-    # Register all methods using the helper function
-    register_agent_methods(teacher_agent, user_proxy, methods_to_register)
+    return {"teacher": teacher_agent, "user_proxy": user_proxy}
+
+def main():
+    st.set_page_config(
+        page_title='K-Assistant - The Residemy Agent',
+        layout='wide',
+        initial_sidebar_state='auto',
+        menu_items={
+            'Get Help': 'https://streamlit.io/',
+            'Report a bug': 'https://github.com',
+            'About': 'About your application: **0.20.3.9**'
+            },
+        page_icon="img/favicon.ico"
+    )
+
+    # Show title and description.
+    st.title(f"💬 {user_name}'s Chatbot")
+
+    with st.sidebar:
+        paging()
+
+        selected_lang = st.selectbox("Language", ["English", "繁體中文"], index=0, on_change=save_lang, key="language_select")
+        if 'lang_setting' in st.session_state:
+            lang_setting = st.session_state['lang_setting']
+        else:
+            lang_setting = selected_lang
+            st.session_state['lang_setting'] = lang_setting
+
+        st_c_1 = st.container(border=True)
+        with st_c_1:
+            st.image("https://www.w3schools.com/howto/img_avatar.png")
+
+    st_c_chat = st.container(border=True)
+    
+    display_session_msg(st_c_chat, user_image)
+
+    agent_pool = get_agent_pool(__file__, build_agents)
 
     def generate_response(prompt):
-        chat_result = user_proxy.initiate_chat(
-            teacher_agent,
-            message = prompt,
-        )
+        with agent_pool.acquire(lang_setting, llm_model, container=st_c_chat) as agents, \
+                stream_tokens(st_c_chat, keep=True):
+            chat_result = agents["user_proxy"].initiate_chat(
+                agents["teacher"],
+                message = prompt,
+            )
 
         response = chat_result.chat_history
         # st.write(response)
         return response
 
+    @turn_span("one_agent")
     def chat(prompt: str):
+        get_message_store().start_turn()
         response = generate_response(prompt)
         conv_res = show_chat_history(st_c_chat, response, user_image)
         # messages = json.loads(conv_res)
@@ -157,5 +162,8 @@ def main():
     if prompt := st.chat_input(placeholder=placeholderstr, key="chat_bot"):
         chat(prompt)
 
+    with st.sidebar:
+        show_trace_panel()
+
 if __name__ == "__main__":
     main()
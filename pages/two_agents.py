@@ -1,18 +1,26 @@
 import streamlit as st
 
-import time
 import json
+import time
 from dotenv import load_dotenv
 import os
 
 # Import ConversableAgent class
 import autogen
 from autogen import ConversableAgent, LLMConfig, Agent
-from autogen import AssistantAgent, UserProxyAgent, LLMConfig, register_function
+from autogen import AssistantAgent, UserProxyAgent, LLMConfig
 from autogen.code_utils import content_str
+from autogen.agentchat.contrib.capabilities.transform_messages import TransformMessages
 from coding.constant import JOB_DEFINITION, RESPONSE_FORMAT
-from coding.utils import show_chat_history, display_session_msg, save_messages_to_json, paging
-from coding.agenttools import AG_search_expert, AG_search_news, AG_search_textbook, get_time
+from coding.utils import show_chat_history, display_session_msg, session_id, paging, show_trace_panel, turn_span
+from coding.tracing import instrument_agents
+from coding.chatlog import get_chat_log_writer
+from coding.messages import get_message_store
+from coding.toolregistry import register_tools
+from coding.context import ContextTransform, llm_summarizer
+from coding.llmcache import get_response_cache
+from coding.streaming import stream_tokens
+from coding.agentpool import current_session, get_agent_pool
 
 # Load environment variables from .env file
 load_dotenv(override=True)
@@ -34,54 +42,20 @@ llm_config_gemini = LLMConfig(
     api_key=GEMINI_API_KEY,   # Authentication
 )
 
+llm_model = "gpt-4o-mini"
+
 llm_config_openai = LLMConfig(
     api_type = "openai", 
-    model="gpt-4o-mini",    # The specific model
+    model=llm_model,        # The specific model
     api_key=OPEN_API_KEY,   # Authentication
+    stream=True,            # Tokens are rendered as they arrive, see coding/streaming.py
 )
 
-def stream_data(stream_str):
-    for word in stream_str.split(" "):
-        yield word + " "
-        time.sleep(0.05)
-
 def save_lang():
     st.session_state['lang_setting'] = st.session_state.get("language_select")
 
-def main():
-    st.set_page_config(
-        page_title='K-Assistant - The Residemy Agent',
-        layout='wide',
-        initial_sidebar_state='auto',
-        menu_items={
-            'Get Help': 'https://streamlit.io/',
-            'Report a bug': 'https://github.com',
-            'About': 'About your application: **Hello world**'
-            },
-        page_icon="img/favicon.ico"
-    )
-
-    # Show title and description.
-    st.title(f"🧑‍🤝‍🧑 {user_name}'s Duo Chatbot")
-
-    with st.sidebar:
-        paging()
-
-        selected_lang = st.selectbox("Language", ["English", "繁體中文"], index=0, on_change=save_lang, key="language_select")
-        if 'lang_setting' in st.session_state:
-            lang_setting = st.session_state['lang_setting']
-        else:
-            lang_setting = selected_lang
-            st.session_state['lang_setting'] = lang_setting
-
-        st_c_1 = st.container(border=True)
-        with st_c_1:
-            st.image("https://www.w3schools.com/howto/img_avatar.png")
-
-    st_c_chat = st.container(border=True)
-    
-    display_session_msg(st_c_chat, user_image)
-
+def build_agents(lang_setting, model):
+    # Built once per (language, model) by the agent pool, not on every rerun.
     student_persona = f"""You are a student willing to learn. After your result, say 'ALL DONE'. Please output in {lang_setting}"""
 
     teacher_persona = f"""You are a teacher. Please try to use tools to answer student's question according to the following rules:
@@ -115,6 +89,11 @@ def main():
             human_input_mode="NEVER",
         )
 
+        summary_agent = ConversableAgent(
+            name="Summary_Agent",
+            system_message="You keep a short running summary of a conversation between agents.",
+        )
+
     user_proxy = UserProxyAgent(
         "user_proxy",
         human_input_mode="NEVER",
@@ -123,33 +102,13 @@ def main():
     )
 
 
-    register_function(
-        AG_search_expert,
-        caller=teacher_agent,
-        executor=student_agent,
-        description="Search EXPERTS_LIST by name, discipline, or interest.",
-    )
+    register_tools(teacher_agent, student_agent)
+    instrument_agents(student_agent, teacher_agent, summary_agent, user_proxy)
 
-    register_function(
-        AG_search_textbook,
-        caller=teacher_agent,
-        executor=student_agent,
-        description="Search TEXTBOOK_LIST by title, discipline, or related_expert.",
-    )
-
-    register_function(
-        AG_search_news,
-        caller=teacher_agent,
-        executor=student_agent,
-        description="Search a pre-fetched news DataFrame by keywords, sections, and date range.",
-    )
-
-    register_function(
-        get_time,
-        caller=teacher_agent,
-        executor=student_agent,
-        description="Get the current date & time.",
-    )
+    # Agents see the task, a rolling summary and the recent rounds instead of the whole chat.
+    context = ContextTransform(model, llm_summarizer(summary_agent, model, lang_setting, get_response_cache()))
+    for agent in [student_agent, teacher_agent]:
+        TransformMessages(transforms=[context], verbose=False).add_to_agent(agent)
 
     def st_reply_function(recipient, messages, sender, config):
         messages_content = messages[-1]['content']
@@ -157,14 +116,14 @@ def main():
         
         if messages_content and len(messages_content) > 0:
             if messages_role != 'tool':
-                st_c_chat.chat_message("ai").write(messages_content)
+                current_session().container.chat_message("ai").write(messages_content)
 
                 message = {"role": messages_role, "content": messages_content}
                 # Append to session history
-                st.session_state.messages.append(message)
+                get_message_store().append(**message)
 
             elif messages_role == 'tool':
-                st_c_chat.badge("Using tool...", icon="🛠️")
+                current_session().container.badge("Using tool...", icon="🛠️")
 
         # message_to_send = {
         #     "content": messages_content,
@@ -179,12 +138,12 @@ def main():
 
         if messages_content and len(messages_content) > 0:
             if messages_role != 'tool':
-                st_c_chat.chat_message("assistant", avatar=user_image).write(messages_content)
+                current_session().container.chat_message("assistant", avatar=user_image).write(messages_content)
                 message = {"role": messages_role, "content": messages_content}
                 # Append to session history
-                st.session_state.messages.append(message)
+                get_message_store().append(**message)
             elif messages_role == 'tool':
-                st_c_chat.badge("Using tool...", icon="🛠️")
+                current_session().container.badge("Using tool...", icon="🛠️")
 
         # message_to_send = {
         #     "content": messages_content,
@@ -204,28 +163,78 @@ def main():
         [Agent, None],
         reply_func=ta_reply_function, 
         config={"callback": None},
-    ) 
+    )
+
+    return {"student": student_agent, "teacher": teacher_agent, "user_proxy": user_proxy, "context": context}
+
+def main():
+    st.set_page_config(
+        page_title='K-Assistant - The Residemy Agent',
+        layout='wide',
+        initial_sidebar_state='auto',
+        menu_items={
+            'Get Help': 'https://streamlit.io/',
+            'Report a bug': 'https://github.com',
+            'About': 'About your application: **Hello world**'
+            },
+        page_icon="img/favicon.ico"
+    )
+
+    # Show title and description.
+    st.title(f"🧑‍🤝‍🧑 {user_name}'s Duo Chatbot")
+
+    with st.sidebar:
+        paging()
+
+        selected_lang = st.selectbox("Language", ["English", "繁體中文"], index=0, on_change=save_lang, key="language_select")
+        if 'lang_setting' in st.session_state:
+            lang_setting = st.session_state['lang_setting']
+        else:
+            lang_setting = selected_lang
+            st.session_state['lang_setting'] = lang_setting
+
+        st_c_1 = st.container(border=True)
+        with st_c_1:
+            st.image("https://www.w3schools.com/howto/img_avatar.png")
+
+    st_c_chat = st.container(border=True)
+    
+    display_session_msg(st_c_chat, user_image)
+
+    agent_pool = get_agent_pool(__file__, build_agents)
 
     def generate_response(prompt):
-        chat_result = student_agent.initiate_chat(
-            teacher_agent,
-            message = prompt,
-            summary_method="reflection_with_llm",
-        )
+        with agent_pool.acquire(lang_setting, llm_model, container=st_c_chat) as agents, \
+                stream_tokens(st_c_chat):
+            chat_result = agents["student"].initiate_chat(
+                agents["teacher"],
+                message = prompt,
+                summary_method="reflection_with_llm",
+            )
+            reports = agents["context"].take_reports()
 
         response = chat_result.chat_history
+        if reports:
+            st_c_chat.caption("🧮 prompt tokens per round: " + ", ".join(str(r.prompt_tokens) for r in reports)
+                              + f" · {reports[-1].describe()}")
         # st.write(response)
         return response
 
+    @turn_span("two_agents")
     def chat(prompt: str):
+        get_message_store().start_turn()
+        started = time.perf_counter()
         response = generate_response(prompt)
-        conv_res = show_chat_history(st_c_chat, response, user_image)
-        messages = json.loads(conv_res)
-        file_path = save_messages_to_json(messages, output_dir="chat_logs")
-        st.write(f"Saved chat history to `{file_path}`")
+        show_chat_history(st_c_chat, response, user_image)
+        chat_log = get_chat_log_writer()
+        chat_log.log_messages(session_id(), None, response, time.perf_counter() - started, page="two_agents")
+        st.write(f"Saved chat history to `{chat_log.directory}`")
 
     if prompt := st.chat_input(placeholder=placeholderstr, key="chat_bot"):
         chat(prompt)
 
+    with st.sidebar:
+        show_trace_panel()
+
 if __name__ == "__main__":
     main()
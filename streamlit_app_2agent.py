@@ -3,7 +3,17 @@ import os
 from dotenv import load_dotenv
 from autogen import ConversableAgent, LLMConfig
 from autogen.code_utils import content_str
-import re
+from coding.chatlog import get_chat_log_writer
+from coding.context import ConversationContext, llm_summarizer
+from coding.history import render_html_history
+from coding.intent import CALLS_AVOIDED, get_intent_classifier, strip_marker
+from coding.llmcache import get_response_cache
+from coding.messages import MessageStore, get_message_store
+from coding.pipeline import TurnPipeline, TurnView
+from coding.streaming import TokenStream
+from coding.tracing import annotate, instrument_agents
+from coding.usage import DAILY_BUDGET, STAGES, BudgetRouter, client_usage, get_usage_ledger, today, usage_since
+from coding.utils import session_id, show_trace_panel, turn_span
 
 load_dotenv(override=True)
 
@@ -12,22 +22,44 @@ LANG_OPTIONS = ["English", "繁體中文"]
 USER_NAME = "Angela"
 USER_IMAGE = "https://www.w3schools.com/howto/img_avatar.png"
 
+# OPENAI_BASE_URL points the app at another OpenAI-compatible endpoint, e.g. coding.stubserver.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 LLM_CONFIG_MAP = {
-    model: LLMConfig(api_type="openai", model=model, api_key=os.getenv("OPENAI_API_KEY"))
+    model: LLMConfig(api_type="openai", model=model, api_key=os.getenv("OPENAI_API_KEY"), stream=True,
+                     **({"base_url": OPENAI_BASE_URL} if OPENAI_BASE_URL else {}))
     for model in MODEL_OPTIONS
 }
+# Per-profile session_state keys, stored as f"{key}_{profile}". The agent keys hold one agent per model.
+PROFILE_KEYS = ["messages", "student_agent", "teacher_agent", "summary_agent", "context", "cache_bypass", "budget"]
 
 TRANSLATIONS = {
     "繁體中文": {
         "saved_topics": "已存記錄主題", "new_topic": "新增主題名稱", "add_topic": "新增主題",
         "edit_topic": "編輯新主題名稱", "confirm_rename": "確認修改", "delete_only_one": "無法刪除唯一主題",
-        "topic_exists": "主題名稱已存在", "invalid_name": "主題名稱無效或已存在", "upload_avatar": "上傳頭像", "reupload_avatar": "重新上傳頭像"
+        "topic_exists": "主題名稱已存在", "invalid_name": "主題名稱無效或已存在", "upload_avatar": "上傳頭像", "reupload_avatar": "重新上傳頭像",
+        "bypass_cache": "此主題不使用回覆快取", "stream_replies": "逐字顯示回覆",
+        "route_models": "簡單步驟改用較便宜的模型", "daily_budget": "此主題每日預算 (USD, 0 = 不限)",
+        "usage_today": "今日用量", "over_budget": "已超過今日預算，全部改用",
+        "fast_paths": "問候與簡單請求直接回覆，不經完整流程", "calls_avoided": "次 LLM 呼叫已省下",
+        "intro_reply": "我是你的 K 助理。任何問題都可以問我：學生代理會先理解並重新表述你的問題，老師代理再回答，"
+                       "最後我會推薦可以深入的後續問題。側邊欄的每個主題各自保存對話；訊息以 [REPLY_TASK] 開頭，"
+                       "老師會直接照你的要求回覆。",
+        "greeting_reply": "嗨 {name}！今天想了解什麼呢？"
     },
     "English": {
         "saved_topics": "Saved Topics", "new_topic": "New Topic Name", "add_topic": "Add Topic",
         "edit_topic": "Edit Topic Name", "confirm_rename": "Confirm Rename",
         "delete_only_one": "Cannot delete the only topic", "topic_exists": "Topic already exists",
-        "invalid_name": "Invalid or duplicated topic name", "upload_avatar": "Upload Avatar", "reupload_avatar": "Re-upload Avatar"
+        "invalid_name": "Invalid or duplicated topic name", "upload_avatar": "Upload Avatar", "reupload_avatar": "Re-upload Avatar",
+        "bypass_cache": "Bypass response cache for this topic", "stream_replies": "Stream replies as they are generated",
+        "route_models": "Route simple stages to the cheaper model", "daily_budget": "Daily budget for this topic (USD, 0 = none)",
+        "usage_today": "Usage today", "over_budget": "Over today's budget, every stage now uses",
+        "fast_paths": "Answer greetings and simple requests without the full pipeline", "calls_avoided": "LLM calls avoided",
+        "intro_reply": "I'm your K-Assistant. Ask me anything: a student agent first works out what you want to know "
+                       "and rephrases it, a teacher agent answers, and I suggest follow-up questions to go deeper. "
+                       "Each topic in the sidebar keeps its own conversation; start a message with [REPLY_TASK] "
+                       "and the teacher replies to it exactly as asked.",
+        "greeting_reply": "Hi {name}! What would you like to learn about today?"
     }
 }
 
@@ -35,6 +67,10 @@ def init_session_state():
     defaults = {
         "lang_setting": "繁體中文",
         "model_setting": "gpt-4o-mini",
+        "stream_setting": True,
+        "routing_setting": False,
+        "intent_setting": True,
+        "llm_calls_avoided": 0,
         "user_name": USER_NAME,
         "current_profile": "KA助理",
         "profile_list": ["KA助理", "職涯顧問", "日常聊天"]
@@ -42,11 +78,11 @@ def init_session_state():
     for k, v in defaults.items():
         st.session_state.setdefault(k, v)
     for profile in st.session_state["profile_list"]:
-        for suffix in ["messages", "student_agent", "teacher_agent"]:
-            st.session_state.setdefault(f"{suffix}_{profile}", [] if suffix == "messages" else None)
+        for suffix in PROFILE_KEYS:
+            st.session_state.setdefault(f"{suffix}_{profile}", MessageStore() if suffix == "messages" else None)
 
 def init_agents(profile, lang, model):
-    if st.session_state.get(f"student_agent_{profile}"):
+    if model in (st.session_state.get(f"student_agent_{profile}") or {}):
         return
     llm_config = LLM_CONFIG_MAP[model]
 
@@ -91,10 +127,19 @@ Respond only in {lang}.
         human_input_mode="NEVER"
     )
 
-    st.session_state[f"student_agent_{profile}"] = student
-    st.session_state[f"teacher_agent_{profile}"] = teacher
+    summarizer = ConversableAgent(
+        name="Summary_Agent",
+        system_message="You keep a short running summary of a conversation between a user and a teacher.",
+        llm_config=llm_config
+    )
+
+    instrument_agents(student, teacher, summarizer)
+    for key, agent in [("student_agent", student), ("teacher_agent", teacher), ("summary_agent", summarizer)]:
+        st.session_state[f"{key}_{profile}"] = {**(st.session_state.get(f"{key}_{profile}") or {}), model: agent}
+    if st.session_state.get(f"context_{profile}") is None:
+        st.session_state[f"context_{profile}"] = ConversationContext()
 
-def render_message(msg, container):
+def message_html(msg):
     role, content = msg.get("role", "user"), msg.get("content", "")
     styles = {
         "user": ("right", "#DCF8C6", "🙋"),
@@ -102,74 +147,133 @@ def render_message(msg, container):
         "assistant": ("left", "#F1F0F0", "👩‍🏫")
     }
     align, color, icon = styles.get(role, ("left", "#fff", ""))
-    container.markdown(
-        f"<div style='text-align: {align}; background-color: {color}; padding: 8px; border-radius: 10px; margin: 4px 0;'>{icon} {content}</div>",
-        unsafe_allow_html=True
-    )
-
-def safe_content(raw_content):
-    content = raw_content.strip() if raw_content else ""
-    if not content or content.lower() in [":student_agent", ":teacher_agent"]:
-        return "⚠️ 沒有收到有效回覆，請稍後再試一次或修改問題。"
-    return content
-
-def safe_extract_content(reply):
-    if isinstance(reply, dict):
-        return safe_content(reply.get("content", ""))
-    elif isinstance(reply, str):
-        return safe_content(reply)
-    return "⚠️ 回覆格式錯誤"
-
-def extract_followups(raw):
-    lines = raw.splitlines()
-    questions = []
-    for l in lines:
-        l = re.sub(r"^[^\w一-鿿]*", "", l.strip())
-        if 4 <= len(l) <= 50 and ("?" in l or "？" in l):
-            questions.append(l)
-    return list(dict.fromkeys(questions))[:3]
+    return f"<div style='text-align: {align}; background-color: {color}; padding: 8px; border-radius: 10px; margin: 4px 0;'>{icon} {content}</div>"
 
+STAGE_LABELS = {
+    "student": "🧠 Student 正在分析問題...",
+    "teacher": "👩‍🏫 Teacher 回覆中...",
+    "follow-up": "💡 正在根據老師的回答推薦下一步問題...",
+}
+MESSAGE_ICONS = {"student": "🗣️ ", "assistant": "👩‍🏫 "}
+
+class StreamlitTurnView(TurnView):
+    """Draws a TurnPipeline turn into the page and records its messages in session_state[key]."""
+
+    def __init__(self, key, streaming=True):
+        self.key = key
+        self.streaming = streaming
+        self.status = st.empty()
+        self.label = STAGE_LABELS["student"]
+        self.bubbles = {}
+
+    def stream(self, stage):
+        self.label = STAGE_LABELS[stage]
+        role = "student" if stage == "student" else "assistant"
+        self.bubbles[role] = st.chat_message(role)
+        return TokenStream(self.bubbles[role] if self.streaming else None, prefix=MESSAGE_ICONS[role])
+
+    def message(self, role, content, stream):
+        stream.clear()
+        self.bubbles[role].markdown(f"{MESSAGE_ICONS[role]}{content}")
+        get_message_store(self.key).append(role, content)
+        if role == "assistant":
+            self.label = STAGE_LABELS["follow-up"]
+
+    def followups(self, questions):
+        self.status.empty()
+        if questions:
+            st.markdown("### 🔍 想要更深入了解嗎？試試以下問題：")
+            for q in questions:
+                st.markdown(
+                    f"<div style='padding: 6px 12px; margin: 4px 0; background-color: #f0f0f0; border-radius: 10px;'>👉 {q}</div>",
+                    unsafe_allow_html=True
+                )
+
+    def tick(self, elapsed):
+        self.status.caption(f"{self.label} {elapsed:.1f}s")
+
+@turn_span("home")
 def chat(prompt):
     profile, lang, model = st.session_state["current_profile"], st.session_state["lang_setting"], st.session_state["model_setting"]
+    annotate(profile=profile, model=model)
     key = f"messages_{profile}"
-    init_agents(profile, lang, model)
-
-    student = st.session_state[f"student_agent_{profile}"]
-    teacher = st.session_state[f"teacher_agent_{profile}"]
-
-    st.session_state[key].append({"role": "user", "content": prompt})
+    T = TRANSLATIONS[lang]
+    store = get_message_store(key)
+    store.start_turn()
+    store.append("user", prompt)
     st.chat_message("user").markdown(f"🙋 {prompt}")
+    log, sid = get_chat_log_writer(), session_id()
+
+    intent = get_intent_classifier().classify(prompt) if st.session_state["intent_setting"] else None
+    path = intent.path if intent else "pipeline"
+    if intent:
+        st.session_state["llm_calls_avoided"] += CALLS_AVOIDED[path]
+        annotate(intent=intent.label, confidence=round(intent.confidence, 3), path=path)
+    intent_note = (f"🧭 {intent.describe()} · {CALLS_AVOIDED[path]} {T['calls_avoided']} "
+                   f"({st.session_state['llm_calls_avoided']})" if intent else "")
+    if path == "canned":
+        reply = T["intro_reply"] if intent.label == "SELF_INTRODUCE" else T["greeting_reply"].format(
+            name=st.session_state["user_name"])
+        st.chat_message("assistant").markdown(f"{MESSAGE_ICONS['assistant']}{reply}")
+        store.append("assistant", reply)
+        st.caption(intent_note)
+        log.log(sid, profile, "user", prompt)
+        log.log(sid, profile, "assistant", reply, 0.0)
+        return
 
-    with st.spinner("🧠 Student 正在分析問題..."):
-        student_msg = safe_extract_content(student.generate_reply(messages=[{"role": "user", "content": prompt}]))
-        st.session_state[key].append({"role": "student", "content": student_msg})
-        st.chat_message("student").markdown(f"🗣️ {student_msg}")
-
-    with st.spinner("👩‍🏫 Teacher 回覆中..."):
-        teacher_msg = safe_extract_content(teacher.generate_reply(messages=[{"role": "user", "content": student_msg}]))
-        st.session_state[key].append({"role": "assistant", "content": teacher_msg})
-        st.chat_message("assistant").markdown(f"👩‍🏫 {teacher_msg}")
-
-    with st.spinner("💡 正在根據老師的回答推薦下一步問題..."):
-        followup_prompt = f"""
-Please rewrite 3 follow-up questions that are:
-- short (less than 20 words)
-- directly askable to the teacher
-- concrete and deep
-Avoid any explanation, format, or labels.
-Content:
-{teacher_msg}
-"""
-        followup_raw = safe_extract_content(student.generate_reply(messages=[{"role": "user", "content": followup_prompt}]))
-        followup_questions = extract_followups(followup_raw)
-
-    if followup_questions:
-        st.markdown("### 🔍 想要更深入了解嗎？試試以下問題：")
-        for q in followup_questions:
-            st.markdown(
-                f"<div style='padding: 6px 12px; margin: 4px 0; background-color: #f0f0f0; border-radius: 10px;'>👉 {q}</div>",
-                unsafe_allow_html=True
-            )
+    ledger = get_usage_ledger()
+    models = {stage: model for stage in STAGES}
+    if st.session_state["routing_setting"]:
+        route = BudgetRouter(ledger).route(profile, model, profile_budget(profile))
+        models = route.models
+        if route.over_budget:
+            st.warning(f"{T['over_budget']} {models['teacher']} "
+                       f"(${route.spent:.4f} / ${route.budget:g})")
+    for stage_model in set(models.values()):
+        init_agents(profile, lang, stage_model)
+
+    student = st.session_state[f"student_agent_{profile}"][models["student"]]
+    teacher = st.session_state[f"teacher_agent_{profile}"][models["teacher"]]
+    summary_agent = st.session_state[f"summary_agent_{profile}"][models["summary"]]
+    context = st.session_state[f"context_{profile}"]
+    bypass = bool(st.session_state.get(f"cache_bypass_{profile}"))
+    cache = get_response_cache()
+    summarizer = llm_summarizer(summary_agent, models["summary"], lang, cache)
+    summary_usage = client_usage(summary_agent)
+
+    view = StreamlitTurnView(key, streaming=st.session_state["stream_setting"])
+    direct = path == "teacher"
+    result = TurnPipeline(student, teacher, model, lang, cache, bypass, view,
+                          context=context, summarizer=summarizer, models=models).run(
+        strip_marker(prompt) if direct else prompt, direct=direct)
+    usage = list(result.usage)
+    summary = usage_since(summary_agent, summary_usage, "summary", models["summary"])
+    if summary.total_tokens:
+        usage.append(summary)
+    st.caption("⏱ " + " · ".join(t.describe() for t in result.timings) + f" · 🧮 {result.context.describe()}"
+               + f" · 💰 {sum(u.total_tokens for u in usage):,} tokens ${sum(u.cost for u in usage):.4f}"
+               + (f" · {intent_note}" if intent_note else ""))
+
+    ledger.record(sid, profile, usage)
+    stage_seconds = {t.stage: t.ttlt for t in result.timings}
+    log.log(sid, profile, "user", prompt)
+    if result.student:
+        log.log(sid, profile, "student", result.student, stage_seconds.get("student"))
+    log.log(sid, profile, "assistant", result.teacher, stage_seconds.get("teacher"))
+
+def profile_budget(profile):
+    budget = st.session_state.get(f"budget_{profile}")
+    return DAILY_BUDGET if budget is None else budget
+
+def usage_ui(T):
+    profile = st.session_state["current_profile"]
+    totals = get_usage_ledger().totals(profile, today())
+    budget = profile_budget(profile)
+    spent = sum(t.cost for t in totals)
+    with st.expander(f"💰 {T['usage_today']}: ${spent:.4f}" + (f" / ${budget:g}" if budget else "")):
+        st.dataframe([{"stage": t.stage, "model": t.model, "requests": t.requests, "cached": t.cached,
+                       "tokens": t.prompt_tokens + t.completion_tokens, "USD": round(t.cost, 5)} for t in totals],
+                     hide_index=True)
 
 def sidebar_ui(T):
     st.selectbox("Language", LANG_OPTIONS, index=LANG_OPTIONS.index(st.session_state["lang_setting"]),
@@ -177,6 +281,20 @@ def sidebar_ui(T):
     st.selectbox("Model", MODEL_OPTIONS, index=MODEL_OPTIONS.index(st.session_state["model_setting"]),
                  key="selected_model", on_change=lambda: st.session_state.update({"model_setting": st.session_state["selected_model"]}))
 
+    st.checkbox(T["stream_replies"], value=st.session_state["stream_setting"], key="selected_stream",
+                on_change=lambda: st.session_state.update({"stream_setting": st.session_state["selected_stream"]}))
+    profile = st.session_state["current_profile"]
+    st.checkbox(T["bypass_cache"], value=bool(st.session_state.get(f"cache_bypass_{profile}")),
+                key=f"bypass_toggle_{profile}",
+                on_change=lambda: st.session_state.update({f"cache_bypass_{profile}": st.session_state[f"bypass_toggle_{profile}"]}))
+    st.checkbox(T["fast_paths"], value=st.session_state["intent_setting"], key="selected_intent",
+                on_change=lambda: st.session_state.update({"intent_setting": st.session_state["selected_intent"]}))
+    st.checkbox(T["route_models"], value=st.session_state["routing_setting"], key="selected_routing",
+                on_change=lambda: st.session_state.update({"routing_setting": st.session_state["selected_routing"]}))
+    st.number_input(T["daily_budget"], min_value=0.0, value=float(profile_budget(profile)), step=0.1, format="%.3f",
+                    key=f"budget_input_{profile}",
+                    on_change=lambda: st.session_state.update({f"budget_{profile}": st.session_state[f"budget_input_{profile}"]}))
+
     st.markdown(f"---\n### {T['saved_topics']}")
     for i, p in enumerate(st.session_state["profile_list"]):
         cols = st.columns([6, 1, 1])
@@ -194,7 +312,7 @@ def sidebar_ui(T):
                     st.warning(T["delete_only_one"])
                 else:
                     st.session_state["profile_list"].remove(p)
-                    for k in ["messages", "student_agent", "teacher_agent"]:
+                    for k in PROFILE_KEYS:
                         st.session_state.pop(f"{k}_{p}", None)
                     if st.session_state["current_profile"] == p:
                         st.session_state["current_profile"] = st.session_state["profile_list"][0]
@@ -206,8 +324,9 @@ def sidebar_ui(T):
             if new_name and new_name not in st.session_state["profile_list"]:
                 idx = st.session_state["profile_list"].index(old)
                 st.session_state["profile_list"][idx] = new_name
-                for k in ["messages", "student_agent", "teacher_agent"]:
+                for k in PROFILE_KEYS:
                     st.session_state[f"{k}_{new_name}"] = st.session_state.pop(f"{k}_{old}", None)
+                get_usage_ledger().rename_profile(old, new_name)
                 if st.session_state["current_profile"] == old:
                     st.session_state["current_profile"] = new_name
                 del st.session_state["edit_target"]
@@ -221,8 +340,8 @@ def sidebar_ui(T):
             st.warning(T["topic_exists"])
         else:
             st.session_state["profile_list"].append(new)
-            for k in ["messages", "student_agent", "teacher_agent"]:
-                st.session_state[f"{k}_{new}"] = [] if k == "messages" else None
+            for k in PROFILE_KEYS:
+                st.session_state[f"{k}_{new}"] = MessageStore() if k == "messages" else None
             st.session_state["current_profile"] = new
 
     T = TRANSLATIONS[st.session_state["lang_setting"]]  
@@ -255,11 +374,14 @@ def main():
         sidebar_ui(T)
 
     key = f"messages_{st.session_state['current_profile']}"
-    for msg in st.session_state[key]:
-        render_message(msg, st)
+    render_html_history(st, get_message_store(key), key, message_html)
 
     if prompt := st.chat_input("Please input your command", key="chat_bot"):
         chat(prompt)
 
+    with st.sidebar:
+        usage_ui(T)
+        show_trace_panel()
+
 if __name__ == "__main__":
     main()
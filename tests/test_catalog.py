@@ -0,0 +1,77 @@
+import pytest
+
+from coding.catalog import EXPERT_FIELDS, TEXTBOOK_FIELDS, CatalogIndex
+
+EXPERTS = [
+    {"NAME": "Gild Lin", "EMAIL": "gild@example.org", "DISCIPLINE": "Digital Sociology",
+     "INTEREST": "AI ethics, privacy"},
+    {"NAME": "Lon Ka", "EMAIL": "lon@example.org", "DISCIPLINE": "Computational Social Science",
+     "INTEREST": "trade networks; chips"},
+    {"NAME": "王小明", "EMAIL": "wang@example.org", "DISCIPLINE": "Technology and Society",
+     "INTEREST": "半導體產業、科技政策"},
+    {"NAME": "Ana O'Neil", "EMAIL": "ana@example.org", "DISCIPLINE": "Information Systems Strategy",
+     "INTEREST": "e-government (open data)"},
+    # Same EMAIL as the first expert: one of them is kept.
+    {"NAME": "Gild Lin (visiting)", "EMAIL": "gild@example.org", "DISCIPLINE": "Technology and Society",
+     "INTEREST": "Privacy by design"},
+]
+TEXTBOOKS = [
+    {"TITLE": "Digital Sociology, Vol. 1", "DISCIPLINE": "Digital Sociology", "RELATED_EXPERT": "Gild Lin"},
+    {"TITLE": "Chips & Trade", "DISCIPLINE": "Computational Social Science", "RELATED_EXPERT": "Lon Ka"},
+    {"TITLE": "科技與社會導論", "DISCIPLINE": "Technology and Society", "RELATED_EXPERT": "王小明"},
+    {"TITLE": "Digital Sociology, Vol. 1", "DISCIPLINE": "Technology and Society", "RELATED_EXPERT": "Ana O'Neil"},
+]
+
+EXPERT_QUERIES = [
+    ({"NAME": None}, {"DISCIPLINE": ["Digital Sociology", "computational SOCIAL science"], "INTEREST": None}),
+    ({"NAME": "GILD"}, {"DISCIPLINE": None, "INTEREST": ["privacy", "TRADE", "chip"]}),
+    ({"NAME": "lon ka"}, {"DISCIPLINE": None, "INTEREST": None}),
+    ({"NAME": "小明"}, {"DISCIPLINE": ["Technology"], "INTEREST": ["半導體", "政策"]}),
+    ({"NAME": "'"}, {"DISCIPLINE": [], "INTEREST": ["(", ";", "、"]}),
+    ({"NAME": "-"}, {"DISCIPLINE": ["..."], "INTEREST": ["e-gov", "nothing like this"]}),
+    ({"NAME": ""}, {"DISCIPLINE": [""], "INTEREST": None}),
+    ({"NAME": None}, {"DISCIPLINE": None, "INTEREST": None}),
+]
+TEXTBOOK_QUERIES = [
+    ({"TITLE": None}, {"DISCIPLINE": ["Technology and Society"], "RELATED_EXPERT": ["ka"]}),
+    ({"TITLE": "vol. 1"}, {"DISCIPLINE": None, "RELATED_EXPERT": None}),
+    ({"TITLE": "導論"}, {"DISCIPLINE": ["digital"], "RELATED_EXPERT": ["王", "O'NEIL"]}),
+    ({"TITLE": "&"}, {"DISCIPLINE": [","], "RELATED_EXPERT": []}),
+]
+
+
+def scan(records, single, field, value):
+    """The original search_expert/search_textbook loop: a record matches the single criterion OR the value."""
+    (single_field, single_value), = single.items()
+    return [rec for rec in records
+            if (single_value and single_value.lower() in rec[single_field].lower())
+            or (value and value.lower() in rec[field].lower())]
+
+
+def scan_many(records, fields, dedup_key, single, multi):
+    """The original AG_* wrappers: one scan per list value, then dedup through a dict."""
+    matched = []
+    for field, values in multi.items():
+        for value in values or []:
+            matched.extend(scan(records, single, field, value))
+    if not any(multi.values()):
+        matched = scan(records, single, fields[1], None)
+    return list({rec[dedup_key]: rec for rec in matched if dedup_key in rec}.values())
+
+
+@pytest.mark.parametrize("single, multi", EXPERT_QUERIES)
+def test_expert_search_many_matches_scans(single, multi):
+    index = CatalogIndex(EXPERTS, EXPERT_FIELDS)
+    assert index.search_many("EMAIL", single, multi) == scan_many(EXPERTS, EXPERT_FIELDS, "EMAIL", single, multi)
+
+
+@pytest.mark.parametrize("single, multi", TEXTBOOK_QUERIES)
+def test_textbook_search_many_matches_scans(single, multi):
+    index = CatalogIndex(TEXTBOOKS, TEXTBOOK_FIELDS)
+    assert index.search_many("TITLE", single, multi) == scan_many(TEXTBOOKS, TEXTBOOK_FIELDS, "TITLE", single, multi)
+
+
+def test_search_ors_criteria_in_catalog_order():
+    index = CatalogIndex(EXPERTS, EXPERT_FIELDS)
+    assert index.search(NAME="ana", INTEREST="CHIPS") == [EXPERTS[1], EXPERTS[3]]
+    assert index.search(NAME=None, DISCIPLINE="") == []
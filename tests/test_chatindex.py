@@ -0,0 +1,97 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from coding.chatindex import ChatIndex
+from coding.chatlog import ChatLogWriter, compact_logs, log_paths, make_record, migrate_legacy_logs
+
+MESSAGES = [
+    ("user", "What happened in Taipei today?"),
+    ("assistant", "今天台北下雨，捷運照常營運。"),
+    ("user", "東京の天気はどうですか"),
+    ("assistant", "東京は晴れです。Tokyo is sunny."),
+    ("user", "서울 날씨 알려줘"),
+    ("assistant", "Taipei and Tokyo both had news about the economy."),
+]
+
+
+@pytest.fixture
+def logs(tmp_path):
+    # One message per segment, so compaction can archive all but the newest (see open_segments).
+    writer = ChatLogWriter(str(tmp_path / "logs"), segment_bytes=1, flush_interval=0.01)
+    for i, (role, content) in enumerate(MESSAGES):
+        writer.write_record(make_record("s1", "news", role, content, ts=datetime(2025, 1, 1) + timedelta(hours=i)))
+        writer.flush()
+    writer.close()
+    return writer.directory
+
+
+@pytest.fixture
+def index(tmp_path, logs):
+    return ChatIndex(str(tmp_path / "index.sqlite"), logs)
+
+
+def found(index, query, **kwargs):
+    return list(index.search(query, **kwargs)["content"])
+
+
+def test_ingested_messages_are_found_newest_first(index):
+    assert index.ingest().added == len(MESSAGES)
+    assert index.count() == len(MESSAGES)
+    assert found(index, "taipei") == [MESSAGES[5][1], MESSAGES[0][1]]
+    assert found(index, "Taipei economy") == [MESSAGES[5][1]]
+    assert found(index, "taipei", role="user") == [MESSAGES[0][1]]
+    assert found(index, "taipei", limit=1) == [MESSAGES[5][1]]
+    assert found(index, "taipei", since="2025-01-02") == []
+    assert found(index, "nowhere") == []
+    assert found(index, "  ") == []
+
+
+def test_cjk_queries_match_inside_sentences(index):
+    index.ingest()
+    assert found(index, "台北") == [MESSAGES[1][1]]
+    assert found(index, "捷運 下雨") == [MESSAGES[1][1]]
+    assert found(index, "北下") == [MESSAGES[1][1]]
+    assert found(index, "東京") == [MESSAGES[3][1], MESSAGES[2][1]]
+    assert found(index, "東京 tokyo") == [MESSAGES[3][1]]
+    assert found(index, "晴れ") == [MESSAGES[3][1]]
+    assert found(index, "날씨") == [MESSAGES[4][1]]
+    # A phrase: the characters must be adjacent, in this order.
+    assert found(index, "北台") == []
+
+
+def test_reingesting_the_same_records_adds_nothing(logs, index):
+    index.ingest()
+    assert index.ingest() == (0, 0, 0)
+
+    # The same segment read from the start again, as after losing the file offsets.
+    with index._connect() as conn:
+        conn.execute("DELETE FROM files")
+    stats = index.ingest()
+    assert stats.records == len(MESSAGES) and stats.added == 0
+
+    # The same records again in a compacted archive.
+    for path in log_paths(logs):
+        os.utime(path, (0, 0))
+    archived = compact_logs(logs, compact_after_days=0, retention_days=0)["files"]
+    assert archived == len(MESSAGES) - 1
+    stats = index.ingest()
+    assert stats.records == archived and stats.added == 0
+
+    assert index.count() == len(MESSAGES)
+    assert found(index, "taipei") == [MESSAGES[5][1], MESSAGES[0][1]]
+
+
+def test_migrated_legacy_file_is_indexed_once(tmp_path):
+    directory = tmp_path / "legacy_logs"
+    directory.mkdir()
+    (directory / "2025-01-01 08-00.json").write_text(
+        '[{"role": "user", "content": "台北天氣"}, {"role": "assistant", "content": "晴天"}]', encoding="utf-8")
+    index = ChatIndex(str(tmp_path / "legacy.sqlite"), str(directory))
+    assert index.ingest().added == 2
+
+    migrate_legacy_logs(str(directory))
+    stats = index.ingest()
+    assert stats.records == 2 and stats.added == 0
+    assert found(index, "天氣") == ["台北天氣"]
@@ -0,0 +1,134 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from coding.chatlog import ChatLogWriter, archive_paths, compact_logs, iter_records, log_paths, migrate_legacy_logs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def age(path: str, days: float):
+    then = time.time() - days * 86400
+    os.utime(path, (then, then))
+
+
+def contents(directory: str):
+    return [r["content"] for r in iter_records(directory)]
+
+
+def write_legacy(directory: str, days: int, turns_per_day: int) -> list:
+    """`save_messages_to_json` files, one per turn; the contents of their messages in time order."""
+    written = []
+    for day in range(days):
+        for turn in range(turns_per_day):
+            when = datetime(2025, 1, 1) + timedelta(days=day, hours=turn)
+            conversation = [{"role": "user", "content": f"question {day}-{turn}"},
+                            {"role": "assistant", "content": f"答案 {day}-{turn}", "name": "Teacher_Agent"}]
+            with open(os.path.join(directory, when.strftime("%Y-%m-%d %H-%M") + ".json"), "w",
+                      encoding="utf-8") as f:
+                json.dump(conversation, f, ensure_ascii=False, indent=2)
+            written += [m["content"] for m in conversation]
+    return written
+
+
+def test_compaction_keeps_every_message(tmp_path):
+    directory = str(tmp_path)
+    written = write_legacy(directory, days=3, turns_per_day=4)
+    writer = ChatLogWriter(directory, segment_bytes=200, flush_interval=0.01)
+    for i in range(20):
+        writer.log("s1", None, "user", f"segment message {i}")
+    writer.close()
+    written += [f"segment message {i}" for i in range(20)]
+    assert len(writer.segments) > 1
+    for path in log_paths(directory):
+        age(path, 3)
+
+    stats = compact_logs(directory, compact_after_days=0, retention_days=0)
+    # This process is alive, so its newest segment stays (see open_segments).
+    assert stats["files"] == 12 + len(writer.segments) - 1
+    assert log_paths(directory) == [writer.segment]
+    assert len(archive_paths(directory)) == 4
+    assert sorted(contents(directory)) == sorted(written)
+
+
+def test_migration_keeps_every_legacy_message_once(tmp_path):
+    directory = str(tmp_path)
+    written = write_legacy(directory, days=2, turns_per_day=3)
+
+    stats = migrate_legacy_logs(directory)
+    assert stats == {"files": 6, "skipped": 0, "records": 12}
+    assert contents(directory) == written
+    assert [r["role"] for r in iter_records(directory)] == ["user", "assistant"] * 6
+    assert len(os.listdir(tmp_path / "legacy")) == 6
+    assert not any(name.endswith(".json") for name in os.listdir(tmp_path))
+
+    # The migrated files were moved away, so a second run finds nothing to do.
+    assert migrate_legacy_logs(directory) == {"files": 0, "skipped": 0, "records": 0}
+    assert contents(directory) == written
+
+
+def test_migration_leaves_unreadable_files_in_place(tmp_path):
+    directory = str(tmp_path)
+    written = write_legacy(directory, days=1, turns_per_day=2)
+    broken = tmp_path / "2025-02-01 09-00.json"
+    broken.write_text("{not json", encoding="utf-8")
+
+    assert migrate_legacy_logs(directory) == {"files": 2, "skipped": 1, "records": 4}
+    assert broken.exists()
+    assert [r["content"] for r in iter_records(directory)] == written
+    assert migrate_legacy_logs(directory)["records"] == 0
+    assert [r["content"] for r in iter_records(directory)] == written
+
+
+def test_compaction_in_another_process_keeps_an_open_segment(tmp_path):
+    directory = str(tmp_path)
+    writer = ChatLogWriter(directory, flush_interval=0.01)
+    try:
+        writer.log("s1", None, "user", "first")
+        writer.flush()
+        age(writer.segment, 3)
+
+        # The documented CLI: a separate process, with no writer of its own.
+        subprocess.run([sys.executable, "-m", "coding.chatlog", "compact", "--dir", directory],
+                       cwd=ROOT, check=True, capture_output=True)
+        assert os.path.exists(writer.segment)
+
+        writer.log("s1", None, "user", "second after compact")
+        writer.flush()
+    finally:
+        writer.close()
+    assert contents(directory) == ["first", "second after compact"]
+
+
+def test_compaction_archives_rolled_segments_of_a_running_writer(tmp_path):
+    directory = str(tmp_path)
+    writer = ChatLogWriter(directory, segment_bytes=1, flush_interval=0.01)
+    try:
+        for text in ["one", "two", "three"]:
+            writer.log("s1", None, "user", text)
+            writer.flush()
+        for path in log_paths(directory):
+            age(path, 3)
+        stats = compact_logs(directory)
+        assert stats["files"] == 2
+        assert log_paths(directory) == [writer.segment]
+    finally:
+        writer.close()
+    assert contents(directory) == ["one", "two", "three"]
+
+
+def test_writer_reopens_a_segment_removed_under_it(tmp_path):
+    directory = str(tmp_path)
+    writer = ChatLogWriter(directory, flush_interval=0.01)
+    try:
+        writer.log("s1", None, "user", "lost")
+        writer.flush()
+        os.remove(writer.segment)
+        writer.log("s1", None, "user", "kept")
+        writer.flush()
+    finally:
+        writer.close()
+    assert contents(directory) == ["kept"]
@@ -0,0 +1,24 @@
+from coding.history import FragmentCache, message_key
+
+
+def render(msg):
+    return f"<div class='{msg['role']}'>{msg['content']}</div>"
+
+
+def test_same_id_different_role_renders_separately():
+    cache = FragmentCache()
+    # Two sessions: same content at the same sequence number, so the same MessageStore id.
+    user = {"id": "3-9f2c", "role": "user", "content": "Hello"}
+    assistant = {"id": "3-9f2c", "role": "assistant", "content": "Hello"}
+    assert cache.get("r", user, render, "messages_a") == "<div class='user'>Hello</div>"
+    assert cache.get("r", assistant, render, "messages_a") == "<div class='assistant'>Hello</div>"
+    assert message_key(user) != message_key(assistant)
+
+
+def test_fragments_are_reused_within_a_history_only():
+    cache = FragmentCache()
+    msg = {"id": "1-abcd", "role": "user", "content": "Hi"}
+    cache.get("r", msg, render, "messages_a")
+    cache.get("r", msg, render, "messages_a")
+    cache.get("r", msg, render, "messages_b")
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,48 @@
+import pytest
+
+from coding.intent import Intent, get_intent_classifier, job_marker, strip_marker
+
+MARKED = [
+    "[REPLY_TASK] Translate this sentence into French: good morning",
+    "[REPLY_TASK]: Reply with exactly the word OK",
+    "  [REPLY_TASK] Summarize the following text in one line",
+]
+UNMARKED = [
+    "Translate this sentence into French: good morning",
+    "Reply with exactly the word OK",
+    "Summarize the following text in one line",
+    "Processes messages that begin with REPLY_TASK",
+    "Please reply to my REPLY_TASK [REPLY_TASK]",
+]
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return get_intent_classifier()
+
+
+def test_job_marker():
+    assert job_marker("[REPLY_TASK] Say hi") == "REPLY_TASK"
+    assert job_marker("[OPENING_MSG]: the user just opened the chat") == "OPENING_MSG"
+    assert job_marker("Say hi [REPLY_TASK]") is None
+    assert job_marker("[NOT_A_JOB] Say hi") is None
+    assert strip_marker("[REPLY_TASK]: Say hi") == "Say hi"
+
+
+@pytest.mark.parametrize("prompt", MARKED)
+def test_marked_prompts_take_the_teacher_path(classifier, prompt):
+    intent = classifier.classify(prompt)
+    assert (intent.label, intent.marker, intent.path) == ("REPLY_TASK", "REPLY_TASK", "teacher")
+
+
+@pytest.mark.parametrize("prompt", UNMARKED)
+def test_unmarked_prompts_never_skip_the_student(classifier, prompt):
+    assert classifier.classify(prompt).path != "teacher"
+
+
+def test_teacher_path_needs_the_marker_whatever_the_confidence():
+    assert Intent("REPLY_TASK", 0.99, 0.0).path == "pipeline"
+    assert Intent("REPLY_TASK", 0.99, 0.0, "OPENING_MSG").path == "pipeline"
+    assert Intent("REPLY_TASK", 0.99, 0.0, "REPLY_TASK").path == "teacher"
+    assert Intent("REPLY_TASK", 0.3, 0.0, "REPLY_TASK").path == "pipeline"
+    assert Intent("SELF_INTRODUCE", 0.99, 0.0).path == "canned"
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from autogen import ConversableAgent, LLMConfig
+
+from coding.llmcache import ResponseCache, a_cached_generate_reply, cached_generate_reply
+from coding.stubserver import openai_stub
+
+MODEL = "gpt-4o-mini"
+
+
+@pytest.fixture
+def stub():
+    with openai_stub() as stub:
+        yield stub
+
+
+@pytest.fixture
+def agent(stub):
+    config = LLMConfig(api_type="openai", model=MODEL, api_key="stub", base_url=stub.base_url)
+    return ConversableAgent(name="Teacher_Agent", system_message="You are a teacher.", llm_config=config,
+                            human_input_mode="NEVER")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "llm_cache.sqlite"), max_entries=3)
+
+
+def ask(cache, agent, prompt, **kwargs):
+    return cached_generate_reply(cache, agent, [{"role": "user", "content": prompt}], MODEL, "English", **kwargs)
+
+
+def test_repeated_prompt_is_served_from_the_cache(stub, agent, cache):
+    reply, hit = ask(cache, agent, "What is new?")
+    assert (reply, hit) == ("Stub reply to: What is new?", False)
+    assert len(stub.requests) == 1
+    # Whitespace differences normalize to the same key.
+    assert ask(cache, agent, "  What   is new?\n") == (reply, True)
+    assert len(stub.requests) == 1
+
+
+def test_key_covers_model_language_and_system_message(cache):
+    messages = [{"role": "user", "content": "hi"}]
+    key = cache.make_key(MODEL, "You are a teacher.", "English", messages)
+    assert key != cache.make_key("gpt-4o", "You are a teacher.", "English", messages)
+    assert key != cache.make_key(MODEL, "You are a teacher.", "繁體中文", messages)
+    assert key != cache.make_key(MODEL, "You are a student.", "English", messages)
+
+
+def test_least_recently_used_entries_are_evicted(stub, agent, cache):
+    for prompt in ["a", "b", "c"]:
+        ask(cache, agent, prompt)
+    # "a" is used again, so "b" is now the least recently used entry.
+    assert ask(cache, agent, "a")[1]
+    ask(cache, agent, "d")
+    assert len(cache) == 3
+    before = len(stub.requests)
+    assert [ask(cache, agent, p)[1] for p in ["a", "c", "d"]] == [True, True, True]
+    assert len(stub.requests) == before
+    assert ask(cache, agent, "b") == ("Stub reply to: b", False)
+    assert len(stub.requests) == before + 1
+
+
+def test_bypass_always_calls_the_model_and_stores_nothing(stub, agent, cache):
+    ask(cache, agent, "What is new?")
+    assert ask(cache, agent, "What is new?", bypass=True) == ("Stub reply to: What is new?", False)
+    assert ask(cache, agent, "Something else", bypass=True)[1] is False
+    assert len(stub.requests) == 3
+    assert len(cache) == 1
+
+
+def test_async_reply_is_cached_like_the_sync_one(stub, agent, cache):
+    messages = [{"role": "user", "content": "What is new?"}]
+
+    async def twice():
+        pending = set()
+        first = await a_cached_generate_reply(cache, agent, messages, MODEL, "English", pending=pending)
+        await asyncio.gather(*pending)
+        return first, await a_cached_generate_reply(cache, agent, messages, MODEL, "English")
+
+    first, second = asyncio.run(twice())
+    assert first == ("Stub reply to: What is new?", False)
+    assert second == ("Stub reply to: What is new?", True)
+    assert len(stub.requests) == 1
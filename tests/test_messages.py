@@ -0,0 +1,48 @@
+import json
+
+from streamlit.testing.v1 import AppTest
+
+from coding.messages import MessageStore
+
+
+def mixed_page():
+    import streamlit as st
+
+    from KAlib.utils import display_session_msg as kalib_display, show_chat_history as kalib_history
+    from coding.messages import get_message_store
+    from coding.utils import display_session_msg, show_chat_history
+
+    history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"},
+               {"role": "assistant", "content": "Hello"}]
+    get_message_store().start_turn()
+    get_message_store().append("user", "Hi")
+    st.session_state["new"] = show_chat_history(st, history)
+    kalib_history(st, history)
+    display_session_msg(st)
+    kalib_display(st)
+
+
+def test_kalib_and_message_store_keep_separate_histories():
+    app = AppTest.from_function(mixed_page).run()
+    assert not app.exception
+    store = app.session_state["messages"]
+    assert isinstance(store, MessageStore)
+    assert [(m.role, m.content) for m in store] == [("user", "Hi"), ("assistant", "Hello")]
+    assert app.session_state["kalib_messages"] == [{"role": "user", "content": "Hi"},
+                                                   {"role": "assistant", "content": "Hello"}]
+
+
+def test_show_chat_history_returns_messages_new_since_the_call():
+    app = AppTest.from_function(mixed_page).run()
+    # "Hi" was stored by the page before the call, as a reply hook would.
+    assert [m["content"] for m in json.loads(app.session_state["new"])] == ["Hello"]
+
+
+def test_since_returns_messages_after_the_cursor():
+    store = MessageStore([{"role": "user", "content": "a"}])
+    new, cursor = store.since(0)
+    assert [m.content for m in new] == ["a"] and cursor == 1
+    store.append("assistant", "b")
+    new, cursor = store.since(cursor)
+    assert [m.content for m in new] == ["b"] and cursor == 2
+    assert store.since(cursor) == ([], 2)
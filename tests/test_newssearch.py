@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from coding.newsframe import PreparedNews
+from coding.stubserver import make_article
+from coding.tools import build_news_index, search_news
+
+ARTICLES = [
+    make_article(1, "Taiwan News", "2025-05-01", "Taiwan's AI-chips lead the world", "TSMC expands in Arizona"),
+    make_article(2, "Business", "2025-05-02", "台積電擴大投資", "半導體產業持續成長"),
+    make_article(3, "World News", "2025-05-03", "U.S. and Taiwan talk trade", "Tariffs... and more tariffs!"),
+    make_article(4, "Sports", "2025-05-04", "New Taipei wins the cup", "A 3-2 win over Kaohsiung"),
+    make_article(5, "Editorials", "2025-05-05", "在台灣，AI 晶片是關鍵", "Chips, chips, CHIPS"),
+    make_article(6, "Front Page", "not a date", "Typhoon nears Taipei", None),
+    make_article(7, "Taiwan News", "2025-05-07", "Semiconductor exports rise", "台灣半導體出口創新高"),
+    make_article(8, "Features", "2025-05-08", "Night markets of Taipei", "Taipei's food — a guide"),
+]
+ARTICLES[5]["ar_desc"] = None
+
+QUERIES = [
+    "Taiwan", "taiwan", "TAIWAN", "tAiPeI", "chips", "CHIP", "hip", "ai-chips", "AI-Chips", "s AI",
+    "台積電", "半導體", "導", "台灣半導體", "晶片", "AI 晶片", "在台",
+    "-", "...", "!", "—", ",", "'s", " ", "",
+    "None", "none", "nan", "3-2", "new taipei", "taipei wins", "U.S.", "tariffs!",
+]
+FILTERS = [
+    {},
+    {"sections": ["Taiwan News", "Business"]},
+    {"date_from": "2025-05-02", "date_to": "2025-05-06"},
+    {"search_columns": ["ar_head"]},
+]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return pd.DataFrame(sorted(ARTICLES, key=lambda a: a["ar_id"], reverse=True))
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("filters", FILTERS)
+def test_index_and_prepared_match_scan(frame, query, filters):
+    scanned = search_news(frame, query=query, news_number=None, **filters)
+    indexed = search_news(frame, query=query, news_number=None, text_index=build_news_index(frame), **filters)
+    prepared = PreparedNews(frame).search(query=query, news_number=None, **filters)
+    assert indexed.equals(scanned)
+    assert prepared.equals(scanned)
+    assert PreparedNews(frame).search(query=query, **filters).equals(search_news(frame, query=query, **filters))
+
+
+def test_extended_snapshot_matches_scan(frame):
+    older, newer = frame.iloc[4:], frame.iloc[:4]
+    extended = PreparedNews(older).extend(newer)
+    for query in QUERIES:
+        assert extended.search(query=query, news_number=None).equals(
+            search_news(frame, query=query, news_number=None)), query
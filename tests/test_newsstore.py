@@ -0,0 +1,61 @@
+import pytest
+
+from coding.newsstore import NewsStore
+from coding.stubserver import make_article, news_stub, paginate
+
+
+@pytest.fixture
+def store(tmp_path):
+    return NewsStore(str(tmp_path / "news.sqlite"))
+
+
+def test_cold_fill_stops_at_max_pages(store):
+    with news_stub(paginate([make_article(i) for i in range(1, 201)])) as stub:
+        store.base_url = stub.base_url
+        assert store.refresh(max_pages=3) == 60
+        assert len(stub.hits) == 3
+    assert store.count() == 60
+    assert store.max_ar_id() == 200
+    assert store.load()["ar_id"].tolist() == list(range(200, 140, -1))
+
+
+def test_warm_refresh_is_one_round_trip(store):
+    articles = [make_article(i) for i in range(1, 101)]
+    with news_stub(paginate(articles)) as stub:
+        store.base_url = stub.base_url
+        store.refresh(max_pages=5)
+        stub.pages = paginate(articles + [make_article(i) for i in range(101, 106)])
+        stub.hits.clear()
+        assert store.refresh(max_pages=5) == 5
+        assert len(stub.hits) == 1
+    assert store.count() == 105
+    assert store.load()["ar_id"].iloc[0] == 105
+
+
+def test_failed_page_leaves_store_untouched(store):
+    articles = [make_article(i) for i in range(1, 41)]
+    with news_stub(paginate(articles)) as stub:
+        store.base_url = stub.base_url
+        store.refresh(max_pages=1)
+        last_refresh = store.last_refresh
+        # 40 new articles: page 1 is all new, page 2 fails before the walk reaches stored ones.
+        stub.pages = paginate(articles + [make_article(i) for i in range(41, 81)])
+        stub.failing.add(2)
+        assert store.refresh(max_pages=5) == 0
+    assert store.count() == 20
+    assert store.max_ar_id() == 40
+    assert store.last_refresh == last_refresh
+
+
+def test_warm_refresh_pages_past_max_pages_to_the_overlap(store):
+    articles = [make_article(i) for i in range(1, 21)]
+    with news_stub(paginate(articles)) as stub:
+        store.base_url = stub.base_url
+        store.refresh(max_pages=1)
+        # Five pages of new articles, more than max_pages, before the stored ones.
+        stub.pages = paginate(articles + [make_article(i) for i in range(21, 121)])
+        stub.hits.clear()
+        assert store.refresh(max_pages=2) == 100
+        assert len(stub.hits) == 6
+    assert store.count() == 120
+    assert store.load()["ar_id"].tolist() == list(range(120, 0, -1))
@@ -0,0 +1,70 @@
+import pytest
+from autogen import ConversableAgent, LLMConfig
+
+from coding.llmcache import ResponseCache
+from coding.pipeline import TurnPipeline, TurnView, extract_followups
+from coding.stubserver import openai_stub
+
+MODEL = "gpt-4o-mini"
+FOLLOWUPS = "* What is next?\n- Why does it matter?\nHow would you test it?\nA fourth one?"
+
+
+def responder(request):
+    content = str(request["messages"][-1].get("content") or "")
+    if "follow-up questions" in content:
+        return FOLLOWUPS
+    return f"Answer to: {content[:60]}"
+
+
+class RecordingView(TurnView):
+    def __init__(self):
+        self.events = []
+
+    def message(self, role, content, stream):
+        self.events.append((role, content))
+
+    def followups(self, questions):
+        self.events.append(("followups", questions))
+
+
+@pytest.fixture
+def stub():
+    with openai_stub(responder) as stub:
+        yield stub
+
+
+@pytest.fixture
+def agents(stub):
+    config = LLMConfig(api_type="openai", model=MODEL, api_key="stub", base_url=stub.base_url)
+    student = ConversableAgent("Student_Agent", system_message="student", llm_config=config,
+                               human_input_mode="NEVER")
+    teacher = ConversableAgent("Teacher_Agent", system_message="teacher", llm_config=config,
+                               human_input_mode="NEVER")
+    return student, teacher
+
+
+def test_turn_answers_and_suggests_three_followups(stub, agents, tmp_path):
+    view = RecordingView()
+    cache = ResponseCache(str(tmp_path / "llm_cache.sqlite"))
+    result = TurnPipeline(*agents, MODEL, "English", cache, view=view).run("What is new?")
+
+    assert result.student == "Answer to: What is new?"
+    assert result.teacher == "Answer to: Answer to: What is new?"
+    assert result.followups == ["What is next?", "Why does it matter?", "How would you test it?"]
+    assert view.events == [("student", result.student), ("assistant", result.teacher),
+                           ("followups", result.followups)]
+    assert [t.stage for t in result.timings] == ["student", "teacher", "follow-up"]
+    assert [u.stage for u in result.usage] == ["student", "teacher", "follow-up"]
+    assert len(stub.requests) == 3
+
+
+def test_direct_turn_has_no_student_or_followups(stub, agents):
+    result = TurnPipeline(*agents, MODEL, "English").run("What is new?", direct=True)
+    assert result.student == "" and result.followups == []
+    assert result.teacher == "Answer to: What is new?"
+    assert len(stub.requests) == 1
+
+
+def test_extract_followups_keeps_three_distinct_questions():
+    assert extract_followups("Q?\n• 為什麼會下雨？\n為什麼會下雨？\n- Is it far?\nNo question here\nWhy now?\nAnd then?") \
+        == ["為什麼會下雨？", "Is it far?", "Why now?"]
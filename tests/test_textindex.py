@@ -0,0 +1,44 @@
+import sys
+import threading
+
+from coding.textindex import InvertedIndex
+
+
+def test_search_while_another_thread_adds():
+    index = InvertedIndex(["title"])
+    index.add_many(({"id": i, "title": f"word{i} 新聞"} for i in range(200)), key_field="id")
+    errors = []
+
+    def add():
+        for i in range(200, 2200):
+            index.add(i, {"title": f"token{i} fresh{i}"})
+
+    writer = threading.Thread(target=add)
+    interval = sys.getswitchinterval()
+    # Switch threads as often as possible, so the reader lands inside an add.
+    sys.setswitchinterval(1e-6)
+    writer.start()
+    try:
+        while writer.is_alive():
+            # No word tokens: a scan over every document.
+            index.search("-")
+            # Partial words: served from the cached vocabulary.
+            index.search("ord1")
+            index.search("resh")
+    except RuntimeError as e:
+        errors.append(e)
+    finally:
+        writer.join()
+        sys.setswitchinterval(interval)
+    assert not errors
+    assert index.search("resh") == set(range(200, 2200))
+
+
+def test_partial_query_sees_tokens_added_after_a_search():
+    index = InvertedIndex(["title"])
+    index.add(1, {"title": "semiconductor"})
+    assert index.search("conduct") == {1}
+    index.add(2, {"title": "conductivity"})
+    assert index.search("conduct") == {1, 2}
+    index.remove(1)
+    assert index.search("conduct") == {2}
@@ -0,0 +1,66 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from coding.catalog import EXPERT_FIELDS, CatalogIndex
+from coding.stubserver import make_article
+from coding.toolcache import normalize_arg, tool_cache
+from coding.tools import search_news
+
+ARTICLES = [
+    make_article(1, "World News", "2025-05-01", "Berlin renames a Straße", "STRASSE signs come down"),
+    make_article(2, "Business", "2025-05-02", "Chips said to boost AI demand", "Fair trade rules"),
+    make_article(3, "Taiwan News", "2025-05-03", "Taipei plans new park", "An ai-driven plan"),
+    make_article(4, "Features", "2025-05-04", "Night markets", "Σίσυφος and ΣΊΣΥΦΟΣ"),
+]
+EXPERTS = [
+    {"NAME": "Kai Strasse", "EMAIL": "kai@example.org", "DISCIPLINE": "AI policy", "INTEREST": "trade"},
+    {"NAME": "Lea Straße", "EMAIL": "lea@example.org", "DISCIPLINE": "Urban studies", "INTEREST": " ai "},
+]
+# Queries a key may fold together only if the searches find the same rows for them.
+QUERIES = [
+    "ai", " ai ", "AI", "Ai ", " AI", "ai-", "STRASSE", "strasse", "straße", "STRAẞE",
+    "Σίσυφος", "σίσυφος", "ΣΊΣΥΦΟΣ", "σίσυφοσ", "", " ",
+]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return pd.DataFrame(ARTICLES)
+
+
+def test_keys_differ_where_searches_differ():
+    assert normalize_arg(" ai ") != normalize_arg("ai")
+    assert normalize_arg("STRASSE") != normalize_arg("straße")
+    assert normalize_arg("TAIWAN") == normalize_arg("taiwan")
+    assert normalize_arg(["Sports", "business"]) == normalize_arg(["business", "sports"])
+
+
+@pytest.mark.parametrize("first, second", list(itertools.combinations(QUERIES, 2)))
+def test_shared_key_means_same_results(frame, first, second):
+    if normalize_arg(first) != normalize_arg(second):
+        return
+    assert search_news(frame, query=first, news_number=None).equals(
+        search_news(frame, query=second, news_number=None))
+    catalog = CatalogIndex(EXPERTS, EXPERT_FIELDS)
+    for field in EXPERT_FIELDS:
+        assert catalog.search(**{field: first}) == catalog.search(**{field: second})
+
+
+def test_cached_search_returns_what_the_search_finds(frame):
+    @tool_cache(ttl=60)
+    def cached_search(query=None):
+        return search_news(frame, query=query, news_number=None).to_dict(orient="records")
+
+    catalog = CatalogIndex(EXPERTS, EXPERT_FIELDS)
+
+    @tool_cache(ttl=60)
+    def cached_experts(name=None, interest=None):
+        return catalog.search_many("EMAIL", single={"NAME": name}, multi={"INTEREST": interest})
+
+    for query in QUERIES:
+        assert cached_search(query) == search_news(frame, query=query, news_number=None).to_dict(orient="records")
+        assert cached_experts(name=query, interest=[query]) == catalog.search_many(
+            "EMAIL", single={"NAME": query}, multi={"INTEREST": [query]})
+    assert cached_search.cache_info().hits > 0
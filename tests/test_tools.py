@@ -0,0 +1,34 @@
+import pytest
+
+from coding.stubserver import make_article, news_stub, paginate
+from coding.tools import fetch_all_news
+
+ARTICLES = [make_article(i) for i in range(1, 201)]
+
+
+@pytest.fixture
+def stub():
+    with news_stub(paginate(ARTICLES)) as stub:
+        yield stub
+
+
+def test_pooled_and_sequential_fetch_return_the_same_frame(stub):
+    sequential = fetch_all_news(1, 10, base_url=stub.base_url, max_workers=1)
+    pooled = fetch_all_news(1, 10, base_url=stub.base_url, max_workers=8)
+    assert pooled.equals(sequential)
+    assert sequential["ar_id"].tolist() == list(range(200, 0, -1))
+
+
+@pytest.mark.parametrize("max_workers", [1, 8])
+def test_failing_pages_are_skipped(stub, max_workers):
+    stub.failing.update({2, 7})
+    df = fetch_all_news(1, 10, base_url=stub.base_url, max_workers=max_workers)
+    # Page n holds ar_ids 200 - 20 * (n - 1) down to 181 - 20 * (n - 1).
+    missing = set(range(161, 181)) | set(range(61, 81))
+    assert df["ar_id"].tolist() == [i for i in range(200, 0, -1) if i not in missing]
+    assert len(stub.hits) == 10
+
+
+def test_all_pages_failing_gives_an_empty_frame(stub):
+    stub.failing.update(range(1, 4))
+    assert fetch_all_news(1, 3, base_url=stub.base_url, max_workers=8).empty
@@ -0,0 +1,104 @@
+import asyncio
+import os
+
+import autogen.oai.client
+import pytest
+from autogen import ConversableAgent, LLMConfig
+
+from coding import tracing
+from coding.context import count_tokens
+from coding.streaming import stream_tokens
+from coding.stubserver import openai_stub
+from coding.tracing import JsonlSpanExporter, Span, Tracer, instrument_agents, span
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = Tracer(None)
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    return tracer
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    # autogen counts streamed tokens with tiktoken, which downloads its encodings; count offline instead.
+    monkeypatch.setattr(autogen.oai.client, "count_token", count_tokens)
+    with openai_stub() as stub:
+        yield stub
+
+
+def make_agent(stub, name="Teacher_Agent"):
+    config = LLMConfig(api_type="openai", model="gpt-4o-mini", api_key="stub", base_url=stub.base_url, stream=True)
+    return ConversableAgent(name=name, llm_config=config, human_input_mode="NEVER")
+
+
+def turn(agent, prompt="What is new?"):
+    """Run an async reply in a turn span, streaming into a TokenStream; the turn's spans and streamed text."""
+    async def run():
+        with span("turn") as root, stream_tokens() as stream:
+            reply = await agent.a_generate_reply(messages=[{"role": "user", "content": prompt}])
+        return root, stream.text, reply
+
+    root, streamed, reply = asyncio.run(run())
+    return tracing.get_tracer().trace(root.trace_id), streamed, reply
+
+
+def test_llm_span_is_child_of_async_reply_and_tokens_still_stream(tracer, stub):
+    agent = make_agent(stub)
+    instrument_agents(agent)
+    spans, streamed, reply = turn(agent)
+    names = {s.name: s for s in spans}
+    assert [s.name for s in spans] == ["turn", "generate_reply", "llm"]
+    assert names["generate_reply"].parent_id == names["turn"].span_id
+    assert names["llm"].parent_id == names["generate_reply"].span_id
+    assert names["llm"].attributes["model"] == "gpt-4o-mini"
+    assert names["llm"].attributes["completion_tokens"] > 0
+    # autogen's IOStream reached the executor thread: the reply was streamed into the TokenStream.
+    assert streamed == reply == "Stub reply to: What is new?"
+
+
+def test_instrumentation_is_scoped_to_the_agents_and_idempotent(tracer, stub):
+    traced, plain = make_agent(stub), make_agent(stub, "Student_Agent")
+    instrument_agents(traced)
+    instrument_agents(traced)
+    assert "generate_reply" not in vars(plain)
+    assert ConversableAgent.a_generate_reply is type(plain).a_generate_reply
+    assert [s.name for s in turn(traced)[0]] == ["turn", "generate_reply", "llm"]
+    assert [s.name for s in turn(plain)[0]] == ["turn"]
+    assert len(stub.requests) == 2
+
+
+def test_trace_file_is_rolled_over_and_capped(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    exporter = JsonlSpanExporter(path, max_bytes=1000, backups=2)
+    for i in range(60):
+        exporter.export([Span(f"span-{i}")])
+    assert sorted(os.listdir(tmp_path)) == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+    for name in os.listdir(tmp_path):
+        assert os.path.getsize(tmp_path / name) < 1000 + 400
+    with open(path, encoding="utf-8") as f:
+        assert '"span-59"' in f.read().splitlines()[-1]
+
+
+def test_group_chat_selection_and_its_llm_requests_are_traced(tracer, stub):
+    from autogen.agentchat import initiate_group_chat
+    from autogen.agentchat.group.patterns import AutoPattern
+
+    from coding.tracing import instrument_pattern
+
+    teacher, student = make_agent(stub), make_agent(stub, "Student_Agent")
+    stub.responder = lambda request: "Student_Agent" if "Teacher_Agent" in str(request["messages"][-1]) \
+        else "Thanks, ALL DONE"
+    pattern = AutoPattern(initial_agent=teacher, agents=[teacher, student],
+                          group_manager_args={"llm_config": teacher.llm_config,
+                                              "is_termination_msg": lambda m: "ALL DONE" in str(m.get("content"))})
+    instrument_agents(teacher, student)
+    instrument_pattern(pattern)
+    instrument_pattern(pattern)
+    with span("turn") as root:
+        initiate_group_chat(pattern=pattern, messages="Hello", max_rounds=4)
+    spans = tracing.get_tracer().trace(root.trace_id)
+    ids = {s.span_id for s in spans}
+    assert any(s.name == "select_speaker" for s in spans)
+    assert sum(s.name == "llm" for s in spans) == len(stub.requests)
+    assert all(s.parent_id in ids for s in spans if s is not spans[0])
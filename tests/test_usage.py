@@ -0,0 +1,89 @@
+import time
+from datetime import datetime
+
+import pytest
+from autogen import ConversableAgent, LLMConfig
+
+from coding.stubserver import openai_stub
+from coding.usage import (CHEAP_STAGES, STAGES, BudgetRouter, StageUsage, UsageLedger, client_usage, today,
+                          usage_since)
+
+YESTERDAY = time.time() - 24 * 3600
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return UsageLedger(str(tmp_path / "usage.sqlite"))
+
+
+def words(text):
+    return len(str(text or "").split())
+
+
+def test_usage_since_is_the_stub_reported_usage_of_the_stage():
+    with openai_stub() as stub:
+        config = LLMConfig(api_type="openai", model="gpt-4o-mini", api_key="stub", base_url=stub.base_url)
+        agent = ConversableAgent(name="Teacher_Agent", system_message="You are a helpful teacher.",
+                                 llm_config=config, human_input_mode="NEVER")
+        agent.generate_reply(messages=[{"role": "user", "content": "warm up"}])
+        before = client_usage(agent)
+        replies = [agent.generate_reply(messages=[{"role": "user", "content": prompt}])
+                   for prompt in ["What is new in Taipei today?", "And in Kaohsiung?"]]
+        usage = usage_since(agent, before, "teacher", "gpt-4o-mini")
+
+    requests = stub.requests[1:]
+    assert usage.stage == "teacher" and usage.model == "gpt-4o-mini" and not usage.cached
+    assert usage.prompt_tokens == sum(words(m.get("content")) for r in requests for m in r["messages"])
+    assert usage.completion_tokens == sum(words(reply) for reply in replies)
+    assert usage.cost > 0
+    assert usage_since(agent, client_usage(agent), "teacher", "gpt-4o-mini") == StageUsage("teacher", "gpt-4o-mini")
+
+
+def test_totals_and_spent_per_profile_and_day(ledger):
+    ledger.record("s1", "news", [StageUsage("student", "gpt-4o-mini", 10, 5, 0.001),
+                                 StageUsage("teacher", "gpt-4o", 100, 50, 0.02)])
+    ledger.record("s1", "news", [StageUsage("teacher", "gpt-4o", 200, 100, 0.04, cached=True)])
+    ledger.record("s2", "sports", [StageUsage("teacher", "gpt-4o", 30, 20, 0.005)])
+    ledger.record("s1", "news", [StageUsage("teacher", "gpt-4o", 1000, 1000, 1.0)], ts=YESTERDAY)
+
+    assert ledger.spent("news") == pytest.approx(0.061)
+    assert ledger.spent("sports") == pytest.approx(0.005)
+    assert ledger.spent("news", datetime.fromtimestamp(YESTERDAY).strftime("%Y-%m-%d")) == pytest.approx(1.0)
+    assert ledger.spent("nobody") == 0
+
+    news_today = ledger.totals("news", today())
+    assert [(t.stage, t.model, t.requests, t.cached, t.prompt_tokens, t.completion_tokens) for t in news_today] == [
+        ("student", "gpt-4o-mini", 1, 0, 10, 5), ("teacher", "gpt-4o", 2, 1, 300, 150)]
+    assert sum(t.requests for t in ledger.totals("news")) == 4
+    assert {t.profile for t in ledger.totals(day=today())} == {"news", "sports"}
+
+
+def test_rename_profile_keeps_its_spend(ledger):
+    ledger.record("s1", "old", [StageUsage("teacher", "gpt-4o", 100, 50, 0.3)])
+    ledger.rename_profile("old", "new")
+    assert ledger.spent("old") == 0
+    assert ledger.spent("new") == pytest.approx(0.3)
+    assert [t.profile for t in ledger.totals()] == ["new"]
+
+
+def test_router_moves_the_teacher_to_the_cheap_model_once_over_budget(ledger):
+    router = BudgetRouter(ledger, cheap_model="cheap")
+    route = router.route("news", "gpt-4o", budget=0.5)
+    assert not route.over_budget
+    assert route.models == {stage: "cheap" if stage in CHEAP_STAGES else "gpt-4o" for stage in STAGES}
+
+    ledger.record("s1", "news", [StageUsage("teacher", "gpt-4o", cost=0.49)])
+    assert router.route("news", "gpt-4o", budget=0.5).models["teacher"] == "gpt-4o"
+    ledger.record("s1", "news", [StageUsage("teacher", "gpt-4o", cost=0.01)])
+    route = router.route("news", "gpt-4o", budget=0.5)
+    assert route.over_budget and route.spent == pytest.approx(0.5)
+    assert set(route.models.values()) == {"cheap"}
+    # Another profile's spend does not count.
+    assert router.route("sports", "gpt-4o", budget=0.5).models["teacher"] == "gpt-4o"
+
+
+def test_router_never_downgrades_without_a_budget(ledger):
+    ledger.record("s1", "news", [StageUsage("teacher", "gpt-4o", cost=100.0)])
+    route = BudgetRouter(ledger, cheap_model="cheap").route("news", "gpt-4o", budget=0)
+    assert not route.over_budget
+    assert route.models["teacher"] == "gpt-4o"